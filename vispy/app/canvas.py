@@ -8,7 +8,7 @@ import sys
 import numpy as np
 from time import sleep
 
-from ..util.event import EmitterGroup, Event, WarningEmitter
+from ..util.event import EmitterGroup, Event, EventEmitter, WarningEmitter
 from ..util.ptime import time
 from ..ext.six import string_types
 from . import Application, use_app
@@ -24,6 +24,19 @@ def _gloo_initialize(event):
     gl_initialize()
 
 
+class _ContextEmitter(EventEmitter):
+    """ Emitter for events that the backend emits right after making the
+    GL context of the canvas current. The GL state shadowed by
+    ``gl.cache_proxy`` may belong to another context, or may have been
+    changed by GL calls that bypass vispy, so it is invalidated first.
+    """
+
+    def __call__(self, *args, **kwargs):
+        from ..gloo import gl
+        gl.cache_proxy.invalidate()
+        return EventEmitter.__call__(self, *args, **kwargs)
+
+
 class Canvas(object):
     """Representation of a GUI element with an OpenGL context
 
@@ -106,9 +119,15 @@ class Canvas(object):
 
         # Create events
         self.events = EmitterGroup(source=self,
-                                   initialize=Event,
-                                   resize=ResizeEvent,
-                                   draw=DrawEvent,
+                                   initialize=_ContextEmitter(
+                                       source=self, type='initialize',
+                                       event_class=Event),
+                                   resize=_ContextEmitter(
+                                       source=self, type='resize',
+                                       event_class=ResizeEvent),
+                                   draw=_ContextEmitter(
+                                       source=self, type='draw',
+                                       event_class=DrawEvent),
                                    mouse_press=MouseEvent,
                                    mouse_release=MouseEvent,
                                    mouse_move=MouseEvent,
@@ -8,6 +8,79 @@ from __future__ import division
 
 import numpy as np
 
+# Pairs of cell edges to connect for each grid cell index. The edges are
+# 0: (0, 0)-(0, 1), 1: (0, 0)-(1, 0), 2: (1, 0)-(1, 1), 3: (0, 1)-(1, 1)
+_side_table = [
+    [],
+    [0, 1],
+    [1, 2],
+    [0, 2],
+    [0, 3],
+    [1, 3],
+    [0, 1, 2, 3],
+    [2, 3],
+    [2, 3],
+    [0, 1, 2, 3],
+    [1, 3],
+    [0, 3],
+    [0, 2],
+    [1, 2],
+    [0, 1],
+    []
+]
+
+# (di, dj, axis) of the grid edge of each cell edge; axis 0 edges go from
+# (i, j) to (i + 1, j), axis 1 edges from (i, j) to (i, j + 1)
+_edge_shifts = np.array([[0, 0, 1], [0, 0, 0], [1, 0, 1], [0, 1, 0]])
+
+_segment_table = None
+
+
+def _get_segment_table():
+    """ Get the oriented segments of each cell index: an array (16, 2, 2)
+    of cell edges (-1 if unused), and the number of segments (16,).
+
+    The segments are oriented such that the values below the level are
+    always on the same side, so that the end of each segment is the start
+    of the next one on the curve.
+    """
+    global _segment_table
+    if _segment_table is None:
+        # the boundary of a cell, as corner bits and edges in order
+        boundary = [('c', 0), ('e', 1), ('c', 1), ('e', 2),
+                    ('c', 3), ('e', 3), ('c', 2), ('e', 0)]
+        pos = dict((edge, i) for i, (kind, edge) in enumerate(boundary)
+                   if kind == 'e')
+
+        def corners_between(a, b):
+            # the corners passed when going around the cell from a to b
+            i, corners = pos[a], []
+            while True:
+                i = (i + 1) % len(boundary)
+                kind, value = boundary[i]
+                if kind == 'e' and value == b:
+                    return corners
+                if kind == 'c':
+                    corners.append(value)
+
+        table = -np.ones((16, 2, 2), dtype=np.int8)
+        n_segments = np.zeros(16, dtype=np.int8)
+        for index, sides in enumerate(_side_table):
+            for k in range(0, len(sides), 2):
+                a, b = sides[k:k+2]
+                # the corners on one side of the segment (in saddle cells,
+                # only those on the smaller side are all below or above)
+                forward = corners_between(a, b)
+                backward = corners_between(b, a)
+                corners = min(forward, backward, key=len)
+                below = bool(index & (1 << corners[0]))
+                if below != (corners is forward):
+                    a, b = b, a
+                table[index, k // 2] = a, b
+            n_segments[index] = len(sides) // 2
+        _segment_table = table, n_segments
+    return _segment_table
+
 
 def isocurve(data, level, connected=False, extend_to_edge=False):
     """
@@ -17,19 +90,174 @@ def isocurve(data, level, connected=False, extend_to_edge=False):
     ----------
     data : ndarray
         2D numpy array of scalar values
-    level : float
-        The level at which to generate an isosurface
+    level : float | sequence of float
+        The level at which to generate an isosurface. If a sequence is
+        given, a list with the result for each level is returned (this is
+        faster than calling this function for each level).
     connected : bool
         If False, return a single long list of point pairs
-        If True, return multiple long lists of connected point 
-        locations. (This is slower but better for drawing 
+        If True, return multiple long lists of connected point
+        locations. (This is slower but better for drawing
         continuous lines)
     extend_to_edge : bool
-        If True, extend the curves to reach the exact edges of 
-        the data. 
-    """    
-    # This function is SLOW; plenty of room for optimization here.
-    
+        If True, extend the curves to reach the exact edges of
+        the data.
+    """
+    levels = np.atleast_1d(np.asarray(level, dtype=float))
+    if connected:
+        pos, connect, level_index = isocurve_paths(data, levels,
+                                                   extend_to_edge)
+        breaks = np.flatnonzero(~connect) + 1
+        paths = np.split(pos, breaks) if len(pos) else []
+        path_levels = level_index[np.concatenate([[0], breaks])[:len(paths)]]
+        results = [[] for _ in levels]
+        for path, i in zip(paths, path_levels):
+            results[i].append([tuple(p) for p in path.tolist()])
+    else:
+        points, level_index = isocurve_segments(data, levels, extend_to_edge)
+        results = [[] for _ in levels]
+        for seg, i in zip(points.tolist(), level_index):
+            results[i].append([tuple(seg[0]), tuple(seg[1])])
+    return results if np.ndim(level) else results[0]
+
+
+def isocurve_segments(data, levels, extend_to_edge=False):
+    """
+    Generate the isocurve segments of 2D data at one or more levels.
+
+    Parameters
+    ----------
+    data : ndarray
+        2D numpy array of scalar values
+    levels : float | sequence of float
+        The levels at which to generate the isocurves.
+    extend_to_edge : bool
+        If True, extend the curves to reach the exact edges of
+        the data.
+
+    Returns
+    -------
+    segments : ndarray
+        Array (N, 2, 2) with the start and end point of each segment.
+    level_index : ndarray
+        Array (N,) with the index of the level of each segment.
+    """
+    levels = np.atleast_1d(np.asarray(levels, dtype=float))
+    points, level_index, _ = _isocurve_segments(data, levels, extend_to_edge)
+    return points, level_index
+
+
+def isocurve_paths(data, levels, extend_to_edge=False):
+    """
+    Generate the connected isocurves of 2D data at one or more levels.
+
+    Parameters
+    ----------
+    data : ndarray
+        2D numpy array of scalar values
+    levels : float | sequence of float
+        The levels at which to generate the isocurves.
+    extend_to_edge : bool
+        If True, extend the curves to reach the exact edges of
+        the data.
+
+    Returns
+    -------
+    pos : ndarray
+        Array (N, 2) with the vertices of all paths, one after the other.
+        Closed paths end with their first vertex.
+    connect : ndarray
+        Boolean array (N - 1,) that is False between two paths (as can
+        be used for the ``connect`` argument of the Line visual).
+    level_index : ndarray
+        Array (N,) with the index of the level of each vertex.
+    """
+    levels = np.atleast_1d(np.asarray(levels, dtype=float))
+    points, level_index, nxt = _isocurve_segments(data, levels,
+                                                  extend_to_edge, link=True)
+    n = len(nxt)
+    last, dist, done = _rank_segments(nxt)
+
+    # Segments that did not reach the end of a path are on closed paths;
+    # these are opened at their segment with the lowest index
+    cyc = np.flatnonzero(~done)
+    if len(cyc):
+        compact = np.empty(n, dtype=np.intp)
+        compact[cyc] = np.arange(len(cyc))
+        cnxt = compact[nxt[cyc]]
+        # each jump doubles the reach; the lowest index of a path stops
+        # changing when the reach is longer than the path
+        ptr, lowest = cnxt, np.arange(len(cyc))
+        while True:
+            new = np.minimum(lowest, lowest[ptr])
+            if np.array_equal(new, lowest):
+                break
+            lowest, ptr = new, ptr[ptr]
+        cnxt[cnxt == lowest] = -1
+        clast, cdist, _ = _rank_segments(cnxt)
+        nxt[cyc[cnxt < 0]] = -1
+        last[cyc] = cyc[clast]
+        dist[cyc] = cdist
+
+    # Each path starts at a segment that is not the next of another one
+    has_prev = np.zeros(n, dtype=bool)
+    has_prev[nxt[nxt >= 0]] = True
+    heads = np.flatnonzero(~has_prev)
+    n_paths = len(heads)
+    length = dist[heads] + 1
+    # first vertex of each path (each path has one vertex more than segments)
+    first = np.cumsum(length + 1) - (length + 1)
+    path_first = np.empty(n, dtype=np.intp)
+    path_first[last[heads]] = first
+    path_length = np.empty(n, dtype=np.intp)
+    path_length[last[heads]] = length
+
+    # The vertices are the start points of all segments, plus the end point
+    # of the last segment of each path
+    vert = path_first[last] + path_length[last] - 1 - dist
+    ends = first + length
+    pos = np.empty((n + n_paths, 2), dtype=points.dtype)
+    pos[vert] = points[:, 0]
+    pos[ends] = points[last[heads], 1]
+    connect = np.ones(max(n + n_paths - 1, 0), dtype=bool)
+    connect[ends[:-1]] = False
+    vert_level = np.empty(n + n_paths, dtype=level_index.dtype)
+    vert_level[vert] = level_index
+    vert_level[ends] = level_index[heads]
+    return pos, connect, vert_level
+
+
+def _rank_segments(nxt):
+    """ Find the last segment of the path of each segment, and the number
+    of segments to it, by pointer jumping.
+
+    Returns the last segments, the distances, and a boolean array that is
+    False for segments that never reach a last segment (closed paths).
+    """
+    n = len(nxt)
+    ptr = np.where(nxt < 0, np.arange(n), nxt)
+    dist = (nxt >= 0).astype(np.intp)
+    done = nxt[ptr] < 0
+    n_done = done.sum()
+    # each jump doubles the reach; stop when no more segments get done
+    while n_done < n:
+        dist += dist[ptr]
+        ptr = ptr[ptr]
+        done = nxt[ptr] < 0
+        n_done, n_done_prev = done.sum(), n_done
+        if n_done == n_done_prev:
+            break
+    return ptr, dist, done
+
+
+def _isocurve_segments(data, levels, extend_to_edge=False, link=False):
+    """ Compute the isocurve segments of all levels at once.
+
+    Returns the end points of the segments (N, 2, 2), the level index of
+    each segment and, if *link* is True, the index of the segment that
+    continues the curve at the end of each segment (or -1).
+    """
+    data = np.asarray(data)
     if extend_to_edge:
         d2 = np.empty((data.shape[0]+2, data.shape[1]+2), dtype=data.dtype)
         d2[1:-1, 1:-1] = data
@@ -42,134 +270,92 @@ def isocurve(data, level, connected=False, extend_to_edge=False):
         d2[-1, 0] = d2[-1, 1]
         d2[-1, -1] = d2[-1, -2]
         data = d2
-    
-    side_table = [
-        [],
-        [0, 1],
-        [1, 2],
-        [0, 2],
-        [0, 3],
-        [1, 3],
-        [0, 1, 2, 3],
-        [2, 3],
-        [2, 3],
-        [0, 1, 2, 3],
-        [1, 3],
-        [0, 3],
-        [0, 2],
-        [1, 2],
-        [0, 1],
-        []
-    ]
-    
-    edge_key = [
-        [(0, 1), (0, 0)],
-        [(0, 0), (1, 0)],
-        [(1, 0), (1, 1)],
-        [(1, 1), (0, 1)]
-    ]
-    
-    level = float(level)
-    lines = []
-    
-    # mark everything below the isosurface level
-    mask = data < level
-    
-    ## make four sub-fields and compute indexes for grid cells
-    index = np.zeros([x-1 for x in data.shape], dtype=np.ubyte)
-    fields = np.empty((2, 2), dtype=object)
-    slices = [slice(0, -1), slice(1, None)]
-    for i in [0, 1]:
-        for j in [0, 1]:
-            fields[i, j] = mask[slices[i], slices[j]]
-            vertIndex = i+2*j
-            index += fields[i, j] * 2**vertIndex
-    
-    # add lines
-    for i in range(index.shape[0]):                 # data x-axis
-        for j in range(index.shape[1]):             # data y-axis     
-            sides = side_table[index[i, j]]
-            for l in range(0, len(sides), 2):     # faces for this grid cell
-                edges = sides[l:l+2]
-                pts = []
-                for m in [0, 1]:      # points in this face
-                    # p1, p2 are points at either side of an edge
-                    p1 = edge_key[edges[m]][0] 
-                    p2 = edge_key[edges[m]][1]
-                    # v1 and v2 are the values at p1 and p2
-                    v1 = data[i+p1[0], j+p1[1]] 
-                    v2 = data[i+p2[0], j+p2[1]]
-                    f = (level-v1) / (v2-v1)
-                    fi = 1.0 - f
-                    # interpolate between corners
-                    p = (p1[0]*fi + p2[0]*f + i + 0.5, 
-                         p1[1]*fi + p2[1]*f + j + 0.5)
-                    if extend_to_edge:
-                        # check bounds
-                        p = (min(data.shape[0]-2, max(0, p[0]-1)),
-                             min(data.shape[1]-2, max(0, p[1]-1)))
-                    if connected:
-                        gridKey = (i + (1 if edges[m] == 2 else 0), 
-                                   j + (1 if edges[m] == 3 else 0), 
-                                   edges[m] % 2)
-                        # give the actual position and a key identifying the 
-                        # grid location (for connecting segments)
-                        pts.append((p, gridKey))
-                    else:
-                        pts.append(p)
-                
-                lines.append(pts)
-
-    if not connected:
-        return lines
-                
-    # turn disjoint list of segments into continuous lines
-
-    points = {}  # maps each point to its connections
-    for a, b in lines:
-        if a[1] not in points:
-            points[a[1]] = []
-        points[a[1]].append([a, b])
-        if b[1] not in points:
-            points[b[1]] = []
-        points[b[1]].append([b, a])
-
-    # rearrange into chains
-    for k in list(points.keys()):
-        try:
-            chains = points[k]
-        except KeyError:  # already used this point elsewhere
-            continue
-        for chain in chains:
-            x = None
-            while True:
-                if x == chain[-1][1]:
-                    break  # nothing left to do on this chain
-                    
-                x = chain[-1][1]
-                if x == k:
-                    # chain has looped; we're done and can ignore the opposite
-                    # chain
-                    break
-                y = chain[-2][1]
-                connects = points[x]
-                for conn in connects[:]:
-                    if conn[1][1] != y:
-                        chain.extend(conn[1:])
-                del points[x]
-            if chain[0][1] == chain[-1][1]:
-                # looped chain; no need to continue the other direction
-                chains.pop()
-                break
-                
-    # extract point locations 
-    lines = []
-    for chain in points.values():
-        if len(chain) == 2:
-            # join together ends of chain
-            chain = chain[1][1:][::-1] + chain[0]
-        else:
-            chain = chain[0]
-        lines.append([pt[0] for pt in chain])
-    
-    return lines  # a list of pairs of points
+    n0, n1 = data.shape
+    table, n_segments = _get_segment_table()
+
+    # The bin of each data value: data < levels[k] <=> bins <= k
+    sorter = np.argsort(levels, kind='mergesort')
+    bins = np.searchsorted(levels[sorter], data, side='right')
+    bins = bins.astype(np.int16 if len(levels) < 2**15 else np.int32)
+
+    # Only cells whose corners are in different bins are cut, by the
+    # levels lo .. hi - 1
+    corners = [bins[:-1, :-1], bins[1:, :-1], bins[:-1, 1:], bins[1:, 1:]]
+    lo = np.minimum(np.minimum(corners[0], corners[1]),
+                    np.minimum(corners[2], corners[3]))
+    hi = np.maximum(np.maximum(corners[0], corners[1]),
+                    np.maximum(corners[2], corners[3]))
+    itype = np.int32 if data.size < 2**31 else np.intp
+    cells = np.flatnonzero(lo != hi).astype(itype)
+    lo = lo.ravel()[cells].astype(itype)
+    counts = hi.ravel()[cells] - lo
+    first = np.cumsum(counts, dtype=itype) - counts
+    # one row for each cell and level
+    k = (np.arange(counts.sum(), dtype=itype) +
+         np.repeat(lo - first, counts))
+    i = np.repeat(cells // (n1 - 1), counts)
+    j = np.repeat(cells % (n1 - 1), counts)
+    del corners, hi
+
+    # mark corners below the level and compute indexes for grid cells
+    bins = bins.ravel()
+    point = i * n1 + j
+    index = np.zeros(len(k), dtype=np.uint8)
+    for bit, offset in enumerate([0, n1, 1, n1 + 1]):
+        index |= (bins[point + offset] <= k).astype(np.uint8) << bit
+    del bins
+
+    # one row per segment (saddle cells have two)
+    n_first = len(index)
+    second = np.flatnonzero(n_segments[index] == 2)
+    i = np.concatenate([i, i[second]])
+    j = np.concatenate([j, j[second]])
+    point = np.concatenate([point, point[second]])
+    seg_k = np.concatenate([k, k[second]])
+    edges = np.concatenate([table[index, 0], table[index[second], 1]])
+    del index, k
+
+    # the grid edge of each end point
+    di, dj, axis = _edge_shifts.T
+    axis = axis[edges]
+    grid = point[:, np.newaxis] + (di * n1 + dj).astype(itype)[edges]
+    del point
+
+    # interpolate the position along the grid edge
+    data_flat = data.ravel()
+    level = levels[sorter][seg_k][:, np.newaxis]
+    # (as float, differences of integer data would wrap around)
+    v1 = data_flat[grid].astype(float)
+    v2 = data_flat[grid + np.array([n1, 1], dtype=itype)[axis]].astype(float)
+    f = (level - v1) / (v2 - v1)
+    del grid, v1, v2
+    points = np.empty(edges.shape + (2,))
+    points[..., 0] = (i + 0.5)[:, np.newaxis] + di[edges]
+    points[..., 1] = (j + 0.5)[:, np.newaxis] + dj[edges]
+    flat = points.reshape(-1, 2)
+    flat[np.arange(len(flat)), axis.ravel()] += f.ravel()
+    if extend_to_edge:
+        # check bounds
+        points -= 1
+        np.clip(points[..., 0], 0, n0 - 2, out=points[..., 0])
+        np.clip(points[..., 1], 0, n1 - 2, out=points[..., 1])
+    if not link:
+        return points, sorter[seg_k], None
+
+    # The next segment is in the neighboring cell across the end edge, at
+    # the same level, and starts at the same grid edge
+    end = edges[:, 1]
+    ni = i + np.array([-1, 0, 1, 0], dtype=itype)[end]
+    nj = j + np.array([0, -1, 0, 1], dtype=itype)[end]
+    inside = (ni >= 0) & (ni < n0 - 1) & (nj >= 0) & (nj < n1 - 1)
+    # the row of the first segment of (cell, level) is base[cell] + level
+    base = np.zeros((n0 - 1) * (n1 - 1), dtype=itype)
+    base[cells] = first - lo
+    row = base[np.where(inside, ni * (n1 - 1) + nj, 0)] + seg_k
+    row[~inside] = 0
+    second_row = np.zeros(n_first, dtype=itype)
+    second_row[second] = n_first + np.arange(len(second), dtype=itype)
+    opposite = np.array([2, 3, 0, 1], dtype=np.int8)[end]
+    row = np.where(edges[row, 0] == opposite, row, second_row[row])
+    nxt = np.where(inside, row, -1)
+    return points, sorter[seg_k], nxt
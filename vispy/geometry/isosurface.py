@@ -1,9 +1,13 @@
+from __future__ import division
+
 import numpy as np
 
+from ..ext.ordereddict import OrderedDict
+
 _data_cache = None
 
 
-def isosurface(data, level):
+def isosurface(data, level, chunk_size=None, n_jobs=1):
     """
     Generate isosurface from volumetric data using marching cubes algorithm.
     See Paul Bourke, "Polygonising a Scalar Field"  
@@ -11,121 +15,305 @@ def isosurface(data, level):
     
     *data*   3D numpy array of scalar values
     *level*  The level at which to generate an isosurface
+    *chunk_size*  If given, the volume is processed in slabs of this many
+                  cells along the first axis, which bounds the size of the
+                  temporary arrays (see ``iter_isosurface``).
+    *n_jobs*  The number of threads used to process the slabs.
     
     Returns an array of vertex coordinates (Nv, 3) and an array of 
     per-face vertex indexes (Nf, 3)    
     """
+    if chunk_size is None:
+        chunk_size = max(data.shape[0] - 1, 1)
+    blocks = list(iter_isosurface(data, level, chunk_size, n_jobs))
+    vertexes = np.concatenate([b[0] for b in blocks])
+    faces = np.concatenate([b[1] for b in blocks])
+    return vertexes, faces
+
+
+def iter_isosurface(data, level, chunk_size=32, n_jobs=1):
+    """
+    Generate an isosurface in blocks, processing the volume in slabs of
+    *chunk_size* cells along the first axis.
+
+    Vertexes on the boundary between two slabs are shared (the result is
+    the same as that of ``isosurface`` without chunks) and the vertex
+    indexes of the faces refer to the complete vertex array. Peak memory
+    use is proportional to the size of a slab rather than the volume.
+    
+    *data*   3D numpy array of scalar values
+    *level*  The level at which to generate an isosurface
+    *chunk_size*  The number of cells along the first axis per slab.
+    *n_jobs*  The number of threads used to process the slabs (numpy
+              releases the GIL for most of the work).
+
+    Yields tuples of vertex coordinates (Nv, 3) and per-face vertex indexes
+    (Nf, 3). After each block, the faces yielded so far only refer to
+    vertexes yielded so far, so the blocks can be drawn as they arrive.
+    """
     # For improvement, see:
     # 
     # Efficient implementation of Marching Cubes' cases with topological 
     # guarantees.
     # Thomas Lewiner, Helio Lopes, Antonio Wilson Vieira and Geovan Tavares.
     # Journal of Graphics Tools 8(2): pp. 1-15 (december 2003)
-    
+    n_cells = data.shape[0] - 1 if min(data.shape) > 1 else 0
+    chunk_size = max(int(chunk_size), 1)
+    bounds = [(z0, min(z0 + chunk_size, n_cells))
+              for z0 in range(0, n_cells, chunk_size)]
+
+    def work(bound):
+        return _isosurface_slab(data, level, *bound)
+
+    pool = None
+    if n_jobs > 1 and len(bounds) > 1:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(min(n_jobs, len(bounds)))
+        results = pool.imap(work, bounds)
+    else:
+        results = (work(bound) for bound in bounds)
+
+    # The faces of a slab can refer to vertexes of the next slab, so they
+    # are yielded together with the vertexes of the next slab
+    offset = 0
+    faces_prev = np.empty((0, 3), dtype=np.uint32)
+    try:
+        for vertexes, faces, n_own in results:
+            faces += offset
+            yield vertexes[:n_own], faces_prev
+            faces_prev = faces
+            offset += n_own
+    finally:
+        if pool is not None:
+            pool.terminate()
+    yield np.empty((0, 3), dtype=np.float32), faces_prev
+
+
+class IsosurfaceExtractor(object):
+    """
+    Extract isosurfaces of one volume at many levels.
+
+    The volume is divided in bricks of *brick_size* cells along each axis,
+    and the minimum and maximum value of each brick are computed once.
+    Extracting an isosurface then only runs marching cubes on the bricks
+    whose value range spans the level, which makes interactive changes of
+    the level much cheaper. The results of the most recently used levels
+    are cached.
+
+    *data*        3D numpy array of scalar values (it should not be changed
+                  while the extractor is used)
+    *brick_size*  The number of cells along each axis of a brick
+    *cache_size*  The number of levels to keep the isosurface of
+    """
+    def __init__(self, data, brick_size=16, cache_size=8):
+        self.data = data
+        self.brick_size = brick_size
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._bmin, self._bmax = _brick_ranges(data, brick_size)
+
+    def active_bricks(self, level):
+        """ Get a boolean array that is True for the bricks that contain
+        (part of) the isosurface at *level*.
+        """
+        # bricks with NaN values are always active
+        return ~(self._bmin >= level) & ~(self._bmax < level)
+
+    def isosurface(self, level):
+        """ Get the isosurface at *level*
+
+        Returns an array of vertex coordinates (Nv, 3) and an array of
+        per-face vertex indexes (Nf, 3). The vertexes are the same (and in
+        the same order) as those of ``isosurface(data, level)``.
+        """
+        key = float(level)
+        if key in self._cache:
+            result = self._cache.pop(key)
+        else:
+            result = self._extract(level)
+            while len(self._cache) >= self.cache_size > 0:
+                self._cache.pop(next(iter(self._cache)))
+        if self.cache_size > 0:
+            self._cache[key] = result  # (re)insert as most recently used
+        return result
+
+    def _extract(self, level):
+        data = self.data
+        bs = self.brick_size
+        n_cells = np.array(data.shape) - 1
+        bricks = np.array(np.nonzero(self.active_bricks(level))).T
+        # bricks on the far side of the volume can be smaller; bricks of
+        # the same size are processed together
+        sizes = np.minimum(n_cells - bricks * bs, bs)
+        groups = {}
+        for brick, size in zip(bricks, sizes):
+            groups.setdefault(tuple(size), []).append(brick * bs)
+        keys, verts, faces = [], [], []
+        n_verts = 0
+        for size, origins in groups.items():
+            origins = np.array(origins)
+            shape = tuple(s + 1 for s in size)
+            stack = np.empty((len(origins),) + shape, dtype=data.dtype)
+            for i, (z, y, x) in enumerate(origins):
+                stack[i] = data[z:z + shape[0], y:y + shape[1],
+                                x:x + shape[2]]
+            edge_inds, group_verts, group_faces = _marching_cubes(
+                stack, level, origins)
+            # the global edge index identifies shared vertexes
+            b, z, y, x, axis = np.unravel_index(edge_inds,
+                                                stack.shape + (3,))
+            keys.append(np.ravel_multi_index(
+                (z + origins[b, 0], y + origins[b, 1], x + origins[b, 2],
+                 axis), data.shape + (3,)))
+            verts.append(group_verts)
+            faces.append(group_faces + n_verts)
+            n_verts += len(group_verts)
+        if n_verts == 0:
+            return (np.empty((0, 3), dtype=np.float32),
+                    np.empty((0, 3), dtype=np.uint32))
+        keys, index, inverse = np.unique(np.concatenate(keys),
+                                         return_index=True,
+                                         return_inverse=True)
+        vertexes = np.concatenate(verts)[index]
+        faces = inverse[np.concatenate(faces)].astype(np.uint32)
+        return vertexes, faces
+
+
+def _brick_ranges(data, brick_size):
+    """ Compute the minimum and maximum value of the points of each brick
+    of *brick_size* cells (so bricks share their boundary points).
+    """
+    bmin, bmax = data, data
+    for axis, n in enumerate(data.shape):
+        starts = np.arange(0, max(n - 1, 1), brick_size)
+        ends = np.minimum(starts + brick_size, n - 1)
+        bmin = np.minimum(np.minimum.reduceat(bmin, starts, axis=axis),
+                          bmin.take(ends, axis=axis))
+        bmax = np.maximum(np.maximum.reduceat(bmax, starts, axis=axis),
+                          bmax.take(ends, axis=axis))
+    return bmin, bmax
+
+
+def _isosurface_slab(data, level, z0, z1):
+    """ Compute the part of the isosurface in the cells z0..z1-1 along
+    the first axis.
+
+    The vertexes are numbered in C order of (z, y, x, axis) of the cut
+    grid edges, including those on plane z1 (which is also the first
+    plane of the next slab). Returns the vertexes, the faces (with slab
+    local indexes) and the number of vertexes owned by this slab, i.e.
+    the ones not on plane z1 (unless this is the last slab).
+    """
+    last = z1 == data.shape[0] - 1
+    # one extra plane is needed to find the cut edges that leave plane z1
+    block = data[z0:z1 + (1 if last else 2)]
+    edge_inds, vertexes, faces = _marching_cubes(block[np.newaxis], level,
+                                                 [(z0, 0, 0)], z1 - z0)
+    n_own = (len(edge_inds) if last else
+             np.searchsorted(edge_inds, (z1 - z0) * block[0].size * 3))
+    return vertexes, faces, n_own
+
+
+def _marching_cubes(blocks, level, origins, n_cells=None):
+    """ Run marching cubes on a stack of equally sized blocks.
+
+    *blocks*   4D array (n, nz, ny, nx) of sub-volumes
+    *level*    The level at which to generate an isosurface
+    *origins*  The (n, 3) positions of the blocks in the volume
+    *n_cells*  The number of cells along the first axis of a block (by
+               default nz - 1). If smaller, the next plane is only used to
+               find the cut edges leaving the last plane of cells.
+
+    Returns the flat indexes of the cut edges into an array of shape
+    (n, n_cells + 1, ny, nx, 3) (in increasing order), the vertex
+    coordinates and the faces.
+    """
     (face_shift_tables, edge_shifts, 
      edge_table, n_table_faces) = _get_data_cache()
+    blocks = np.ascontiguousarray(blocks)
+    n, nz, ny, nx = blocks.shape
+    n_cells = nz - 1 if n_cells is None else n_cells
+    n_planes = n_cells + 1
     
     ## mark everything below the isosurface level
-    mask = data < level
+    mask = blocks < level
     
     ### make eight sub-fields and compute indexes for grid cells
-    index = np.zeros([x-1 for x in data.shape], dtype=np.ubyte)
-    fields = np.empty((2, 2, 2), dtype=object)
+    index = np.zeros((n, n_cells, ny - 1, nx - 1), dtype=np.ubyte)
     slices = [slice(0, -1), slice(1, None)]
+    cell_mask = mask[:, :n_planes]
     for i in [0, 1]:
         for j in [0, 1]:
             for k in [0, 1]:
-                fields[i, j, k] = mask[slices[i], slices[j], slices[k]]
+                field = cell_mask[:, slices[i], slices[j], slices[k]]
                 # this is just to match Bourk's vertex numbering scheme:
                 vertIndex = i - 2*j*i + 3*j + 4*k
-                index += fields[i, j, k] * 2**vertIndex
+                index += field * np.ubyte(2**vertIndex)
     
-    ### Generate table of edges that have been cut
-    cut_edges = np.zeros([x+1 for x in index.shape]+[3], dtype=np.uint32)
-    edges = edge_table[index]
-    for i, shift in enumerate(edge_shifts[:12]):        
-        slices = [slice(shift[j], cut_edges.shape[j]+(shift[j]-1)) 
-                  for j in range(3)]
-        cut_edges[slices[0], slices[1], slices[2], shift[3]] += edges & 2**i
+    # Find the grid edges that are cut: those whose end points are on
+    # different sides of the level
+    cut_edges = np.zeros((n, n_planes, ny, nx, 3), dtype=np.bool_)
+    nz_cut = min(n_planes, nz - 1)
+    np.not_equal(mask[:, :nz_cut], mask[:, 1:nz_cut + 1],
+                 out=cut_edges[:, :nz_cut, ..., 0])
+    np.not_equal(cell_mask[:, :, :-1], cell_mask[:, :, 1:],
+                 out=cut_edges[:, :, :-1, :, 1])
+    np.not_equal(cell_mask[..., :-1], cell_mask[..., 1:],
+                 out=cut_edges[..., :-1, 2])
+    del mask, cell_mask
     
     # for each cut edge, interpolate to see where exactly the edge is cut and 
     # generate vertex positions
-    m = cut_edges > 0
-    vertex_inds = np.argwhere(m)  # argwhere is slow!
-    vertexes = vertex_inds[:, :3].astype(np.float32)
-    dataFlat = data.reshape(data.shape[0]*data.shape[1]*data.shape[2])
+    edge_inds = np.flatnonzero(cut_edges)
+    points, axes = np.divmod(edge_inds, 3)
+    b, z, y, x = np.unravel_index(points, (n, n_planes, ny, nx))
+    vertexes = np.empty((len(edge_inds), 3), dtype=np.float32)
+    vertexes[:] = np.column_stack([z, y, x]) + np.asarray(origins)[b]
+    points = np.ravel_multi_index((b, z, y, x), blocks.shape)
+    del b, z, y, x
+    data_flat = blocks.ravel()
+    for i, step in enumerate([ny * nx, nx, 1]):
+        vim = axes == i
+        v1 = data_flat[points[vim]]
+        v2 = data_flat[points[vim] + step]
+        vertexes[vim, i] += (level-v1) / (v2-v1)
+    del data_flat, points, axes
     
     ## re-use the cut_edges array as a lookup table for vertex IDs
-    cut_edges[vertex_inds[:, 0], 
-              vertex_inds[:, 1], 
-              vertex_inds[:, 2], 
-              vertex_inds[:, 3]] = np.arange(vertex_inds.shape[0])
-    
-    for i in [0, 1, 2]:
-        vim = vertex_inds[:, 3] == i
-        vi = vertex_inds[vim, :3]
-        vi_flat = (vi * (np.array(data.strides[:3]) // 
-                         data.itemsize)[np.newaxis, :]).sum(axis=1)
-        v1 = dataFlat[vi_flat]
-        v2 = dataFlat[vi_flat + data.strides[i]//data.itemsize]
-        vertexes[vim, i] += (level-v1) / (v2-v1)
+    lookup = np.zeros(cut_edges.size, dtype=np.uint32)
+    lookup[edge_inds] = np.arange(len(edge_inds), dtype=np.uint32)
+    del cut_edges
     
     ### compute the set of vertex indexes for each face. 
-    
-    ## This works, but runs a bit slower.
-    ## all cells with at least one face:
-    #cells = np.argwhere((index != 0) & (index != 255))  
-    #cellInds = index[cells[:, 0], cells[:, 1], cells[:, 2]]
-    #verts = faceTable[cellInds]
-    #mask = verts[..., 0, 0] != 9
-    ## we now have indexes into cut_edges:
-    #verts[...,:3] += cells[:, np.newaxis, np.newaxis,:]
-    #verts = verts[mask]
-    ## and these are the vertex indexes we want:
-    #faces = cut_edges[verts[..., 0], verts[..., 1], verts[..., 2], 
-    #                  verts[..., 3]]  
-    
     # To allow this to be vectorized efficiently, we count the number of faces 
     # in each grid cell and handle each group of cells with the same number 
     # together.
     
     # determine how many faces to assign to each grid cell
-    n_faces = n_table_faces[index]
-    tot_faces = n_faces.sum()
-    faces = np.empty((tot_faces, 3), dtype=np.uint32)
+    n_faces = n_table_faces[index].ravel()
+    index = index.ravel()
+    faces = np.empty((int(n_faces.sum(dtype=np.int64)), 3), dtype=np.uint32)
     ptr = 0
-    
-    ## this helps speed up an indexing operation later on
-    cs = np.array(cut_edges.strides)//cut_edges.itemsize
-    cut_edges = cut_edges.flatten()
-
-    ## this, strangely, does not seem to help.
-    #ins = np.array(index.strides)/index.itemsize
-    #index = index.flatten()
-
+    # strides of the lookup table in (block, z, y, x, axis)
+    cs = np.array([n_planes * ny * nx * 3, ny * nx * 3, nx * 3, 3, 1],
+                  dtype=np.int64)
     for i in range(1, 6):
-        # expensive:
-        # all cells which require i faces  (argwhere is expensive)
-        cells = np.argwhere(n_faces == i)  
+        cells = np.flatnonzero(n_faces == i)
         if cells.shape[0] == 0:
             continue
         # index values of cells to process for this round:
-        cellInds = index[cells[:, 0], cells[:, 1], cells[:, 2]]
-        
-        # expensive:
-        verts = face_shift_tables[i][cellInds]
-        # we now have indexes into cut_edges:
-        verts[..., :3] += cells[:, np.newaxis, np.newaxis, :]
-        verts = verts.reshape((verts.shape[0]*i,)+verts.shape[2:])
-        
-        # expensive:
-        verts = (verts * cs[np.newaxis, np.newaxis, :]).sum(axis=2)
-        vert_inds = cut_edges[verts]
-        nv = vert_inds.shape[0]
-        faces[ptr:ptr+nv] = vert_inds  # .reshape((nv, 3))
+        cellInds = index[cells]
+        # offsets of the face vertexes in the lookup table, relative to
+        # the first vertex of the cell
+        shifts = np.dot(face_shift_tables[i].astype(np.int64), cs[1:])
+        cells = np.unravel_index(cells, (n, n_cells, ny - 1, nx - 1))
+        base = np.dot(np.column_stack(cells), cs[:4])
+        verts = shifts[cellInds] + base[:, np.newaxis, np.newaxis]
+        nv = verts.shape[0] * i
+        faces[ptr:ptr+nv] = lookup[verts.reshape(nv, 3)]
         ptr += nv
         
-    return vertexes, faces
+    return edge_inds, vertexes, faces
 
 
 def _get_data_cache():
@@ -461,7 +649,7 @@ def _get_data_cache():
             faceTableI = np.zeros((len(triTable), i*3), dtype=np.ubyte)
             faceTableInds = np.argwhere(n_table_faces == i)
             faceTableI[faceTableInds[:, 0]] = np.array([triTable[j] for j in 
-                                                        faceTableInds])
+                                                        faceTableInds[:, 0]])
             faceTableI = faceTableI.reshape((len(triTable), i, 3))
             face_shift_tables.append(edge_shifts[faceTableI])
             
@@ -4,7 +4,16 @@
 
 import numpy as np
 
-from ..ext.six.moves import xrange
+
+def _face_adjacency(vertex_ids, n_vertices, n_corners=3):
+    """Compute the (offsets, faces) vertex-to-face adjacency from the
+    flattened (Nf * n_corners,) array of face vertex indices"""
+    vertex_ids = np.asarray(vertex_ids, dtype=np.intp)
+    order = np.argsort(vertex_ids, kind='mergesort')
+    counts = np.bincount(vertex_ids, minlength=n_vertices)
+    offsets = np.zeros(n_vertices + 1, dtype=np.intp)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets, order // n_corners
 
 
 class MeshData(object):
@@ -58,7 +67,7 @@ class MeshData(object):
         self._faces = None  # Nx3 indices into self._vertices, 3 verts/face
         self._edges = None  # Nx2 indices into self._vertices, 2 verts/edge
         # inverse mappings
-        self._vertex_faces = None  # maps vertex ID to a list of face IDs
+        self._vertex_faces = None  # (offsets, face IDs) for each vertex
         self._vertex_edges = None  # maps vertex ID to a list of edge IDs
 
         ## Per-vertex data
@@ -226,18 +235,19 @@ class MeshData(object):
         """
         if self._vertex_normals is None:
             faceNorms = self.face_normals()
-            vertFaces = self.vertex_faces()
-            self._vertex_normals = np.empty(self._vertices.shape,
-                                            dtype=np.float32)
-            for vindex in xrange(self._vertices.shape[0]):
-                faces = vertFaces[vindex]
-                if len(faces) == 0:
-                    self._vertex_normals[vindex] = (0, 0, 0)
-                    continue
-                norms = faceNorms[faces]  # get all face normals
-                norm = norms.sum(axis=0)  # sum normals
-                norm /= (norm**2).sum()**0.5  # and re-normalize
-                self._vertex_normals[vindex] = norm
+            offsets, faces = self.vertex_face_adjacency()
+            # sum the normals of the faces around each vertex
+            counts = np.diff(offsets)
+            norms = np.zeros((len(counts), 3), dtype=np.float32)
+            if len(faces) > 0:
+                starts = np.minimum(offsets[:-1], len(faces) - 1)
+                norms[:] = np.add.reduceat(faceNorms[faces], starts)
+                norms[counts == 0] = 0
+            # and re-normalize
+            lengths = np.sqrt((norms ** 2).sum(axis=1))
+            lengths[lengths == 0] = 1
+            norms /= lengths[:, np.newaxis]
+            self._vertex_normals = norms
 
         if indexed is None:
             return self._vertex_normals
@@ -338,29 +348,26 @@ class MeshData(object):
 
         ## I think generally this should be discouraged..
         faces = self._vertices_indexed_by_faces
-        verts = {}  # used to remember the index of each vertex position
-        self._faces = np.empty(faces.shape[:2], dtype=np.uint)
-        self._vertices = []
-        self._vertex_faces = []
+        verts = faces.reshape(-1, faces.shape[-1])
+        # quantize to ensure nearly-identical points will be merged; adding
+        # zero turns -0.0 into 0.0 so that the keys compare bytewise
+        keys = np.round(verts.astype(np.float64) * 1e14) + 0.
+        keys = np.ascontiguousarray(keys).view(
+            np.dtype((np.void, keys.dtype.itemsize * keys.shape[1])))[:, 0]
+        _, first, inverse = np.unique(keys, return_index=True,
+                                      return_inverse=True)
+        # number the vertices in order of first appearance
+        order = np.argsort(first)
+        rank = np.empty(len(order), dtype=np.intp)
+        rank[order] = np.arange(len(order))
+        inverse = rank[inverse]
+
+        self._vertices = verts[first[order]].astype(np.float32)
+        self._faces = inverse.reshape(faces.shape[:2]).astype(np.uint)
+        self._vertex_faces = _face_adjacency(inverse, len(order),
+                                             faces.shape[1])
         self._face_normals = None
         self._vertex_normals = None
-        for i in xrange(faces.shape[0]):
-            face = faces[i]
-            for j in range(face.shape[0]):
-                pt = face[j]
-                # quantize to ensure nearly-identical points will be merged
-                pt2 = tuple([round(x*1e14) for x in pt])
-                index = verts.get(pt2, None)
-                if index is None:
-                    #self._vertices.append(QtGui.QVector3D(*pt))
-                    self._vertices.append(pt)
-                    self._vertex_faces.append([])
-                    index = len(self._vertices)-1
-                    verts[pt2] = index
-                # track which vertices belong to which faces
-                self._vertex_faces[index].append(i)
-                self._faces[i, j] = index
-        self._vertices = np.array(self._vertices, dtype=np.float32)
 
     #def _setUnindexedFaces(self, faces, vertices, vertex_colors=None,
         #                   face_colors=None):
@@ -375,14 +382,31 @@ class MeshData(object):
 
     def vertex_faces(self):
         """
-        List mapping each vertex index to a list of face indices that use it.
+        List mapping each vertex index to an array of face indices that
+        use it. See vertex_face_adjacency() for a compact version.
+        """
+        offsets, faces = self.vertex_face_adjacency()
+        return np.split(faces, offsets[1:-1])
+
+    def vertex_face_adjacency(self):
+        """
+        Return the faces that use each vertex in compressed form.
+
+        Returns
+        -------
+        offsets : ndarray, shape (Nv + 1,)
+            The faces of vertex i are ``faces[offsets[i]:offsets[i + 1]]``.
+        faces : ndarray, shape (3 * Nf,)
+            Face indices, grouped by vertex and sorted within each group.
         """
         if self._vertex_faces is None:
-            self._vertex_faces = [[] for i in xrange(len(self.vertices()))]
-            for i in xrange(self._faces.shape[0]):
-                face = self._faces[i]
-                for ind in face:
-                    self._vertex_faces[ind].append(i)
+            faces = self.faces()
+            if faces is None:
+                self.vertices()  # computes faces from indexed vertices
+                faces = self.faces()
+            self._vertex_faces = _face_adjacency(faces.ravel(),
+                                                 len(self.vertices()),
+                                                 faces.shape[1])
         return self._vertex_faces
 
     #def reverseNormals(self):
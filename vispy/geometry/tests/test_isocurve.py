@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Vispy Development Team.
+# Distributed under the (new) BSD License. See LICENSE.txt for more info.
+import numpy as np
+from numpy.testing import assert_array_equal, assert_allclose
+from nose.tools import assert_equal, assert_true
+
+from vispy.geometry.isocurve import (isocurve, isocurve_paths,
+                                     isocurve_segments)
+
+
+def _circle_data():
+    i, j = np.ogrid[:20, :30]
+    # the cell centers are at +0.5
+    return np.sqrt((i - 9.5) ** 2 + (j - 14.5) ** 2)
+
+
+def test_isocurve():
+    """Test isocurve segments"""
+    data = _circle_data()
+    lines = isocurve(data, 5.)
+    assert_true(len(lines) > 20)
+    points = np.array(lines)
+    assert_equal(points.shape[1:], (2, 2))
+    radii = np.sqrt(((points - [10., 15.]) ** 2).sum(axis=-1))
+    assert_allclose(radii, 5., atol=0.1)
+    assert_equal(isocurve(data, 100.), [])
+    # curves that leave the data are extended to its edges
+    points = np.array(isocurve(data, 12., extend_to_edge=True))
+    assert_equal(points[..., 0].min(), 0)
+    assert_equal(points[..., 0].max(), 20)
+    assert_true(3 < points[..., 1].min() < points[..., 1].max() < 27)
+    # multiple levels at once
+    both = isocurve(data, [5., 3.])
+    assert_equal(len(both), 2)
+    assert_equal(both[0], lines)
+    assert_equal(both[1], isocurve(data, 3.))
+    segments, level_index = isocurve_segments(data, [5., 3.])
+    for i in range(2):
+        assert_array_equal(segments[level_index == i], np.array(both[i]))
+    # integer data does not wrap around when interpolating
+    data = np.zeros((6, 6), np.uint8)
+    data[2:4, 2:4] = 255
+    segments, _ = isocurve_segments(data, 100.)
+    assert_equal(len(segments), 8)
+    assert_allclose(segments, isocurve_segments(data.astype(float), 100.)[0])
+
+
+def test_isocurve_connected():
+    """Test connecting isocurve segments into paths"""
+    data = _circle_data()
+    data[:, 15:] = 100 - data[:, 15:]  # an open curve for level 60
+    paths = isocurve(data, [5., 60.], connected=True)
+    # a closed half circle
+    assert_equal(len(paths[0]), 1)
+    path = np.array(paths[0][0])
+    assert_array_equal(path[0], path[-1])
+    assert_true(path[:, 1].max() < 16)
+    # each segment shows up once in the path
+    segments = isocurve(data, 5.)
+    assert_equal(len(path) - 1, len(segments))
+    steps = np.sqrt((np.diff(path, axis=0) ** 2).sum(axis=1))
+    assert_true(steps.max() < 1.5)
+    # an open path from edge to edge
+    assert_equal(len(paths[1]), 1)
+    path = np.array(paths[1][0])
+    assert_equal(sorted([path[0, 0], path[-1, 0]]), [0.5, 19.5])
+
+    pos, connect, level_index = isocurve_paths(data, [60., 5.])
+    assert_equal(len(connect), len(pos) - 1)
+    assert_equal((~connect).sum(), 1)
+    assert_equal(sorted(set(level_index)), [0, 1])
+    pos, connect, level_index = isocurve_paths(data, 1000.)
+    assert_equal(pos.shape, (0, 2))
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Vispy Development Team.
+# Distributed under the (new) BSD License. See LICENSE.txt for more info.
+import numpy as np
+from numpy.testing import assert_array_equal, assert_allclose
+from nose.tools import assert_equal, assert_true
+
+from vispy.geometry.isosurface import (isosurface, iter_isosurface,
+                                       IsosurfaceExtractor)
+
+
+def _sphere_volume(shape=(21, 18, 17)):
+    z, y, x = np.ogrid[:shape[0], :shape[1], :shape[2]]
+    return np.sqrt((z - 10.) ** 2 + (y - 8.5) ** 2 + (x - 8.) ** 2)
+
+
+def test_isosurface():
+    """Test isosurface of a sphere"""
+    data = _sphere_volume()
+    verts, faces = isosurface(data, 6.)
+    assert_equal(verts.shape[1], 3)
+    assert_equal(faces.shape[1], 3)
+    assert_true(len(faces) > 100)
+    assert_array_equal(np.unique(faces), np.arange(len(verts)))
+    radii = np.sqrt(((verts - [10., 8.5, 8.]) ** 2).sum(axis=1))
+    assert_allclose(radii, 6., atol=0.1)
+    # closed surface: each edge is shared by exactly two faces
+    edges = np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    _, inverse = np.unique(edges[:, 0] * len(verts) + edges[:, 1],
+                           return_inverse=True)
+    assert_true(np.all(np.bincount(inverse) == 2))
+    # no surface
+    verts, faces = isosurface(data, 100.)
+    assert_equal(verts.shape, (0, 3))
+    assert_equal(faces.shape, (0, 3))
+
+
+def test_isosurface_chunks():
+    """Test computing an isosurface in slabs"""
+    data = _sphere_volume()
+    verts, faces = isosurface(data, 6.)
+    sorted_faces = np.sort(np.sort(faces, axis=1), axis=0)
+    for chunk_size, n_jobs in [(1, 1), (3, 1), (4, 3), (100, 2)]:
+        blocks = list(iter_isosurface(data, 6., chunk_size, n_jobs))
+        n_verts = 0
+        for block_verts, block_faces in blocks:
+            n_verts += len(block_verts)
+            # faces only refer to vertexes that were already yielded
+            assert_true(len(block_faces) == 0 or
+                        block_faces.max() < n_verts)
+        verts2 = np.concatenate([block[0] for block in blocks])
+        faces2 = np.concatenate([block[1] for block in blocks])
+        assert_array_equal(verts2, verts)  # shared vertexes at the seams
+        assert_array_equal(np.sort(np.sort(faces2, axis=1), axis=0),
+                           sorted_faces)
+        verts2, faces2 = isosurface(data, 6., chunk_size, n_jobs)
+        assert_array_equal(verts2, verts)
+
+
+def test_isosurface_extractor():
+    """Test extracting isosurfaces from bricks with IsosurfaceExtractor"""
+    data = _sphere_volume()
+    data[0, 0, 0] = np.nan
+    for brick_size in (1, 4, 16, 32):
+        extractor = IsosurfaceExtractor(data, brick_size, cache_size=2)
+        n_bricks = -(-(np.array(data.shape) - 1) // brick_size)
+        assert_equal(extractor.active_bricks(6.).shape, tuple(n_bricks))
+        for level in (3., 6., 100.):
+            verts, faces = isosurface(data, level)
+            verts2, faces2 = extractor.isosurface(level)
+            assert_array_equal(verts2, verts)
+            assert_array_equal(np.sort(np.sort(faces2, axis=1), axis=0),
+                               np.sort(np.sort(faces, axis=1), axis=0))
+    # only bricks that span the level are active
+    extractor = IsosurfaceExtractor(data, 4)
+    active = extractor.active_bricks(3.)
+    for z, y, x in np.ndindex(*active.shape):
+        brick = data[4 * z:4 * z + 5, 4 * y:4 * y + 5, 4 * x:4 * x + 5]
+        assert_equal(active[z, y, x], bool(np.isnan(brick).any() or
+                                           brick.min() < 3. <= brick.max()))
+    assert_true(active.sum() < active.size // 4)
+    # recently used levels are cached
+    result = extractor.isosurface(6.)
+    assert_true(extractor.isosurface(6) is result)
+    for level in range(10):
+        extractor.isosurface(level + 0.5)
+    assert_true(extractor.isosurface(6.) is not result)
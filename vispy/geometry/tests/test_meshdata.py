@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Vispy Development Team.
+# Distributed under the (new) BSD License. See LICENSE.txt for more info.
+import numpy as np
+from numpy.testing import assert_array_equal, assert_allclose
+
+from vispy.geometry import MeshData, create_sphere
+
+
+def test_meshdata_indexed():
+    """Test merging the vertices of face-indexed mesh data"""
+    md = create_sphere(10, 20, radius=2)
+    verts, faces = md.vertices(), md.faces()
+    indexed = MeshData(vertices=verts[faces])
+    # -0.0 and 0.0 are the same vertex
+    indexed._vertices_indexed_by_faces[indexed._vertices_indexed_by_faces
+                                       == 0] = -0.
+    assert_array_equal(indexed.vertices(), verts)
+    assert_array_equal(indexed.faces(), faces)
+
+    # Vertices are numbered in order of first appearance
+    tris = np.array([[[1, 0, 0], [0, 0, 0], [0, 1, 0]],
+                     [[0, 1, 0], [0, 0, 0], [0, 0, 1]]], np.float32)
+    md = MeshData(vertices=tris)
+    assert_array_equal(md.vertices(), [[1, 0, 0], [0, 0, 0], [0, 1, 0],
+                                       [0, 0, 1]])
+    assert_array_equal(md.faces(), [[0, 1, 2], [2, 1, 3]])
+
+
+def test_meshdata_adjacency():
+    """Test the vertex-to-face adjacency and vertex normals"""
+    verts = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1],
+                      [5, 5, 5]], np.float32)
+    faces = np.array([[0, 1, 2], [0, 3, 1], [0, 2, 3]], np.uint32)
+    md = MeshData(vertices=verts, faces=faces)
+    offsets, face_ids = md.vertex_face_adjacency()
+    assert_array_equal(offsets, [0, 3, 5, 7, 9, 9])
+    assert_array_equal(face_ids, [0, 1, 2, 0, 1, 0, 2, 1, 2])
+    assert_array_equal(md.vertex_faces()[1], [0, 1])
+    assert_array_equal(md.vertex_faces()[4], [])
+
+    norms = md.vertex_normals()
+    assert_allclose(norms[0], np.ones(3) / np.sqrt(3), rtol=1e-6)
+    assert_allclose(norms[1], [0, 1, 1] / np.sqrt(2), rtol=1e-6)
+    assert_array_equal(norms[4], [0, 0, 0])  # unused vertex
+    assert_allclose(md.vertex_normals(indexed='faces'), norms[faces])
@@ -501,6 +501,41 @@ def test_edge_event():
     t.triangulate()
     
 
+def _tri_area(pts, tris):
+    a, b, c = pts[tris[:, 0]], pts[tris[:, 1]], pts[tris[:, 2]]
+    return 0.5 * np.abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) -
+                        (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])).sum()
+
+
+def test_triangulate_area():
+    # square with a square hole
+    pts = np.array([[0, 0], [4, 0], [4, 4], [0, 4],
+                    [1, 1], [3, 1], [3, 3], [1, 3]], dtype=float)
+    edges = np.array([[0, 1], [1, 2], [2, 3], [3, 0],
+                      [4, 5], [5, 6], [6, 7], [7, 4]])
+    for fast in (True, False):
+        t = T(pts, edges)
+        t.triangulate(fast=fast)
+        assert_array_almost_equal(_tri_area(t.pts, t.tris), 12)
+    # edges given twice cancel out
+    t = T(pts, np.vstack([edges, edges[4:]]))
+    t.triangulate()
+    assert_array_almost_equal(_tri_area(t.pts, t.tris), 16)
+
+    # star-shaped polygon with many vertices
+    n = 5000
+    theta = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    r = 1 + 0.3 * np.sin(7 * theta)
+    pts = np.column_stack([r * np.cos(theta), r * np.sin(theta)])
+    edges = np.column_stack([np.arange(n), np.roll(np.arange(n), -1)])
+    t = T(pts, edges)
+    t.triangulate()
+    assert t.tris.shape == (n - 2, 3)
+    x, y = pts[:, 0], pts[:, 1]
+    area = 0.5 * (np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+    assert_array_almost_equal(_tri_area(t.pts, t.tris), area, 5)
+
+
 if __name__ == '__main__':
     #test_edge_intersections()
     #test_merge_duplicate_points()
@@ -2,9 +2,12 @@
 from __future__ import division, print_function
 
 import numpy as np
-from ..ext.ordereddict import OrderedDict
+from collections import deque
 from itertools import permutations
 
+from ..ext.ordereddict import OrderedDict
+from ..util import logger
+
 
 class Triangulation(object):
     """Constrained delaunay triangulation
@@ -23,9 +26,11 @@ class Triangulation(object):
 
     Notes
     -----
-    * Delaunay legalization is not yet implemented. This produces a proper
+    * Delaunay legalization is not yet implemented in the sweep-line
+      algorithm (``triangulate(fast=False)``). This produces a proper
       triangulation, but adding legalisation would produce fewer thin
-      triangles.
+      triangles. The default algorithm does produce a constrained Delaunay
+      triangulation.
     * The pts and edges arrays may be modified.
     """
     def __init__(self, pts, edges):
@@ -107,7 +112,31 @@ class Triangulation(object):
         # stored as (a, b): c and (b, a): d
         self.edges_lookup = {}
 
-    def triangulate(self):
+    def triangulate(self, fast=True):
+        """Compute the triangulation
+
+        Afterwards, ``tris`` is an (M, 3) array of indices into ``pts``,
+        one row per triangle inside the polygon(s) formed by the edges.
+
+        Parameters
+        ----------
+        fast : bool
+            If True (default), compute the Delaunay triangulation with a
+            radial sweep, insert the edges and select the triangles inside
+            with _HalfEdgeMesh. Then ``pts`` are the points after splitting
+            intersecting edges and merging duplicates. If False, use the
+            sweep-line algorithm of Domiter and Žalik, which is much slower
+            for large polygons. Then ``pts`` also contains two artificial
+            points and is sorted by y.
+        """
+        if not fast:
+            return self._sweep()
+        self.normalize()
+        mesh = _HalfEdgeMesh(self.pts)
+        mesh.insert_edges(self.edges)
+        self.tris = mesh.interior_triangles()
+
+    def _sweep(self):
         self.initialize()
         
         pts = self.pts
@@ -592,47 +621,89 @@ class Triangulation(object):
         """
         edges = self.pts[self.edges]
         cuts = {}  # { edge: [(intercept, point), ...], ... }
-        for i in range(edges.shape[0]-1):
-            # intersection of edge i onto all others
-            int1 = self.intersect_edge_arrays(edges[i:i+1], edges[i+1:])
-            # intersection of all edges onto edge i
-            int2 = self.intersect_edge_arrays(edges[i+1:], edges[i:i+1])
-        
-            # select for pairs that intersect
-            err = np.geterr()
-            np.seterr(divide='ignore', invalid='ignore')
-            try:
-                mask1 = (int1 >= 0) & (int1 <= 1)
-                mask2 = (int2 >= 0) & (int2 <= 1)
-                mask3 = mask1 & mask2  # all intersections
-            finally:
-                np.seterr(**err)
-            
-            # compute points of intersection
-            inds = np.argwhere(mask3)[:, 0]
-            if len(inds) == 0:
-                continue
-            h = int2[inds][:, np.newaxis]
-            pts = (edges[i, 0][np.newaxis, :] * (1.0 - h) + 
-                   edges[i, 1][np.newaxis, :] * h)
-            
-            # record for all edges the location of cut points
-            edge_cuts = cuts.setdefault(i, [])
-            for j, ind in enumerate(inds):
-                if 0 < int2[ind] < 1:
-                    edge_cuts.append((int2[ind], pts[j]))
-                if 0 < int1[ind] < 1:
-                    other_cuts = cuts.setdefault(ind+i+1, [])
-                    other_cuts.append((int1[ind], pts[j]))
-        
+        if edges.shape[0] < 2:
+            return cuts
+
+        # Only pairs of edges with overlapping bounding boxes can intersect.
+        # The candidate pairs are the edges whose boxes overlap the same
+        # cell of a grid, with cells about the size of a typical edge.
+        lo = edges.min(axis=1)
+        hi = edges.max(axis=1)
+        tol = np.abs(edges).max() * 1e-6
+        size = np.median((hi - lo).max(axis=1))
+        if not size > tol:
+            size = max((hi - lo).max(), tol, 1e-30)
+        start = np.floor((lo - tol - lo.min(axis=0)) / size).astype(np.int64)
+        stop = np.floor((hi + tol - lo.min(axis=0)) / size).astype(np.int64)
+        nx, ny = (stop - start + 1).T
+        count = nx * ny
+        edge = np.repeat(np.arange(len(edges)), count)
+        k = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        cell = ((start[edge, 0] + k // ny[edge]) * (stop[:, 1].max() + 1) +
+                start[edge, 1] + k % ny[edge])
+        order = np.argsort(cell, kind='mergesort')
+        cell, edge = cell[order], edge[order]
+        i, j = [], []
+        for d in range(1, len(cell)):
+            same = cell[d:] == cell[:-d]
+            if not same.any():
+                break
+            i.append(edge[:-d][same])
+            j.append(edge[d:][same])
+        if not i:
+            return cuts
+        i, j = np.concatenate(i), np.concatenate(j)
+        pair = np.unique(np.minimum(i, j) * len(edges) + np.maximum(i, j))
+        i, j = pair // len(edges), pair % len(edges)
+        overlap = np.all((lo[i] <= hi[j] + tol) & (lo[j] <= hi[i] + tol),
+                         axis=1)
+        i, j = i[overlap], j[overlap]
+
+        # limit the number of pairs tested at once
+        records = [self._intersect_edge_pairs(edges, i[k:k + 2**20],
+                                              j[k:k + 2**20])
+                   for k in range(0, max(len(i), 1), 2**20)]
+        keys, edge, partner, intercept, pts = [np.concatenate(x) for x
+                                               in zip(*records)]
         # sort all cut lists by intercept, remove duplicates
-        for k, v in cuts.items():
-            v.sort(key=lambda x: x[0])
-            for i in range(len(v)-2, -1, -1):
-                if v[i][0] == v[i+1][0]:
-                    v.pop(i+1)
+        order = np.lexsort((partner, intercept, edge))
+        edge, intercept, pts = edge[order], intercept[order], pts[order]
+        dup = np.zeros(len(edge), dtype=bool)
+        dup[1:] = (edge[1:] == edge[:-1]) & (intercept[1:] == intercept[:-1])
+        for k in np.unique(keys).tolist():
+            cuts[k] = []
+        for k, h, pt in zip(edge[~dup].tolist(), intercept[~dup], pts[~dup]):
+            cuts[k].append((h, pt))
         return cuts
 
+    def _intersect_edge_pairs(self, edges, i, j):
+        """Intersect edges[i] with edges[j] (i < j), and return the indexes
+        of the edges that intersect, and the (edge, partner, intercept, point)
+        of each cut inside an edge.
+        """
+        # intersection of edges i onto edges j and of edges j onto edges i
+        int1 = self.intersect_edge_arrays(edges[i], edges[j])
+        int2 = self.intersect_edge_arrays(edges[j], edges[i])
+
+        # select for pairs that intersect
+        with np.errstate(invalid='ignore'):
+            mask = (int1 >= 0) & (int1 <= 1) & (int2 >= 0) & (int2 <= 1)
+            i, j, int1, int2 = i[mask], j[mask], int1[mask], int2[mask]
+            cut1 = (int1 > 0) & (int1 < 1)
+            cut2 = (int2 > 0) & (int2 < 1)
+
+        # compute points of intersection
+        h = int2[:, np.newaxis]
+        pts = edges[i, 0] * (1.0 - h) + edges[i, 1] * h
+
+        # record for all edges the location of cut points
+        keys = np.concatenate([i, j[cut1]])
+        edge = np.concatenate([i[cut2], j[cut1]])
+        partner = np.concatenate([j[cut2], i[cut1]])
+        intercept = np.concatenate([int2[cut2], int1[cut1]])
+        pts = np.concatenate([pts[cut2], pts[cut1]])
+        return keys, edge, partner, intercept, pts
+
     def split_intersecting_edges(self):
         # we can do all intersections at once, but this has excessive memory
         # overhead.
@@ -680,43 +751,27 @@ class Triangulation(object):
             self.edges = np.append(self.edges, add_edges, axis=0)
 
     def merge_duplicate_points(self):
-        # generate a list of all pairs (i,j) of identical points
-        dups = []
-        for i in range(self.pts.shape[0]-1):
-            test_pt = self.pts[i:i+1]
-            comp_pts = self.pts[i+1:]
-            eq = test_pt == comp_pts
-            eq = eq[:, 0] & eq[:, 1]
-            for j in np.argwhere(eq)[:, 0]:
-                dups.append((i, i+1+j))
-
-        dups_arr = np.array(dups)
-        # remove duplicate points
-        pt_mask = np.ones(self.pts.shape[0], dtype=bool)
-        for i, inds in enumerate(dups_arr):
-            # remove j from points
-            # (note we pull the index from the original dups instead of 
-            # dups_arr because the indexes in pt_mask do not change)
-            pt_mask[dups[i][1]] = False
-            
-            i, j = inds
-            
-            # rewrite edges to use i instead of j
-            self.edges[self.edges == j] = i
-            
-            #assert not np.any(self.edges[:,0] == self.edges[:,1])
-            
-            # decrement all point indexes > j
-            self.edges[self.edges > j] -= 1
-            dups_arr[dups_arr > j] -= 1
-            #assert not np.any(self.edges[:,0] == self.edges[:,1])
-        
+        # sort the points so that identical points are neighbors (a stable
+        # sort, so the first of identical points has the lowest index)
+        order = np.lexsort((self.pts[:, 1], self.pts[:, 0]))
+        sorted_pts = self.pts[order]
+        new = np.ones(len(order), dtype=bool)
+        new[1:] = np.any(sorted_pts[1:] != sorted_pts[:-1], axis=1)
+
+        # map each point to the first point identical to it
+        first = np.empty(len(order), dtype=np.intp)
+        first[order] = order[new][np.cumsum(new) - 1]
+        pt_mask = first == np.arange(len(order))
+
+        # rewrite edges to use the remaining points
+        index = (np.cumsum(pt_mask) - 1)[first]
+        self.edges = index.astype(self.edges.dtype)[self.edges]
         self.pts = self.pts[pt_mask]
-        
+
         # remove zero-length edges
         mask = self.edges[:, 0] != self.edges[:, 1]
         self.edges = self.edges[mask]
-    
+
     def distance(self, A, B):
         # Distance between points A and B
         n = len(A)
@@ -958,6 +1013,428 @@ class Triangulation(object):
         return k
 
 
+def _orient(xs, ys, a, b, c):
+    """Twice the signed area of triangle (a, b, c); positive if it is
+    counterclockwise"""
+    return ((xs[b] - xs[a]) * (ys[c] - ys[a]) -
+            (ys[b] - ys[a]) * (xs[c] - xs[a]))
+
+
+def _in_circle(xs, ys, a, b, c, d):
+    """True if d is inside the circumcircle of the counterclockwise
+    triangle (a, b, c)"""
+    dx, dy = xs[a] - xs[d], ys[a] - ys[d]
+    ex, ey = xs[b] - xs[d], ys[b] - ys[d]
+    fx, fy = xs[c] - xs[d], ys[c] - ys[d]
+    ap = dx * dx + dy * dy
+    bp = ex * ex + ey * ey
+    cp = fx * fx + fy * fy
+    return (dx * (ey * cp - bp * fy) - dy * (ex * cp - bp * fx) +
+            ap * (ex * fy - ey * fx)) > 0
+
+
+class _HalfEdgeMesh(object):
+    """Constrained Delaunay triangulation stored as half-edges
+
+    The points are triangulated on construction with a radial sweep: they
+    are added in order of distance to a seed triangle, connecting each to
+    the visible part of the convex hull and flipping edges until the
+    triangulation is Delaunay. Hull edges are found through a hash of their
+    angle around the seed. Constraining edges are inserted afterwards by
+    flipping the edges that cross them.
+
+    Triangle t consists of half-edges 3t, 3t+1 and 3t+2. Half-edge e goes
+    from point ``triangles[e]`` to the start of the next half-edge in its
+    triangle (counterclockwise), and ``halfedges[e]`` is the opposite
+    half-edge in the adjacent triangle, or -1 on the convex hull.
+
+    Parameters
+    ----------
+    pts : array
+        Nx2 array of unique points.
+    """
+    def __init__(self, pts):
+        pts = np.asarray(pts, dtype=np.float64)
+        self.n = len(pts)
+        self.xs = pts[:, 0].tolist()
+        self.ys = pts[:, 1].tolist()
+        self.triangles = []
+        self.halfedges = []
+        # number of times each constrained edge was given, by key (see _key)
+        self.constrained = {}
+        self._hull_tri = None  # hull half-edge starting at each point
+        self._vertex_edge = None  # a half-edge starting at each point
+        if self.n >= 3:
+            self._sweep(pts)
+
+    def _key(self, a, b):
+        return min(a, b) * self.n + max(a, b)
+
+    def _sweep(self, pts):
+        xs, ys = self.xs, self.ys
+        n = self.n
+
+        # seed triangle: the point closest to the center of the points, its
+        # nearest neighbor, and the point that makes the smallest circle
+        center = (pts.min(axis=0) + pts.max(axis=0)) / 2.
+        i0 = int(np.argmin(((pts - center) ** 2).sum(axis=1)))
+        dist = ((pts - pts[i0]) ** 2).sum(axis=1)
+        dist[i0] = np.inf
+        i1 = int(np.argmin(dist))
+        d = pts[i1] - pts[i0]
+        e = pts - pts[i0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bl = (d ** 2).sum()
+            cl = (e ** 2).sum(axis=1)
+            f = 0.5 / (d[0] * e[:, 1] - d[1] * e[:, 0])
+            radius = (((e[:, 1] * bl - d[1] * cl) * f) ** 2 +
+                      ((d[0] * cl - e[:, 0] * bl) * f) ** 2)
+        radius[[i0, i1]] = np.inf
+        radius[np.isnan(radius)] = np.inf
+        i2 = int(np.argmin(radius))
+        if not np.isfinite(radius[i2]):
+            return  # all points are collinear
+        if _orient(xs, ys, i0, i1, i2) < 0:
+            i1, i2 = i2, i1
+        ax, ay = pts[i0]
+        dx, dy = pts[i1] - pts[i0]
+        ex, ey = pts[i2] - pts[i0]
+        bl, cl = dx * dx + dy * dy, ex * ex + ey * ey
+        f = 0.5 / (dx * ey - dy * ex)
+        cx, cy = ax + (ey * bl - dy * cl) * f, ay + (dx * cl - ex * bl) * f
+        dist = (pts[:, 0] - cx) ** 2 + (pts[:, 1] - cy) ** 2
+        ids = np.argsort(dist, kind='mergesort').tolist()
+
+        hash_size = int(np.ceil(np.sqrt(n)))
+
+        def hash_key(i):
+            # pseudo-angle of point i around the center
+            dx, dy = xs[i] - cx, ys[i] - cy
+            p = dx / (abs(dx) + abs(dy)) if dx or dy else 0.
+            a = (3. - p if dy > 0 else 1. + p) / 4.
+            return int(a * hash_size) % hash_size
+
+        # counterclockwise convex hull as a linked list; removed points
+        # point to themselves
+        hull_next = list(range(n))
+        hull_prev = list(range(n))
+        hull_tri = self._hull_tri = [-1] * n
+        hull_hash = [-1] * hash_size
+        hull_next[i0], hull_next[i1], hull_next[i2] = i1, i2, i0
+        hull_prev[i0], hull_prev[i1], hull_prev[i2] = i2, i0, i1
+        self._add_triangle(i0, i1, i2, -1, -1, -1)
+        hull_tri[i0], hull_tri[i1], hull_tri[i2] = 0, 1, 2
+        for i in (i0, i1, i2):
+            hull_hash[hash_key(i)] = i
+
+        orient = _orient
+        for i in ids:
+            if i == i0 or i == i1 or i == i2:
+                continue
+            # find a hull edge that is visible from the point, starting
+            # from the hull point with the closest angle
+            key = hash_key(i)
+            for j in range(hash_size):
+                start = hull_hash[(key + j) % hash_size]
+                if start != -1 and start != hull_next[start]:
+                    break
+            start = e = hull_prev[start]
+            while orient(xs, ys, e, hull_next[e], i) >= 0:
+                e = hull_next[e]
+                if e == start:
+                    e = -1
+                    break
+            if e == -1:
+                continue  # on the hull; can only be due to rounding errors
+
+            # connect the point to the visible edge and the visible edges
+            # after and before it
+            q = hull_next[e]
+            t = self._add_triangle(e, i, q, -1, -1, hull_tri[e])
+            hull_tri[e], hull_tri[i] = t, t + 1
+            self._legalize(t + 2)
+            while True:
+                nxt = hull_next[q]
+                if orient(xs, ys, q, nxt, i) >= 0:
+                    break
+                t = self._add_triangle(q, i, nxt, hull_tri[i], -1,
+                                       hull_tri[q])
+                hull_tri[i] = t + 1
+                self._legalize(t + 2)
+                hull_next[q] = q
+                q = nxt
+            if e == start:
+                while True:
+                    prv = hull_prev[e]
+                    if orient(xs, ys, prv, e, i) >= 0:
+                        break
+                    t = self._add_triangle(prv, i, e, -1, hull_tri[e],
+                                           hull_tri[prv])
+                    hull_tri[prv] = t
+                    self._legalize(t + 2)
+                    hull_next[e] = e
+                    e = prv
+
+            hull_prev[i], hull_next[e] = e, i
+            hull_prev[q], hull_next[i] = i, q
+            hull_hash[hash_key(i)] = i
+            hull_hash[hash_key(e)] = e
+        self._hull_tri = None
+
+    def _add_triangle(self, a, b, c, ha, hb, hc):
+        t = len(self.triangles)
+        self.triangles.extend((a, b, c))
+        self.halfedges.extend((ha, hb, hc))
+        for e, h in ((t, ha), (t + 1, hb), (t + 2, hc)):
+            if h != -1:
+                self.halfedges[h] = e
+        return t
+
+    def _link(self, a, b):
+        self.halfedges[a] = b
+        if b != -1:
+            self.halfedges[b] = a
+
+    def _flip(self, a, b):
+        """Flip the edge between the two triangles of half-edges a and b
+
+        Triangles (pr, pl, p0) and (pl, pr, p1), with a going from pr to
+        pl, become (p1, pl, p0) and (p0, pr, p1).
+        """
+        triangles, halfedges = self.triangles, self.halfedges
+        a0, b0 = a - a % 3, b - b % 3
+        ar, bl = a0 + (a + 2) % 3, b0 + (b + 2) % 3
+        p0, p1 = triangles[ar], triangles[bl]
+        har, hbl = halfedges[ar], halfedges[bl]
+        triangles[a], triangles[b] = p1, p0
+        self._link(a, hbl)
+        self._link(b, har)
+        self._link(ar, bl)
+        if self._hull_tri is not None:
+            # hull edges that moved to another half-edge
+            if hbl == -1:
+                self._hull_tri[p1] = a
+            if har == -1:
+                self._hull_tri[p0] = b
+        if self._vertex_edge is not None:
+            for e in (a0, a0 + 1, a0 + 2, b0, b0 + 1, b0 + 2):
+                self._vertex_edge[triangles[e]] = e
+
+    def _legalize(self, a):
+        """Flip edges from half-edge a onward until they are Delaunay"""
+        triangles, halfedges = self.triangles, self.halfedges
+        xs, ys = self.xs, self.ys
+        constrained = self.constrained
+        stack = [a]
+        while stack:
+            a = stack.pop()
+            b = halfedges[a]
+            if b == -1:
+                continue
+            a0, b0 = a - a % 3, b - b % 3
+            pr, pl = triangles[a], triangles[a0 + (a + 1) % 3]
+            p0, p1 = triangles[a0 + (a + 2) % 3], triangles[b0 + (b + 2) % 3]
+            if (not _in_circle(xs, ys, pr, pl, p0, p1) or
+                    (constrained and self._key(pr, pl) in constrained)):
+                continue
+            self._flip(a, b)
+            stack.extend((b0 + (b + 1) % 3, a))
+
+    def _outgoing(self, a):
+        """Iterate over the half-edges starting at point a"""
+        halfedges = self.halfedges
+        e = start = self._vertex_edge[a]
+        while True:
+            yield e
+            e = halfedges[e - e % 3 + (e + 2) % 3]
+            if e == start:
+                return
+            if e == -1:
+                break
+        # on the hull; go around the other way
+        e = halfedges[start]
+        while e != -1:
+            e = e - e % 3 + (e + 1) % 3
+            yield e
+            e = halfedges[e]
+
+    def _find_edge(self, a, b):
+        """Return a half-edge between points a and b, or -1"""
+        triangles = self.triangles
+        for e in self._outgoing(a):
+            if triangles[e - e % 3 + (e + 1) % 3] == b:
+                return e
+            if triangles[e - e % 3 + (e + 2) % 3] == b:
+                return e - e % 3 + (e + 2) % 3
+        return -1
+
+    def insert_edges(self, edges):
+        """Make sure that the edges are in the triangulation, and mark them
+        as constrained"""
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        edges = edges[edges[:, 0] != edges[:, 1]]
+        if len(edges) == 0 or not self.triangles:
+            return
+        keys = (np.minimum(edges[:, 0], edges[:, 1]) * self.n +
+                np.maximum(edges[:, 0], edges[:, 1]))
+        keys, counts = np.unique(keys, return_counts=True)
+
+        # only the edges that are not in the triangulation yet need work
+        tri = np.array(self.triangles)
+        nxt = tri.reshape(-1, 3)[:, [1, 2, 0]].ravel()
+        present = np.in1d(keys, np.minimum(tri, nxt) * self.n +
+                          np.maximum(tri, nxt))
+        for key, count in zip(keys[present].tolist(),
+                              counts[present].tolist()):
+            self._add_constraint(key, count)
+        if present.all():
+            return
+        self._vertex_edge = np.empty(self.n, dtype=np.int64)
+        self._vertex_edge.fill(-1)
+        self._vertex_edge[tri] = np.arange(len(tri))
+        self._vertex_edge = self._vertex_edge.tolist()
+        for key, count in zip(keys[~present].tolist(),
+                              counts[~present].tolist()):
+            self._insert_edge(key // self.n, key % self.n, count)
+        self._vertex_edge = None
+
+    def _add_constraint(self, key, count):
+        self.constrained[key] = self.constrained.get(key, 0) + count
+
+    def _insert_edge(self, a, b, count=1):
+        """Insert the edge from point a to point b, given count times"""
+        xs, ys = self.xs, self.ys
+        triangles = self.triangles
+        while a != b:
+            if self._vertex_edge[a] == -1 or self._vertex_edge[b] == -1:
+                return  # point not in the triangulation
+            # find the triangle at a that the edge passes through, and the
+            # edges it crosses after that
+            crossed = []
+            for e in self._outgoing(a):
+                x = triangles[e - e % 3 + (e + 1) % 3]
+                y = triangles[e - e % 3 + (e + 2) % 3]
+                if x == b or y == b:
+                    c = b
+                    break
+                ox = _orient(xs, ys, a, x, b)
+                oy = _orient(xs, ys, a, y, b)
+                if ox == 0 and ((xs[x] - xs[a]) * (xs[b] - xs[a]) +
+                                (ys[x] - ys[a]) * (ys[b] - ys[a])) > 0:
+                    c = x  # point on the edge; split the edge
+                    break
+                if ox > 0 and oy < 0:
+                    c = self._crossed_edges(a, b, e, crossed)
+                    break
+            else:
+                c = None
+            if c is None:
+                logger.warning('Could not insert edge (%d, %d) in the '
+                               'triangulation' % (a, b))
+                return
+            self._add_constraint(self._key(a, c), count)
+            if crossed and not self._flip_crossed(a, c, crossed):
+                logger.warning('Could not insert edge (%d, %d) in the '
+                               'triangulation' % (a, c))
+                return
+            a = c
+
+    def _crossed_edges(self, a, b, e, crossed):
+        """Collect the edges crossed by the edge from a to b, starting from
+        half-edge e of a. Return the point where the edge ends (b, or a point
+        exactly on the edge), or None."""
+        xs, ys = self.xs, self.ys
+        triangles, halfedges = self.triangles, self.halfedges
+        e = e - e % 3 + (e + 1) % 3
+        while True:
+            # points u, v of the crossed half-edge are right and left of a-b
+            u, v = triangles[e], triangles[e - e % 3 + (e + 1) % 3]
+            crossed.append((u, v))
+            t = halfedges[e]
+            if t == -1 or (u, v) in crossed[:-1][-3:]:
+                return None
+            z = triangles[t - t % 3 + (t + 2) % 3]
+            if z == b:
+                return b
+            o = _orient(xs, ys, a, b, z)
+            if o == 0:
+                return z
+            e = t - t % 3 + ((t + 1) % 3 if o > 0 else (t + 2) % 3)
+
+    def _flip_crossed(self, a, b, crossed):
+        """Flip the edges crossed by the edge from a to b until none cross
+        it anymore, then make the new edges Delaunay"""
+        xs, ys = self.xs, self.ys
+        triangles, halfedges = self.triangles, self.halfedges
+        queue = deque(crossed)
+        new_edges = []
+        n_tries = 0
+        while queue:
+            u, v = queue.popleft()
+            e = self._find_edge(u, v)
+            t = halfedges[e]
+            if e == -1 or t == -1 or self._key(u, v) in self.constrained:
+                return False  # crosses another constrained edge
+            w1 = triangles[e - e % 3 + (e + 2) % 3]
+            w2 = triangles[t - t % 3 + (t + 2) % 3]
+            # the two triangles must form a convex quad to flip the edge
+            if (_orient(xs, ys, w1, w2, u) * _orient(xs, ys, w1, w2, v) >=
+                    0):
+                queue.append((u, v))
+                n_tries += 1
+                if n_tries > 2 * len(queue) ** 2 + 10:
+                    return False
+                continue
+            n_tries = 0
+            self._flip(e, t)
+            if (w1 not in (a, b) and w2 not in (a, b) and
+                    _orient(xs, ys, a, b, w1) * _orient(xs, ys, a, b, w2) < 0):
+                queue.append((w1, w2))
+            else:
+                new_edges.append((w1, w2))
+        for u, v in new_edges:
+            if self._key(u, v) not in self.constrained:
+                self._legalize(self._find_edge(u, v))
+        return True
+
+    def interior_triangles(self):
+        """Return the (M, 3) array of triangles inside the constrained
+        edges (those that are surrounded by an odd number of them)"""
+        tri = np.array(self.triangles, dtype=np.int64)
+        if len(tri) == 0:
+            return np.zeros((0, 3), dtype=int)
+        halfedges = self.halfedges
+        nxt = tri.reshape(-1, 3)[:, [1, 2, 0]].ravel()
+        keys = np.minimum(tri, nxt) * self.n + np.maximum(tri, nxt)
+        # an edge that was given twice does not separate inside from
+        # outside
+        odd = [key for key, count in self.constrained.items() if count % 2]
+        constrained = np.in1d(keys, odd).tolist()
+
+        # find the minimum number of odd constrained edges to cross to get
+        # to each triangle from outside the convex hull
+        depth = [len(tri)] * (len(tri) // 3)
+        queue = deque()
+        for e in np.flatnonzero(np.array(halfedges) == -1).tolist():
+            d = constrained[e]
+            if d < depth[e // 3]:
+                depth[e // 3] = d
+                queue.append(e // 3) if d else queue.appendleft(e // 3)
+        while queue:
+            t = queue.popleft()
+            for e in (3 * t, 3 * t + 1, 3 * t + 2):
+                h = halfedges[e]
+                if h == -1:
+                    continue
+                d = depth[t] + constrained[e]
+                if d < depth[h // 3]:
+                    depth[h // 3] = d
+                    queue.append(h // 3) if constrained[e] else \
+                        queue.appendleft(h // 3)
+        inside = np.array(depth) % 2 == 1
+        return tri.reshape(-1, 3)[inside].astype(int)
+
+
 # Note: using custom #debug instead of logging because 
 # there are MANY messages and logger might be too expensive.
 # After this becomes stable, we might just remove them altogether.
@@ -51,6 +51,7 @@ from .globject import GLObject  # noqa
 from .buffer import VertexBuffer, IndexBuffer  # noqa
 from .initialize import gl_initialize  # noqa
 from .texture import Texture2D, TextureAtlas, Texture3D  # noqa
+from .shared import SharedArray  # noqa
 from .shader import VertexShader, FragmentShader  # noqa
 from .program import Program  # noqa
 from .framebuffer import (FrameBuffer, ColorBuffer, DepthBuffer,  # noqa
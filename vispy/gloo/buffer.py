@@ -11,6 +11,7 @@ from traceback import extract_stack
 
 from . import gl
 from . globject import GLObject
+from .shared import SharedArray
 from ..util import logger
 from ..ext.six import string_types
 
@@ -190,9 +191,13 @@ class Buffer(GLObject):
     def _update_data(self):
         """ Upload all pending data to GPU. """
 
+        # Merge adjacent writes, so that each contiguous region of the
+        # buffer is uploaded with a single call
+        pending = _coalesce_writes(self._pending_data)
+        self._pending_data = []
+
         # Update data
-        while self._pending_data:
-            data, nbytes, offset = self._pending_data.pop(0)
+        for data, nbytes, offset in pending:
 
             # Determine whether to check errors to try handling the ATI bug
             check_ati_bug = ((not self._bufferSubDataOk) and
@@ -219,6 +224,46 @@ class Buffer(GLObject):
                     raise
 
 
+def _coalesce_writes(pending):
+    """ Merge pending (data, nbytes, offset) writes that are adjacent in the
+    buffer into a single write. The order of the writes is maintained.
+    """
+    result = []
+    run = []
+    for item in pending:
+        if run and item[2] != run[-1][2] + run[-1][1]:
+            result.append(_merge_writes(run))
+            run = []
+        run.append(item)
+    if run:
+        result.append(_merge_writes(run))
+    return result
+
+
+def _merge_writes(run):
+    """ Merge a sequence of adjacent writes. If the arrays are consecutive
+    regions of the same memory (e.g. slices of the CPU storage of a buffer)
+    no copy is made.
+    """
+    if len(run) == 1:
+        return run[0]
+    arrays = [item[0] for item in run]
+    nbytes = sum(item[1] for item in run)
+    offset = run[0][2]
+    base = arrays[0].base
+    if (isinstance(base, np.ndarray) and base.flags['C_CONTIGUOUS'] and
+            all(a.base is base and a.flags['C_CONTIGUOUS'] for a in arrays)):
+        starts = [np.byte_bounds(a)[0] for a in arrays]
+        if all(starts[i + 1] - starts[i] == run[i][1]
+               for i in range(len(run) - 1)):
+            start = starts[0] - np.byte_bounds(base)[0]
+            data = base.reshape(-1).view(np.uint8)[start:start + nbytes]
+            return data, nbytes, offset
+    data = np.concatenate([np.ascontiguousarray(a).reshape(-1).view(np.uint8)
+                           for a in arrays])
+    return data, nbytes, offset
+
+
 # -------------------------------------------------------- DataBuffer class ---
 class DataBuffer(Buffer):
     """ GPU data buffer that is aware of data type and elements size
@@ -228,7 +273,7 @@ class DataBuffer(Buffer):
 
     target : GLENUM
         gl.GL_ARRAY_BUFFER or gl.GL_ELEMENT_ARRAY_BUFFER
-    data : ndarray
+    data : ndarray | SharedArray
         Buffer data
     dtype : dtype
         Buffer data type
@@ -243,17 +288,32 @@ class DataBuffer(Buffer):
         allowing the data to be updated regardless of striding. Note
         that modifying the data after passing it here might result in
         undesired behavior, unless a copy is given. Default True.
+
+    Notes
+    -----
+    A DataBuffer can be used as a fixed-size ring buffer for streaming
+    data, see ``write()``.
+
+    If the data is a ``SharedArray``, the buffer uses its memory as is.
+    Each time the buffer is activated, the elements that the producer
+    flagged as changed are uploaded.
     """
 
     def __init__(self, data=None, dtype=None, target=gl.GL_ARRAY_BUFFER,
                  size=0, store=True):
+        self._cursor = 0  # write position of the ring buffer
         self._data = None
+        self._source = None  # SharedArray the data comes from
+        self._source_generation = 0
         self._store = store
         self._copied = False  # flag to indicate that a copy is made
         self._size = size  # number of elements in buffer
 
         # Convert data to array+dtype if needed
-        if data is not None:
+        if isinstance(data, SharedArray):
+            if dtype is not None and np.dtype(dtype) != data.dtype:
+                raise ValueError("Cannot convert the dtype of a SharedArray")
+        elif data is not None:
             if dtype is not None:
                 data = np.array(data, dtype=dtype, copy=False)
             else:
@@ -301,8 +361,9 @@ class DataBuffer(Buffer):
         Parameters
         ----------
 
-        data : ndarray
-            Data to be uploaded
+        data : ndarray | SharedArray
+            Data to be uploaded. Changes to a SharedArray are uploaded
+            when the buffer is activated.
         offset: int
             Offset in buffer to start copying data (in number of vertices)
         copy: bool
@@ -310,7 +371,15 @@ class DataBuffer(Buffer):
             data is actually uploaded to GPU memory.
             Asking explicitly for a copy will prevent this behavior.
         """
+        self._source = None
+        if isinstance(data, SharedArray):
+            if copy:
+                raise ValueError("Cannot copy a SharedArray")
+            self._source = data
+            self._source_generation = data.generation
+            data = data.array.view()  # _prepare_data may reshape it
         data = self._prepare_data(data, **kwds)
+        self._cursor = 0
 
         # Handle storage
         if self._store:
@@ -326,6 +395,85 @@ class DataBuffer(Buffer):
         self._itemsize = self._dtype.itemsize
         Buffer.set_data(self, data=data, copy=copy)
 
+    @property
+    def source(self):
+        """ The SharedArray that the data comes from, or None """
+
+        return self._source
+
+    def _sync_source(self):
+        """ Queue the elements that changed in the shared array """
+
+        regions, self._source_generation = \
+            self._source.changes(self._source_generation)
+        array = self._source.array
+        if regions is None:
+            regions = [(0, len(array))]
+        row_bytes = array.nbytes // max(len(array), 1)
+        for start, stop in regions:
+            # Contiguous rows of the shared memory, not a copy
+            Buffer.set_subdata(self, array[start:stop],
+                               offset=start * row_bytes)
+
+    def _activate(self):
+        if self._source is not None:
+            self._sync_source()
+        Buffer._activate(self)
+
+    @property
+    def cursor(self):
+        """ The index of the element that the next ``write()`` starts at.
+        When the buffer is used as a ring buffer, this is the index of
+        the oldest element.
+        """
+
+        return self._cursor
+
+    def write(self, data):
+        """ Write data at the cursor, treating the buffer as a ring buffer
+        (deferred operation).
+
+        The data is written at the current cursor position, wrapping
+        around to the start of the buffer when the end is reached, and
+        the cursor is advanced. The size of the buffer never changes;
+        if more elements are given than fit in the buffer, only the last
+        ones are kept. Consecutive writes are merged into a single upload.
+
+        To draw the elements from oldest to newest, draw elements
+        ``cursor`` up to the end of the buffer, followed by the elements
+        before ``cursor`` (e.g. using the ``first`` and ``count``
+        arguments of ``Program.draw()``).
+
+        Parameters
+        ----------
+        data : ndarray
+            Data to be written. It is not copied, so it should not be
+            modified until the data is uploaded, unless the buffer has
+            CPU storage (in which case the data is copied into the
+            storage).
+        """
+        data = self._prepare_data(np.asarray(data)).ravel()
+        if data.dtype != self.dtype:
+            data = data.astype(self.dtype)
+        size = self.size
+        if size == 0:
+            raise ValueError("Cannot write to a buffer of size 0")
+        n = len(data)
+        if n > size:
+            # Only the last elements would remain after wrapping around
+            self._cursor = (self._cursor + n - size) % size
+            data, n = data[n - size:], size
+        start = self._cursor
+        first = min(n, size - start)
+        for offset, chunk in ((start, data[:first]), (0, data[first:])):
+            if len(chunk) == 0:
+                continue
+            if self._data is not None:
+                self._data[offset:offset + len(chunk)] = chunk
+                chunk = self._data[offset:offset + len(chunk)]
+            DataBuffer.set_subdata(self, chunk, offset=offset)
+        self._cursor = (start + n) % size
+
     @property
     def dtype(self):
         """ Buffer dtype """
@@ -388,6 +536,9 @@ class DataBuffer(Buffer):
         Buffer.resize_bytes(self, size)
 
         self._size = size // self.itemsize
+        self._cursor = 0
+        if self._source is not None and size != self._source.array.nbytes:
+            self._source = None
         
         if self._data is not None and self._store: 
             if self._data.size != self._size:
@@ -548,6 +699,9 @@ class DataBufferView(DataBuffer):
         raise ValueError("Cannot set_data on buffer view; only set_subdata is "
                          "allowed.")
 
+    def write(self, data):
+        raise ValueError("Cannot write to buffer view; use the base buffer.")
+
     @property
     def dtype(self):
         """ Buffer dtype """
@@ -572,6 +726,12 @@ class DataBufferView(DataBuffer):
 
         return self._base
 
+    @property
+    def divisor(self):
+        """ The attribute divisor of the base buffer """
+
+        return getattr(self._base, 'divisor', 0)
+
     @property
     def size(self):
         """ Number of elements in the buffer """
@@ -679,9 +839,15 @@ class VertexBuffer(DataBuffer):
         allowing the data to be updated regardless of striding. Note
         that modifying the data after passing it here might result in
         undesired behavior, unless a copy is given. Default True.
+    divisor : int
+        The number of instances drawn before advancing to the next element
+        of this buffer when drawing with ``Program.draw(..., instances=N)``.
+        The default (0) means that the buffer holds per-vertex data.
     """
 
-    def __init__(self, data=None, dtype=None, size=0, store=True):
+    def __init__(self, data=None, dtype=None, size=0, store=True, divisor=0):
+
+        self.divisor = divisor
 
         if isinstance(data, (list, tuple)):
             data = np.array(data, np.float32)
@@ -716,6 +882,20 @@ class VertexBuffer(DataBuffer):
                        % (count, name))
                 raise TypeError(msg)
 
+    @property
+    def divisor(self):
+        """ The attribute divisor used for instanced drawing (0 for
+        per-vertex data).
+        """
+        return self._divisor
+
+    @divisor.setter
+    def divisor(self, divisor):
+        divisor = int(divisor)
+        if divisor < 0:
+            raise ValueError("Divisor must be non-negative")
+        self._divisor = divisor
+
     def _prepare_data(self, data, convert=False):
         # Build a structured view of the data if:
         #  -> it is not already a structured array
@@ -772,7 +952,7 @@ class IndexBuffer(DataBuffer):
         if dtype and not np.dtype(dtype).isbuiltin:
             raise TypeError("Element buffer dtype cannot be structured")
 
-        if isinstance(data, np.ndarray):
+        if isinstance(data, (np.ndarray, SharedArray)):
             pass
         elif dtype not in [np.uint8, np.uint16, np.uint32]:
             raise TypeError("Data type not allowed for IndexBuffer")
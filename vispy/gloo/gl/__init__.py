@@ -92,9 +92,103 @@ class DebugProxy(BaseGLProxy):
         return ret
 
 
+class CacheProxy(BaseGLProxy):
+    """ Proxy for the GL ES 2.0 API that eliminates redundant state changes.
+
+    This proxy keeps a shadow copy of a subset of the GL state (bound
+    buffers, bound textures, current program, enabled capabilities,
+    blending, depth, viewport and clear color). Calls that would set a
+    value that is already in effect are not passed on to the backend.
+    All other calls are forwarded unchanged (via the debug proxy if
+    debug mode is also on).
+
+    The shadow state is only valid as long as vispy is the only one
+    issuing GL calls in the current context. Canvases invalidate it
+    before emitting their initialize, resize and draw events (which is
+    when their context is made current). When other code touches the
+    context in between, call ``invalidate()``.
+
+    The number of forwarded and skipped calls are available via the
+    ``n_issued`` and ``n_skipped`` attributes.
+    """
+
+    def __init__(self):
+        self.debug = False
+        self._state = {}
+        self.reset_counters()
+
+    def invalidate(self):
+        """ Forget the shadowed state, so that subsequent calls are
+        always issued until the state is known again.
+        """
+        self._state.clear()
+
+    def reset_counters(self):
+        """ Reset the counters for issued and skipped calls.
+        """
+        self.n_issued = 0
+        self.n_skipped = 0
+
+    def _state_key(self, funcname, args):
+        """ Get the key (and value) in the shadow state that a call
+        would set, or None if the call is not cached.
+        """
+        if funcname in ('glBindBuffer', 'glActiveTexture', 'glUseProgram',
+                        'glViewport', 'glClearColor', 'glBlendColor',
+                        'glDepthFunc', 'glDepthMask', 'glLineWidth'):
+            if funcname == 'glBindBuffer':
+                return (funcname, args[0]), args[1]
+            return (funcname, ), args
+        elif funcname == 'glBindTexture':
+            unit = self._state.get(('glActiveTexture', ), None)
+            if unit is None:
+                return None  # Unknown texture unit, cannot cache
+            return (funcname, unit, args[0]), args[1]
+        elif funcname in ('glEnable', 'glDisable'):
+            return ('glEnable', args[0]), funcname == 'glEnable'
+        elif funcname == 'glBlendFunc':
+            return ('glBlendFuncSeparate', ), args + args
+        elif funcname == 'glBlendFuncSeparate':
+            return ('glBlendFuncSeparate', ), args
+        elif funcname == 'glBlendEquation':
+            return ('glBlendEquationSeparate', ), args + args
+        elif funcname == 'glBlendEquationSeparate':
+            return ('glBlendEquationSeparate', ), args
+        return None
+
+    def _forget_object(self, funcname, handle):
+        """ Deleting a bound object resets the corresponding binding.
+        """
+        kind = {'glDeleteBuffer': 'glBindBuffer',
+                'glDeleteTexture': 'glBindTexture',
+                'glDeleteProgram': 'glUseProgram'}[funcname]
+        for key, val in list(self._state.items()):
+            if key[0] == kind and val in (handle, (handle, )):
+                del self._state[key]
+
+    def __call__(self, funcname, returns, *args):
+        key_val = self._state_key(funcname, args)
+        if key_val is not None:
+            key, val = key_val
+            if key in self._state and self._state[key] == val:
+                self.n_skipped += 1
+                return
+            self._state[key] = val
+        elif funcname in ('glDeleteBuffer', 'glDeleteTexture',
+                          'glDeleteProgram'):
+            self._forget_object(funcname, args[0])
+        # Forward the call
+        self.n_issued += 1
+        if self.debug:
+            return _debug_proxy(funcname, returns, *args)
+        func = getattr(current_backend, funcname)
+        return func(*args)
+
+
 # Instantiate proxy objects
 proxy = MainProxy()
 _debug_proxy = DebugProxy()
+cache_proxy = CacheProxy()
 
 
 def use_gl(target='desktop'):
@@ -105,21 +199,29 @@ def use_gl(target='desktop'):
     Parameters
     ----------
     target : str
-        The target GL backend to use.
+        The target GL backend to use. Options can be appended after
+        a space, e.g. 'desktop debug cache'.
 
     Available backends:
     * desktop - Use desktop (i.e. normal) OpenGL.
-    * pyopengl - Use pyopengl (for fallback and testing). 
+    * pyopengl - Use pyopengl (for fallback and testing).
     * angle - Use the Angle library to target DirectX (Windows only). (WIP)
     * mock - Dummy backend that can be useful for testing. (not yet available)
     * webgl - Send the GL commands to the browser. (not yet available)
 
+    Available options:
+    * debug - Log each call and check for errors (see ``DebugProxy``).
+    * cache - Skip calls that set state that is already in effect
+      (see ``CacheProxy``). Use ``gl.cache_proxy`` to get the call
+      counters or to invalidate the cached state.
+
     """
     target = target or 'desktop'
 
     # Get options
     target, _, options = target.partition(' ')
     debug = config['gl_debug'] or ('debug' in options)
+    cache = 'cache' in options
     
     # Select modules to import names from
     try:
@@ -131,12 +233,26 @@ def use_gl(target='desktop'):
     # Apply
     global current_backend
     current_backend = mod
-    if debug:
+    cache_proxy.invalidate()
+    cache_proxy.debug = debug
+    if cache:
+        _copy_gl_functions(cache_proxy, globals())
+    elif debug:
         _copy_gl_functions(_debug_proxy, globals())
     else:
         _copy_gl_functions(mod, globals())
 
 
+def is_desktop():
+    """ Whether the current backend implements the API with desktop GL
+
+    Desktop GL accepts enums that ES 2.0 does not have, such as sized
+    texture formats and GL_LINE_SMOOTH.
+    """
+    backends = globals().get('desktop'), globals().get('pyopengl')
+    return current_backend is not None and current_backend in backends
+
+
 def _copy_gl_functions(source, dest):
     """ Inject all objects that start with 'gl' from the source
     into the dest. source and dest can be dicts, modules or BaseGLProxy's.
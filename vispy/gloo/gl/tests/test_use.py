@@ -1,8 +1,11 @@
 """ Test the use function.
 """
 
+from nose.tools import assert_equal
+
 from vispy.testing import assert_is, requires_pyopengl
 
+from vispy.app.canvas import _ContextEmitter
 from vispy.gloo import gl
 
 
@@ -54,5 +57,88 @@ def test_use_desktop():
             assert_is(val1, val2)
 
 
+class _RecordingBackend(object):
+    """ Fake GL backend that records the calls that reach it """
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, ) + args)
+
+
+def test_cache_proxy():
+    """ Testing that the cache proxy skips redundant state changes """
+    proxy = gl.cache_proxy
+    be = _RecordingBackend()
+    orig_backend = gl.current_backend
+    gl.current_backend = be
+    try:
+        proxy.invalidate()
+        proxy.reset_counters()
+        # Redundant binds are skipped
+        proxy.glBindBuffer(gl.GL_ARRAY_BUFFER, 3)
+        proxy.glBindBuffer(gl.GL_ARRAY_BUFFER, 3)
+        proxy.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, 3)
+        proxy.glUseProgram(5)
+        proxy.glUseProgram(5)
+        assert_equal(len(be.calls), 3)
+        assert_equal((proxy.n_issued, proxy.n_skipped), (3, 2))
+        # Enable/disable share state
+        proxy.glEnable(gl.GL_BLEND)
+        proxy.glEnable(gl.GL_BLEND)
+        proxy.glDisable(gl.GL_BLEND)
+        assert_equal(be.calls[-1], ('glDisable', gl.GL_BLEND))
+        assert_equal(proxy.n_skipped, 3)
+        # Blend func is equivalent to blend func separate
+        proxy.glBlendFunc(gl.GL_ONE, gl.GL_ZERO)
+        proxy.glBlendFuncSeparate(gl.GL_ONE, gl.GL_ZERO,
+                                  gl.GL_ONE, gl.GL_ZERO)
+        assert_equal(proxy.n_skipped, 4)
+        # Texture bindings depend on the active texture unit
+        proxy.glBindTexture(gl.GL_TEXTURE_2D, 7)  # unit unknown
+        proxy.glBindTexture(gl.GL_TEXTURE_2D, 7)
+        assert_equal(proxy.n_skipped, 4)
+        proxy.glActiveTexture(gl.GL_TEXTURE0)
+        proxy.glBindTexture(gl.GL_TEXTURE_2D, 7)
+        proxy.glBindTexture(gl.GL_TEXTURE_2D, 7)
+        proxy.glActiveTexture(gl.GL_TEXTURE1)
+        proxy.glBindTexture(gl.GL_TEXTURE_2D, 7)
+        assert_equal(proxy.n_skipped, 5)
+        # Deleting a bound object resets its binding
+        proxy.glDeleteBuffer(3)
+        proxy.glBindBuffer(gl.GL_ARRAY_BUFFER, 3)
+        proxy.glDeleteProgram(5)
+        proxy.glUseProgram(5)
+        assert_equal(proxy.n_skipped, 5)
+        # Calls that return values are always forwarded
+        n = len(be.calls)
+        proxy.glCreateBuffer()
+        proxy.glCreateBuffer()
+        assert_equal(len(be.calls), n + 2)
+        # Invalidation
+        proxy.invalidate()
+        proxy.glUseProgram(5)
+        assert_equal(be.calls[-1], ('glUseProgram', 5))
+        assert_equal(proxy.n_issued + proxy.n_skipped, 24)
+        # The context events of a canvas invalidate the state
+        draw = _ContextEmitter(type='draw')
+        draw()
+        proxy.glUseProgram(5)
+        assert_equal(proxy.n_issued + proxy.n_skipped, 25)
+        assert_equal(proxy.n_skipped, 5)
+    finally:
+        gl.current_backend = orig_backend
+        proxy.invalidate()
+        proxy.reset_counters()
+
+    # Using the cache option injects the cache proxy
+    gl.use_gl('desktop cache')
+    assert_equal(gl.glBindBuffer, gl.cache_proxy.glBindBuffer)
+    gl.use_gl('desktop')
+    assert_is(gl.glBindBuffer, gl.desktop.glBindBuffer)
+
+
 if __name__ == '__main__':
     test_use_desktop()
+    test_cache_proxy()
@@ -8,7 +8,7 @@ import numpy as np
 
 from . import gl
 from .globject import GLObject
-from .buffer import VertexBuffer, IndexBuffer
+from .buffer import VertexBuffer, IndexBuffer, DataBufferView
 from .shader import VertexShader, FragmentShader
 from .texture import GL_SAMPLER_3D
 from .variable import Uniform, Attribute
@@ -24,6 +24,96 @@ for key in ('points', 'lines', 'line_strip', 'line_loop',
     _known_draw_modes[x] = x  # for speed in this case
 
 
+_gltypes = {np.dtype(np.uint8): gl.GL_UNSIGNED_BYTE,
+            np.dtype(np.uint16): gl.GL_UNSIGNED_SHORT,
+            np.dtype(np.uint32): gl.GL_UNSIGNED_INT}
+
+# Cached result of _get_instancing_funcs()
+_instancing_funcs = []
+
+
+def _get_instancing_funcs():
+    """ Get the (glVertexAttribDivisor, glDrawArraysInstanced,
+    glDrawElementsInstanced) functions from PyOpenGL, or None if
+    instanced drawing is not available (requires a GL context).
+    """
+    if _instancing_funcs:
+        return _instancing_funcs[0]
+    funcs = None
+    if gl.is_desktop():
+        try:
+            import OpenGL.GL as _gl
+            from OpenGL.GL.ARB import instanced_arrays, draw_instanced
+        except ImportError:
+            pass
+        else:
+            core = [getattr(_gl, name, None) for name in
+                    ('glVertexAttribDivisor', 'glDrawArraysInstanced',
+                     'glDrawElementsInstanced')]
+            arb = [getattr(instanced_arrays, 'glVertexAttribDivisorARB',
+                           None),
+                   getattr(draw_instanced, 'glDrawArraysInstancedARB', None),
+                   getattr(draw_instanced, 'glDrawElementsInstancedARB',
+                           None)]
+            # PyOpenGL functions evaluate to False if not available
+            for candidates in (core, arb):
+                if all(bool(f) for f in candidates):
+                    funcs = tuple(candidates)
+                    break
+    logger.debug('Instanced drawing %savailable' % ('' if funcs else 'not '))
+    _instancing_funcs.append(funcs)
+    return funcs
+
+
+def _attribute_divisor(attribute):
+    """ Get the divisor of the buffer attached to an attribute.
+    """
+    if attribute._generic or attribute.data is None:
+        return 0
+    return getattr(attribute.data, 'divisor', 0)
+
+
+def _replicate_data(data, divisor, nverts, instances):
+    """ Replicate attribute data for drawing instances in a single call.
+
+    Per-vertex data (divisor 0) is repeated for each instance; per-instance
+    data is repeated for each vertex of the instance it belongs to.
+    """
+    if divisor:
+        index = np.arange(instances) // divisor
+        return np.repeat(data[index], nverts, axis=0)
+    return data[np.tile(np.arange(nverts), instances)]
+
+
+def _replicate_indices(indices, nverts, instances):
+    """ Replicate indices for drawing instances in a single call.
+    """
+    indices = np.asarray(indices, np.uint32).ravel()
+    offsets = nverts * np.arange(instances, dtype=np.uint32)
+    return (indices[np.newaxis, :] + offsets[:, np.newaxis]).ravel()
+
+
+def _check_range(first, count, size):
+    """ Check the range of vertices to draw and return (first, count).
+    """
+    first = int(first)
+    count = size - first if count is None else int(count)
+    if first < 0 or count < 0 or first + count > size:
+        raise ValueError('Cannot draw %s vertices from %s, there are %s '
+                         'vertices' % (count, first, size))
+    return first, count
+
+
+def _buffer_array(buffer):
+    """ Get the CPU data of a VertexBuffer or view, or None if the buffer
+    has no CPU storage.
+    """
+    if isinstance(buffer, DataBufferView):
+        data = buffer.base.data
+        return None if data is None else data[buffer._key]
+    return buffer.data
+
+
 # ----------------------------------------------------------- Program class ---
 class Program(GLObject):
     """ Shader program object
@@ -60,6 +150,9 @@ class Program(GLObject):
         self._uniforms = {}
         self._attributes = {}
         
+        # Buffers used to draw instances without hardware support
+        self._instance_buffers = {}
+        
         # Get all vertex shaders
         self._verts = []
         if isinstance(vert, (str, VertexShader)):
@@ -474,7 +567,8 @@ class Program(GLObject):
         shaders.extend(self._frags)
         return shaders
 
-    def draw(self, mode=gl.GL_TRIANGLES, indices=None, check_error=True):
+    def draw(self, mode=gl.GL_TRIANGLES, indices=None, check_error=True,
+             instances=None, first=0, count=None):
         """ Draw the attribute arrays in the specified mode.
 
         Parameters
@@ -486,45 +580,149 @@ class Program(GLObject):
             Array of indices to draw.
         check_error:
             Check error after draw.
+        instances : int | None
+            If given, draw this many instances of the geometry in a single
+            call. Attributes attached to a VertexBuffer with a nonzero
+            ``divisor`` advance once per ``divisor`` instances instead of
+            once per vertex. Hardware instancing is used when available
+            (via PyOpenGL); otherwise the data is replicated on the CPU.
+        first : int
+            The first vertex to draw (only when no indices are given).
+        count : int | None
+            The number of vertices to draw (only when no indices are
+            given). By default all vertices from ``first`` are drawn.
         """
         mode = _check_conversion(mode, _known_draw_modes)
+        if indices is not None and (first != 0 or count is not None):
+            raise ValueError('Cannot specify first and count when drawing '
+                             'with indices')
+        funcs = None
+        if instances is not None:
+            instances = int(instances)
+            if instances < 1:
+                raise ValueError('instances must be at least 1')
+            funcs = _get_instancing_funcs()
+            if funcs is None:
+                return self._draw_replicated(mode, indices, check_error,
+                                             instances, first, count)
+
         self.activate()
         if check_error:  # need to do this after activating, too
             gl.check_error('Check after draw activation')
 
         # WARNING: The "list" of values from a dict is not a list (py3k)
         attributes = list(self._attributes.values())
-        sizes = [a.size for a in attributes]
-        if len(attributes) < 1:
-            raise RuntimeError('Must have at least one attribute')
-        if not all(s == sizes[0] for s in sizes[1:]):
-            msg = '\n'.join(['%s: %s' % (str(a), a.size) for a in attributes])
-            raise RuntimeError('All attributes must have the same size, got:\n'
-                               '%s' % msg)
+        size = self._check_attribute_sizes(attributes, instances)
+        first, count = _check_range(first, count, size)
+        divisors = [(a.handle, _attribute_divisor(a)) for a in attributes
+                    if a.handle >= 0 and _attribute_divisor(a) > 0]
+        if funcs is not None:
+            for handle, divisor in divisors:
+                funcs[0](handle, divisor)
 
         if isinstance(indices, IndexBuffer):
             indices.activate()
             logger.debug("Program drawing %d %r (using index buffer)", 
                          indices.size, mode)
-            gltypes = {np.dtype(np.uint8): gl.GL_UNSIGNED_BYTE,
-                       np.dtype(np.uint16): gl.GL_UNSIGNED_SHORT,
-                       np.dtype(np.uint32): gl.GL_UNSIGNED_INT}
-            gl.glDrawElements(mode, indices.size, gltypes[indices.dtype], None)
+            gltype = _gltypes[indices.dtype]
+            if funcs is None:
+                gl.glDrawElements(mode, indices.size, gltype, None)
+            else:
+                funcs[2](mode, indices.size, gltype, None, instances)
             indices.deactivate()
         elif indices is None:
-            #count = (count or attributes[0].size) - first
-            first = 0
-            count = attributes[0].size
             logger.debug("Program drawing %d %r (no index buffer)", 
                          count, mode)
-            gl.glDrawArrays(mode, first, count)
+            if funcs is None:
+                gl.glDrawArrays(mode, first, count)
+            else:
+                funcs[1](mode, first, count, instances)
         else:
             raise TypeError("Invalid index: %r (must be IndexBuffer)" %
                             indices)
 
+        # Reset divisors, other programs may use the same attribute slots
+        if funcs is not None:
+            for handle, divisor in divisors:
+                funcs[0](handle, 0)
+
         gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
         self.deactivate()
 
         # Check ok
         if check_error:
             gl.check_error('Check after drawing completes')
+
+    def _check_attribute_sizes(self, attributes, instances=None):
+        """ Check that the attributes can be drawn together and return
+        the number of vertices.
+        """
+        if len(attributes) < 1:
+            raise RuntimeError('Must have at least one attribute')
+        if instances is None:
+            per_vertex = attributes
+        else:
+            per_vertex = []
+            for a in attributes:
+                divisor = _attribute_divisor(a)
+                if divisor == 0:
+                    per_vertex.append(a)
+                elif a.size * divisor < instances:
+                    raise RuntimeError('Attribute %s has too few elements '
+                                       '(%s) for %s instances'
+                                       % (a, a.size, instances))
+            if not per_vertex:
+                raise RuntimeError('Must have at least one per-vertex '
+                                   'attribute')
+        sizes = [a.size for a in per_vertex]
+        if not all(s == sizes[0] for s in sizes[1:]):
+            msg = '\n'.join(['%s: %s' % (str(a), a.size) for a in per_vertex])
+            raise RuntimeError('All attributes must have the same size, got:\n'
+                               '%s' % msg)
+        return sizes[0]
+
+    def _draw_replicated(self, mode, indices, check_error, instances,
+                         first=0, count=None):
+        """ Draw instances by replicating the attribute data on the CPU.
+        The replicated data is uploaded to buffers that are reused for
+        subsequent draws.
+        """
+        attributes = [a for a in self._attributes.values()
+                      if not a._generic and a.data is not None]
+        size = self._check_attribute_sizes(attributes, instances)
+        first, nverts = _check_range(first, count, size)
+        buffers = self._instance_buffers
+        originals = []
+        try:
+            for a in attributes:
+                data = _buffer_array(a.data)
+                if data is None:
+                    raise RuntimeError('Cannot draw instances of attribute '
+                                       '%s without CPU storage' % a)
+                divisor = _attribute_divisor(a)
+                if not divisor:
+                    data = data[first:first + nverts]
+                data = _replicate_data(data, divisor, nverts, instances)
+                if a.name in buffers:
+                    buffers[a.name].set_data(data)
+                else:
+                    buffers[a.name] = VertexBuffer(data)
+                originals.append((a, a._data))
+                a._data = buffers[a.name]
+            if isinstance(indices, IndexBuffer):
+                if indices.data is None:
+                    raise RuntimeError('Cannot draw instances using an '
+                                       'index buffer without CPU storage')
+                data = _replicate_indices(indices.data, nverts, instances)
+                if None in buffers:
+                    buffers[None].set_data(data)
+                else:
+                    buffers[None] = IndexBuffer(data)
+                indices = buffers[None]
+            elif indices is not None:
+                raise TypeError("Invalid index: %r (must be IndexBuffer)" %
+                                indices)
+            self.draw(mode, indices, check_error)
+        finally:
+            for a, data in originals:
+                a._data = data
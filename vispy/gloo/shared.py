@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Vispy Development Team. All Rights Reserved.
+# Distributed under the (new) BSD License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+
+import os
+import mmap
+import atexit
+import tempfile
+from ast import literal_eval
+
+import numpy as np
+
+
+_MAGIC = b'VISPYSHM'
+# Layout of the header: magic, header size, number of regions, generation
+# (each 8 bytes), the description of the array, and the region table
+_DESCR_OFFSET = 32
+_DESCR_SIZE = 256
+_TABLE_OFFSET = _DESCR_OFFSET + _DESCR_SIZE
+# The generation of a region that is being written
+_WRITING = np.uint64(2 ** 64 - 1)
+# Temporary files created by this process that were not closed yet
+_temp_files = set()
+
+
+@atexit.register
+def _remove_temp_files():
+    for filename in list(_temp_files):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+    _temp_files.clear()
+
+
+class SharedArray(object):
+    """ An array in memory that is shared between processes
+
+    A SharedArray can be given to a ``VertexBuffer``, ``IndexBuffer`` or
+    texture instead of an ndarray. The producer (typically another process)
+    writes into ``array`` in place and calls ``mark_dirty()`` for the rows
+    that it changed. Each call increments a generation counter. When the
+    buffer or texture is activated, it uploads only the rows that changed
+    since the last upload, directly from the shared memory.
+
+    The memory is a file mapped with mmap, which is created in /dev/shm
+    where available, so the data does not touch the disk. To use the array
+    in another process, open it by its filename (or pickle it, which
+    does the same). A temporary file is removed by ``close()``, or when
+    the process that created it exits; processes that opened the array
+    before can keep using it.
+
+    Parameters
+    ----------
+    filename : str | None
+        The file that holds the array. If shape is None, an existing array
+        is opened. Otherwise a new one is created, using a temporary file
+        if filename is None.
+    shape : tuple of ints | None
+        The shape of the array to create. The first axis is the axis along
+        which changes are tracked: elements for buffers, rows for 2D
+        textures and slices for 3D textures.
+    dtype : dtype
+        The type of the array to create.
+    regions : int
+        The number of changes that are remembered. If more changes are made
+        between two uploads, the whole array is uploaded.
+
+    Notes
+    -----
+    There is no locking: there should be a single producer, and a region
+    that is written while it is uploaded may be shown half updated until
+    the next upload. The regions are read optimistically: if the producer
+    overwrote one of them meanwhile, ``changes()`` reports that everything
+    changed.
+    """
+
+    def __init__(self, filename=None, shape=None, dtype=np.float32,
+                 regions=64):
+        if shape is None:
+            if filename is None:
+                raise ValueError('filename must be given to open an array')
+            with open(filename, 'r+b') as f:
+                self._map = mmap.mmap(f.fileno(), 0)
+            if self._map[:8] != _MAGIC:
+                raise ValueError('%s does not hold a shared array'
+                                 % filename)
+            head = np.frombuffer(self._map, np.uint64, 3, 8)
+            header_size, regions = int(head[0]), int(head[1])
+            descr = self._map[_DESCR_OFFSET:_TABLE_OFFSET].rstrip(b'\0')
+            dtype, shape = literal_eval(descr.decode('ascii'))
+            dtype = np.dtype(dtype)
+            self._owned = False
+        else:
+            dtype = np.dtype(dtype)
+            shape = tuple(int(s) for s in shape)
+            regions = int(regions)
+            if regions < 1:
+                raise ValueError('regions must be at least 1')
+            descr = repr((np.lib.format.dtype_to_descr(dtype), shape))
+            descr = descr.encode('ascii')
+            if len(descr) > _DESCR_SIZE:
+                raise ValueError('dtype is too complex for a shared array')
+            header_size = -(-(_TABLE_OFFSET + 24 * regions) // 64) * 64
+            nbytes = header_size + dtype.itemsize * int(np.prod(shape))
+            if filename is None:
+                folder = '/dev/shm' if os.path.isdir('/dev/shm') else None
+                fd, filename = tempfile.mkstemp(prefix='vispy-', dir=folder)
+                os.close(fd)
+                _temp_files.add(filename)
+            self._owned = filename in _temp_files
+            with open(filename, 'w+b') as f:
+                f.truncate(nbytes)
+                self._map = mmap.mmap(f.fileno(), nbytes)
+            self._map[:8] = _MAGIC
+            head = np.frombuffer(self._map, np.uint64, 3, 8)
+            head[:] = header_size, regions, 0
+            self._map[_DESCR_OFFSET:_DESCR_OFFSET + len(descr)] = descr
+
+        self._filename = filename
+        self._generation = np.frombuffer(self._map, np.uint64, 1, 24)
+        self._table = np.frombuffer(self._map, np.uint64, 3 * regions,
+                                    _TABLE_OFFSET).reshape(regions, 3)
+        self._array = np.frombuffer(self._map, dtype, int(np.prod(shape)),
+                                    header_size).reshape(shape)
+
+    def __reduce__(self):
+        return SharedArray, (self._filename,)
+
+    def __repr__(self):
+        return "<SharedArray shape=%r dtype=%r filename=%r>" % (
+            self.shape, self.dtype, self._filename)
+
+    @property
+    def filename(self):
+        """ The file that holds the array """
+        return self._filename
+
+    @property
+    def array(self):
+        """ The array in shared memory """
+        return self._array
+
+    @property
+    def shape(self):
+        """ The shape of the array """
+        return self._array.shape
+
+    @property
+    def dtype(self):
+        """ The dtype of the array """
+        return self._array.dtype
+
+    @property
+    def generation(self):
+        """ The number of changes made to the array """
+        return int(self._generation[0])
+
+    def mark_dirty(self, start=0, stop=None):
+        """ Flag rows of the array as changed
+
+        Parameters
+        ----------
+        start : int
+            The first row that changed.
+        stop : int | None
+            The row after the last row that changed. If None, all rows
+            from start on are flagged.
+        """
+        start, stop, _ = slice(start, stop).indices(len(self._array))
+        if stop <= start:
+            return
+        generation = self.generation
+        # Fill in the region before publishing the new generation
+        row = self._table[generation % len(self._table)]
+        row[0] = _WRITING
+        row[1:] = start, stop
+        row[0] = generation
+        self._generation[0] = generation + 1
+
+    def write(self, data, start=0):
+        """ Write rows of the array, and flag them as changed
+
+        Parameters
+        ----------
+        data : array-like
+            The rows to write.
+        start : int
+            The row to start writing at.
+        """
+        data = np.asarray(data)
+        n = len(data) if data.ndim == self._array.ndim else 1
+        self._array[start:start + n] = data
+        self.mark_dirty(start, start + n)
+
+    def changes(self, generation):
+        """ Get the rows that changed since a generation
+
+        Parameters
+        ----------
+        generation : int
+            The generation at the time of the previous upload.
+
+        Returns
+        -------
+        regions : list of tuples | None
+            The sorted, non-overlapping (start, stop) ranges of rows that
+            changed, or None if too many changes were made to tell.
+        generation : int
+            The current generation.
+        """
+        current = self.generation
+        if current - generation > len(self._table):
+            return None, current
+        regions = []
+        for g in range(generation, current):
+            row = self._table[g % len(self._table)]
+            # The producer marks the row as being written before it changes
+            # start and stop, so they are valid if gen did not change
+            gen = int(row[0])
+            start, stop = int(row[1]), int(row[2])
+            if gen != g or int(row[0]) != g:
+                # overwritten by the producer while we read the table
+                return None, current
+            regions.append((start, stop))
+        regions.sort()
+        merged = []
+        for start, stop in regions:
+            if merged and start <= merged[-1][1]:
+                merged[-1] = merged[-1][0], max(stop, merged[-1][1])
+            else:
+                merged.append((start, stop))
+        return merged, current
+
+    def unlink(self):
+        """ Remove the file that holds the array
+
+        Processes that opened the array can keep using it, but it can no
+        longer be opened.
+        """
+        _temp_files.discard(self._filename)
+        if os.path.exists(self._filename):
+            os.remove(self._filename)
+
+    def close(self):
+        """ Unmap the array, and remove its file if this SharedArray
+        created it as a temporary file
+
+        The memory is only unmapped once no other arrays (such as views of
+        ``array``) use it.
+        """
+        if self._owned:
+            self._owned = False
+            self.unlink()
+        # Arrays made with frombuffer do not always lock the mmap, so it is
+        # not closed explicitly: it is unmapped when the last view is gone
+        self._generation = self._table = self._array = self._map = None
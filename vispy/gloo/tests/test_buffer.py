@@ -8,7 +8,8 @@ import numpy as np
 
 from vispy.util import use_log_level
 from vispy.gloo import gl
-from vispy.gloo.buffer import Buffer, DataBuffer, VertexBuffer, IndexBuffer
+from vispy.gloo.buffer import (Buffer, DataBuffer, VertexBuffer, IndexBuffer,
+                               _coalesce_writes)
 
 
 # -----------------------------------------------------------------------------
@@ -113,6 +114,23 @@ class BufferTest(unittest.TestCase):
         B.set_data(data)
         assert B.nbytes == data.nbytes
 
+    # Coalescing adjacent writes
+    # --------------------------
+    def test_coalesce_writes(self):
+        data = np.arange(10, dtype=np.float32)
+        B = Buffer(data=data)
+        B.set_subdata(data[2:4], offset=8)
+        B.set_subdata(data[4:6], offset=16)
+        B.set_subdata(np.ones(2, np.float32), offset=24)
+        B.set_subdata(np.ones(1, np.float32), offset=0)
+        writes = _coalesce_writes(B._pending_data)
+        assert [(w[1], w[2]) for w in writes] == [(40, 0), (24, 8), (4, 0)]
+        # Adjacent slices of the same array are merged without a copy
+        writes = _coalesce_writes(B._pending_data[1:3])
+        assert len(writes) == 1
+        assert np.may_share_memory(writes[0][0], data)
+        assert writes[0][0].nbytes == 16
+
 
 # -----------------------------------------------------------------------------
 class DataBufferTest(unittest.TestCase):
@@ -427,6 +445,39 @@ class VertexBufferTest(unittest.TestCase):
             #    V = VertexBuffer(dtype=dtype)
             self.assertRaises(TypeError, VertexBuffer, dtype=dtype)
 
+    # VertexBuffer as ring buffer
+    # ---------------------------
+    def test_ring_write(self):
+        for store in (True, False):
+            V = VertexBuffer(np.zeros((5, 2), np.float32), store=store)
+            V._pending_data = []
+            V.write(np.ones((3, 2)))
+            assert V.cursor == 3
+            V.write(2 * np.ones((4, 2), np.float32))
+            assert V.cursor == 2
+            assert [(w[1], w[2]) for w in V._pending_data] == \
+                [(24, 0), (16, 24), (16, 0)]
+            assert len(_coalesce_writes(V._pending_data)) == 2
+            if store:
+                assert V.data['f0'][:, 0].tolist() == [2, 2, 1, 2, 2]
+            # More data than fits keeps the last elements
+            V.write(np.arange(14, dtype=np.float32).reshape(7, 2))
+            assert V.cursor == 4
+            assert V.size == 5
+            if store:
+                assert V.data['f0'][:, 0].tolist() == [6, 8, 10, 12, 4]
+
+    # VertexBuffer divisor for instanced drawing
+    # ------------------------------------------
+    def test_divisor(self):
+        V = VertexBuffer(np.zeros((10, 2), np.float32))
+        assert V.divisor == 0
+        V = VertexBuffer(np.zeros((10, 2), np.float32), divisor=1)
+        assert V.divisor == 1
+        assert V['f0'].divisor == 1
+        self.assertRaises(ValueError, VertexBuffer, dtype=np.float32,
+                          divisor=-1)
+
 # -----------------------------------------------------------------------------
 
 
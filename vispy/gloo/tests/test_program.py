@@ -4,9 +4,11 @@
 # Distributed under the terms of the new BSD License.
 # -----------------------------------------------------------------------------
 import unittest
+import numpy as np
 
 from vispy.gloo import gl
-from vispy.gloo.program import Program
+from vispy.gloo.program import (Program, _replicate_data,
+                                _replicate_indices, _get_instancing_funcs)
 from vispy.gloo.shader import VertexShader, FragmentShader
 
 
@@ -91,6 +93,34 @@ class ProgramTest(unittest.TestCase):
         #    program["A"] = 1
         self.assertRaises(KeyError, program.__setitem__, "A", 1)
 
+    def test_replicate_instances(self):
+        # Per-vertex data is repeated for each instance
+        data = np.arange(6, dtype=np.float32).reshape(3, 2)
+        rep = _replicate_data(data, 0, 3, 2)
+        assert rep.shape == (6, 2)
+        assert np.all(rep[3:] == data)
+
+        # Per-instance data is repeated for each vertex
+        data = np.array([10., 20., 30.], np.float32)
+        rep = _replicate_data(data, 1, 2, 3)
+        assert rep.tolist() == [10, 10, 20, 20, 30, 30]
+        rep = _replicate_data(data, 2, 1, 4)
+        assert rep.tolist() == [10, 10, 20, 20]
+
+        # Indices are offset for each instance
+        ind = _replicate_indices([0, 1, 2], 3, 2)
+        assert ind.dtype == np.uint32
+        assert ind.tolist() == [0, 1, 2, 3, 4, 5]
+
+    def test_instancing_funcs(self):
+        # Works whether or not the pyopengl backend was imported
+        from vispy.gloo import program
+        try:
+            funcs = _get_instancing_funcs()
+            assert funcs is None or len(funcs) == 3
+        finally:
+            del program._instancing_funcs[:]
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Vispy Development Team. All Rights Reserved.
+# Distributed under the (new) BSD License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+import os
+import pickle
+import unittest
+
+import numpy as np
+
+from vispy.gloo import SharedArray, VertexBuffer, IndexBuffer, Texture2D
+
+
+# ------------------------------------------------------------- SharedArray ---
+class SharedArrayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.shared = SharedArray(shape=(10, 3), dtype=np.float32, regions=4)
+
+    def tearDown(self):
+        self.shared.close()
+
+    def test_open(self):
+        other = SharedArray(self.shared.filename)
+        assert other.shape == (10, 3)
+        assert other.dtype == np.float32
+        self.shared.write([1, 2, 3], start=2)
+        assert np.all(other.array[2] == [1, 2, 3])
+        assert other.generation == 1
+
+        other = pickle.loads(pickle.dumps(self.shared))
+        assert other.filename == self.shared.filename
+        other.array[:] = 5
+        assert np.all(self.shared.array == 5)
+
+        dtype = [('a_position', np.float32, 2), ('a_color', np.uint8, 4)]
+        shared = SharedArray(shape=(5,), dtype=dtype)
+        try:
+            assert SharedArray(shared.filename).dtype == np.dtype(dtype)
+        finally:
+            shared.unlink()
+        self.assertRaises(ValueError, SharedArray)
+
+    def test_changes(self):
+        S = self.shared
+        assert S.changes(0) == ([], 0)
+        S.mark_dirty(5, 7)
+        S.mark_dirty(2, 4)
+        S.mark_dirty(3, 6)
+        S.mark_dirty(9, 9)  # empty
+        assert S.changes(0) == ([(2, 7)], 3)
+        assert S.changes(2) == ([(3, 6)], 3)
+        S.mark_dirty(8)
+        S.mark_dirty()
+        assert S.changes(2) == ([(0, 10)], 5)
+        # The oldest regions are forgotten
+        assert S.changes(0) == (None, 5)
+        assert S.changes(1) == ([(0, 10)], 5)
+        # A region that the producer is rewriting is not trusted
+        S._table[2, 0] = S._table[2, 0] + 4
+        assert S.changes(2) == (None, 5)
+        assert S.changes(3) == ([(0, 10)], 5)
+
+    def test_close(self):
+        S = SharedArray(shape=(4,), dtype=np.float32)
+        other = SharedArray(S.filename)
+        other.close()
+        assert other.array is None
+        # Only the array that created the file removes it
+        assert os.path.exists(S.filename)
+        view = S.array[1:]
+        S.close()
+        assert S.array is None
+        assert not os.path.exists(S.filename)
+        view[:] = 1  # still mapped
+        S.close()
+
+
+# ---------------------------------------------------------- Shared buffers ---
+class SharedBufferTest(unittest.TestCase):
+
+    def test_vertex_buffer(self):
+        S = SharedArray(shape=(10, 3), dtype=np.float32)
+        try:
+            B = VertexBuffer(S)
+            assert B.source is S
+            assert B.size == 10
+            assert B.data.dtype.names == ('f0',)
+            assert np.may_share_memory(B.data, S.array)
+            B._pending_data = []
+
+            S.array[4:6] = 1
+            S.mark_dirty(4, 6)
+            B._sync_source()
+            assert len(B._pending_data) == 1
+            data, nbytes, offset = B._pending_data[0]
+            assert (nbytes, offset) == (24, 48)
+            assert np.may_share_memory(data, S.array)
+            B._pending_data = []
+            B._sync_source()
+            assert B._pending_data == []
+
+            # Regular data detaches the buffer from the shared array
+            B.set_data(np.zeros((10, 3), np.float32))
+            assert B.source is None
+            self.assertRaises(ValueError, VertexBuffer, S, dtype=np.uint8)
+
+            B = IndexBuffer(SharedArray(shape=(6,), dtype=np.uint32))
+            assert B.source.shape == (6,)
+            B.source.unlink()
+        finally:
+            S.unlink()
+
+    def test_texture(self):
+        S = SharedArray(shape=(8, 6, 3), dtype=np.uint8, regions=2)
+        try:
+            T = Texture2D(S)
+            assert T.source is S
+            assert T.shape == (8, 6, 3)
+            assert np.may_share_memory(T.data, S.array)
+            T._pending_data = []
+
+            S.write(np.ones((2, 6, 3)), start=3)
+            T._sync_source()
+            assert len(T._pending_data) == 1
+            data, offset = T._pending_data[0]
+            assert data.shape == (2, 6, 3)
+            assert offset == (3, 0, 0)
+            assert np.may_share_memory(data, S.array)
+
+            # Too many changes upload everything
+            T._pending_data = []
+            for i in range(3):
+                S.mark_dirty(i, i + 1)
+            T._sync_source()
+            data, offset = T._pending_data[0]
+            assert data.shape == (8, 6, 3)
+            assert offset == (0, 0, 0)
+
+            # Scalar data gets a channel dimension
+            S2 = SharedArray(shape=(4, 4), dtype=np.float32)
+            T = Texture2D(S2)
+            S2.mark_dirty(1, 2)
+            T._pending_data = []
+            T._sync_source()
+            assert T._pending_data[0][0].shape == (1, 4, 1)
+            S2.unlink()
+
+            T.set_data(np.zeros((4, 4), np.float32))
+            assert T.source is None
+            self.assertRaises(ValueError, T.set_data, S2, offset=(0, 0))
+        finally:
+            S.unlink()
+
+
+if __name__ == "__main__":
+    unittest.main()
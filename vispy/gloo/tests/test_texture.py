@@ -7,7 +7,8 @@ import unittest
 import numpy as np
 
 from vispy.util import use_log_level
-from vispy.gloo import Texture2D, Texture3D, gl
+from vispy.gloo import Texture2D, Texture3D, TextureAtlas, gl
+from vispy.gloo.texture import _coalesce_regions, GL_LUMINANCE16
 from vispy.testing import requires_pyopengl
 
 # here we test some things that will be true of all Texture types:
@@ -241,6 +242,27 @@ class TextureTest(unittest.TestCase):
         assert len(T._pending_data) == 2
         assert np.allclose(data[5:, 5:], np.ones((5, 5)))
 
+    # Overwritten and adjacent regions
+    # ---------------------------------
+    def test_pending_coalesce(self):
+
+        data = np.zeros((10, 10), dtype=np.uint8)
+        T = Texture(data=data)
+        T.set_data(np.ones((2, 3), np.uint8), offset=(2, 2, 0))
+        T.set_data(2 * np.ones((4, 4), np.uint8), offset=(1, 1, 0))
+        # The first upload was overwritten completely
+        assert len(T._pending_data) == 2
+        T.set_data(3 * np.ones((4, 6), np.uint8), offset=(1, 4, 0))
+        T.set_data(4 * np.ones((1, 1), np.uint8), offset=(9, 9, 0))
+        pending = _coalesce_regions(T._pending_data[1:])
+        assert len(pending) == 2
+        merged, offset = pending[0]
+        assert offset == (1, 1, 0)
+        assert merged.shape == (4, 9, 1)
+        assert merged[0, :3].ravel().tolist() == [2, 2, 2]
+        assert merged[0, 3:].ravel().tolist() == [3] * 6
+        assert pending[1][1] == (9, 9, 0)
+
     # Set non contiguous data
     # ---------------------------------
     def test_setitem_wrong(self):
@@ -309,6 +331,15 @@ class Texture2DTest(unittest.TestCase):
         assert not T._pending_data
         assert len(T._pending_data) == 0
 
+        # A sized internal format does not survive a change of format
+        T = Texture2D(data=data, internalformat=GL_LUMINANCE16)
+        T.resize((10, 10, 4))
+        assert T._format == gl.GL_RGBA
+        assert T.internalformat is None
+        T = Texture2D(data=data, internalformat=GL_LUMINANCE16)
+        T.resize((5, 5))
+        assert T.internalformat == GL_LUMINANCE16
+
     # Resize with bad shape
     # ---------------------------------
     def test_resize_bad_shape(self):
@@ -598,6 +629,74 @@ class Texture3DTest(unittest.TestCase):
         self.assertRaises(ValueError, T.set_data, newdata)
 
 
+# ------------------------------------------------------------ TextureAtlas ---
+class TextureAtlasTest(unittest.TestCase):
+
+    def test_skyline(self):
+        T = TextureAtlas((16, 16), dtype=np.uint8, channels=1)
+        assert T.shape == (16, 16, 1)
+        assert T.get_free_region(10, 4) == (0, 0, 10, 4)
+        assert T.get_free_region(6, 6) == (10, 0, 6, 6)
+        assert T.get_free_region(4, 4) == (0, 4, 4, 4)
+        assert sorted(T._skyline.items()) == [(0, [8, None, 4]),
+                                              (4, [4, 0, 10]),
+                                              (10, [6, 4, 16])]
+        assert T.get_free_region(12, 2) == (4, 6, 12, 2)
+        # merged with the segment to the left, which has the same height
+        assert T._skyline == {0: [8, None, 16]}
+        assert T.get_free_region(17, 1) is None
+        assert T.get_free_region(1, 9) is None
+
+    def test_free_region(self):
+        T = TextureAtlas((16, 16), dtype=np.uint8, channels=1)
+        region = T.get_free_region(16, 16)
+        assert T.get_free_region(4, 4) is None
+        T.free_region(region)
+        assert T.get_free_region(4, 6) == (0, 0, 4, 6)
+        assert T.get_free_region(12, 6) == (4, 0, 12, 6)
+        assert T.get_free_region(16, 10) == (0, 6, 16, 10)
+        assert T.get_free_region(1, 1) is None
+        # Adjacent freed regions are merged
+        T = TextureAtlas((16, 16), dtype=np.uint8, channels=1)
+        regions = [T.get_free_region(8, 8) for i in range(4)]
+        assert T.get_free_region(1, 1) is None
+        T.free_region(regions[0])
+        T.free_region(regions[1])
+        assert T.get_free_region(16, 8) == (0, 0, 16, 8)
+        T.free_region(regions[2])
+        assert T.get_free_region(8, 2) == (0, 8, 8, 2)
+        assert T._free_regions == [(0, 10, 8, 6)]
+        # Once everything is freed, the whole atlas is available again
+        for region in [(0, 0, 16, 8), (0, 8, 8, 2), regions[3]]:
+            T.free_region(region)
+        assert T._free_regions == []
+        assert T.get_free_region(16, 16) == (0, 0, 16, 16)
+
+    def test_grow(self):
+        T = TextureAtlas((8, 8), dtype=np.uint8, channels=1,
+                         max_shape=(16, 16))
+        T.set_data(np.ones((8, 8, 1), np.uint8))
+        assert T.get_free_region(8, 8) == (0, 0, 8, 8)
+        # grows in height first, then in width
+        assert T.get_free_region(8, 8) == (0, 8, 8, 8)
+        assert T.shape == (16, 8, 1)
+        assert T.get_free_region(4, 4) == (8, 0, 4, 4)
+        assert T.shape == (16, 16, 1)
+        assert T.get_free_region(16, 1) is None
+        # the content is kept
+        data, offset = T._pending_data[-1]
+        assert offset == (0, 0, 0) and data.shape == (16, 16, 1)
+        assert data[:8, :8].min() == 1 and data[8:].max() == 0
+        # Textures that can be rendered to are copied on the GPU
+        T = TextureAtlas((8, 8), dtype=np.uint8, max_shape=(16, 8))
+        T.get_free_region(8, 8)
+        T._need_create, T._pending_data = False, []  # as if uploaded
+        T.set_data(np.ones((1, 1, 3), np.uint8), offset=(0, 0, 0))
+        assert T.get_free_region(8, 8) == (0, 8, 8, 8)
+        assert T._copy_shape == (8, 8)
+        assert T._need_resize and len(T._pending_data) == 1
+
+
 # -----------------------------------------------------------------------------
 if __name__ == "__main__":
     unittest.main()
@@ -3,15 +3,19 @@
 # Copyright (c) 2014, Vispy Development Team. All Rights Reserved.
 # Distributed under the (new) BSD License. See LICENSE.txt for more info.
 # -----------------------------------------------------------------------------
+from bisect import bisect_left, insort
+
 import numpy as np
 
 from . import gl
 from .globject import GLObject
+from .shared import SharedArray
 from .wrappers import _check_conversion
 from ..util import logger
 
 
 GL_SAMPLER_3D = 35679
+GL_LUMINANCE16 = 32834  # desktop GL only
 
 
 def _check_pyopengl_3D():
@@ -51,6 +55,52 @@ def _check_value(value, valid_dict):
     return tuple(_check_conversion(v, valid_dict) for v in value)
 
 
+def _region_volume(lo, hi):
+    return int(np.prod([max(0, b - a) for a, b in zip(lo, hi)]))
+
+
+def _coalesce_regions(pending):
+    """ Merge consecutive pending (data, offset) uploads whose regions
+    overlap or touch, and together form a box, into a single upload.
+    The order of the uploads is maintained, so later data wins.
+    """
+    groups = []  # list of (lo, hi, members)
+    for data, offset in pending:
+        if data.ndim != len(offset):
+            # Cannot determine the region, upload as-is
+            groups.append((None, None, [(data, offset)]))
+            continue
+        lo = tuple(offset)
+        hi = tuple(o + n for o, n in zip(offset, data.shape))
+        if groups and groups[-1][0] is not None:
+            glo, ghi, members = groups[-1]
+            mlo = tuple(map(min, glo, lo))
+            mhi = tuple(map(max, ghi, hi))
+            overlap = _region_volume(tuple(map(max, glo, lo)),
+                                     tuple(map(min, ghi, hi)))
+            union = (_region_volume(glo, ghi) + _region_volume(lo, hi) -
+                     overlap)
+            if _region_volume(mlo, mhi) == union:
+                members.append((data, offset))
+                groups[-1] = mlo, mhi, members
+                continue
+        groups.append((lo, hi, [(data, offset)]))
+
+    result = []
+    for lo, hi, members in groups:
+        if len(members) == 1:
+            result.append(members[0])
+            continue
+        merged = np.empty([b - a for a, b in zip(lo, hi)],
+                          dtype=members[0][0].dtype)
+        for data, offset in members:
+            key = tuple(slice(o - a, o - a + n)
+                        for o, a, n in zip(offset, lo, data.shape))
+            merged[key] = data
+        result.append((merged, lo))
+    return result
+
+
 # ----------------------------------------------------------- Texture class ---
 class BaseTexture(GLObject):
     """
@@ -62,8 +112,9 @@ class BaseTexture(GLObject):
     target : GLEnum
         gl.GL_TEXTURE2D
         gl.GL_TEXTURE_CUBE_MAP
-    data : ndarray
-        Texture data (optional)
+    data : ndarray | SharedArray
+        Texture data (optional). The changes to a SharedArray are uploaded
+        each time the texture is activated.
     shape : tuple of integers
         Texture shape (optional)
     dtype : dtype
@@ -85,6 +136,11 @@ class BaseTexture(GLObject):
         or GL_RGB, GL_RGBA). If not given the format is chosen automatically
         based on the number of channels. When the data has one channel,
         'luminance' is assumed.
+    internalformat : ENUM | None
+        The format in which GL stores the texture, e.g. a sized format such
+        as GL_LUMINANCE16 (desktop GL only). By default the format is used,
+        which lets the driver choose the precision (often 8 bits). It is
+        reset when the texture is resized to another number of channels.
     """
     _ndim = 2
 
@@ -117,7 +173,7 @@ class BaseTexture(GLObject):
 
     def __init__(self, data=None, shape=None, dtype=None, base=None,
                  target=None, offset=None, store=True, resizeable=True,
-                 format=None):
+                 format=None, internalformat=None):
         GLObject.__init__(self)
         self._data = None
         self._base = base
@@ -126,9 +182,12 @@ class BaseTexture(GLObject):
         self._target = target
         self._offset = offset
         self._pending_data = []
+        self._source = None  # SharedArray the data comes from
+        self._source_generation = 0
         self._resizeable = resizeable
         self._valid = True
         self._views = []
+        self._internalformat = internalformat
 
         # Extra stages that are handled in _activate()
         self._need_resize = False
@@ -138,6 +197,11 @@ class BaseTexture(GLObject):
             self.wrapping = 'clamp_to_edge'
 
         # Do we have data to build texture upon ?
+        source = None
+        if isinstance(data, SharedArray):
+            if dtype is not None and np.dtype(dtype) != data.dtype:
+                raise ValueError("Cannot convert the dtype of a SharedArray")
+            source, data = data, data.array
         if data is not None:
             self._need_resize = True
             # Handle dtype
@@ -159,7 +223,7 @@ class BaseTexture(GLObject):
                     data = data.copy()
                 self._data = data
             # Set data
-            self.set_data(data, copy=False)
+            self.set_data(data if source is None else source, copy=False)
         elif dtype is not None:
             if shape is not None:
                 self._need_resize = True
@@ -247,6 +311,11 @@ class BaseTexture(GLObject):
         """ Texture data type """
         return self._dtype
 
+    @property
+    def internalformat(self):
+        """ Texture internal format (None if it is the format) """
+        return self._internalformat
+
     @property
     def base(self):
         """ Texture base if this texture is a view on another texture """
@@ -321,12 +390,14 @@ class BaseTexture(GLObject):
         if shape == self.shape:
             return
 
-        # Reset format if size of last dimension differs
+        # Reset format if size of last dimension differs; an internal
+        # format that was given for the old format may not fit the new one
         if shape[-1] != self.shape[-1]:
             format = BaseTexture._formats.get(shape[-1], None)
             if format is None:
                 raise ValueError("Cannot determine texture format from shape")
             self._format = format
+            self._internalformat = None
 
         # Invalidate any view on this texture
         for view in self._views:
@@ -334,6 +405,7 @@ class BaseTexture(GLObject):
         self._views = []
 
         self._pending_data = []
+        self._source = None
         self._need_resize = True
         self._shape = shape
         if self._data is not None and self._store:
@@ -348,8 +420,9 @@ class BaseTexture(GLObject):
         Parameters
         ----------
 
-        data : ndarray
-            Data to be uploaded
+        data : ndarray | SharedArray
+            Data to be uploaded. A SharedArray must cover the whole texture,
+            and its changes are uploaded when the texture is activated.
         offset: int or tuple of ints
             Offset in texture where to start copying data
         copy: bool
@@ -369,6 +442,15 @@ class BaseTexture(GLObject):
             self.base.set_data(data, offset=self.offset, copy=copy)
             return
 
+        source = None
+        if isinstance(data, SharedArray):
+            if copy or offset is not None:
+                raise ValueError("A SharedArray cannot be copied or set "
+                                 "with an offset")
+            source, data = data, data.array
+        elif offset is None:
+            self._source = None
+
         # Force using the same data type. We could probably allow it,
         # but with the views and data storage, this is rather complex.
         if data.dtype != self.dtype:
@@ -404,8 +486,41 @@ class BaseTexture(GLObject):
             # todo: @nico should we not update self._data?
             # but we need to keep the offset into account.
 
+        # Drop pending uploads that this data overwrites completely
+        offset = tuple(offset)
+        if data.ndim == len(offset):
+            end = tuple(o + n for o, n in zip(offset, data.shape))
+            self._pending_data = [
+                (d, o) for d, o in self._pending_data
+                if not (d.ndim == len(o) and
+                        all(a <= b for a, b in zip(offset, o)) and
+                        all(b + n <= e for b, n, e in zip(o, d.shape, end)))]
         self._pending_data.append((data, offset))
 
+        if source is not None:
+            if self._store:
+                self._data = data
+            self._source = source
+            self._source_generation = source.generation
+
+    @property
+    def source(self):
+        """ The SharedArray that the data comes from, or None """
+        return self._source
+
+    def _sync_source(self):
+        """ Queue the rows (or slices) that changed in the shared array """
+        regions, self._source_generation = \
+            self._source.changes(self._source_generation)
+        data = self._normalize_shape(self._source.array)
+        if regions is None:
+            self._pending_data = []
+            regions = [(0, len(data))]
+        for start, stop in regions:
+            # Contiguous rows of the shared memory, not a copy
+            offset = (start,) + (0,) * (len(self.shape) - 1)
+            self._pending_data.append((data[start:stop], offset))
+
     def __getitem__(self, key):
         """ x.__getitem__(y) <==> x[y] """
         if self.base is not None:
@@ -567,6 +682,9 @@ class BaseTexture(GLObject):
             self._parameterize()
             self._need_parameterization = False
 
+        if self._source is not None:
+            self._sync_source()
+
         # Update pending data if necessary
         if self._pending_data:
             logger.debug("GPU: Updating texture (%d pending operation(s))" %
@@ -629,11 +747,16 @@ class Texture2D(BaseTexture):
         or GL_RGB, GL_RGBA). If not given the format is chosen automatically
         based on the number of channels. When the data has one channel,
         'luminance' is assumed.
+    internalformat : ENUM | None
+        The format in which GL stores the texture, e.g. a sized format such
+        as GL_LUMINANCE16 (desktop GL only). By default the format is used,
+        which lets the driver choose the precision (often 8 bits). It is
+        reset when the texture is resized to another number of channels.
     """
     _ndim = 2
 
     def __init__(self, data=None, shape=None, dtype=None, store=True,
-                 format=None, **kwargs):
+                 format=None, internalformat=None, **kwargs):
 
         # We don't want these parameters to be seen from outside (because they
         # are only used internally)
@@ -643,7 +766,7 @@ class Texture2D(BaseTexture):
         BaseTexture.__init__(self, data=data, shape=shape, dtype=dtype,
                              base=base, resizeable=resizeable, store=store,
                              target=gl.GL_TEXTURE_2D, offset=offset,
-                             format=format)
+                             format=format, internalformat=internalformat)
 
     @property
     def height(self):
@@ -666,14 +789,16 @@ class Texture2D(BaseTexture):
         logger.debug("GPU: Resizing texture(%sx%s)" %
                      (self.width, self.height))
         shape = self.height, self.width
-        gl.glTexImage2D(self.target, 0, self._format, self._format,
-                        self._gtype, shape)
+        gl.glTexImage2D(self.target, 0, self._internalformat or self._format,
+                        self._format, self._gtype, shape)
 
     def _update_data(self):
         """ Texture update on GPU """
+        # Merge adjacent and overlapping regions
+        pending = _coalesce_regions(self._pending_data)
+        self._pending_data = []
         # Update data
-        while self._pending_data:
-            data, offset = self._pending_data.pop(0)
+        for data, offset in pending:
             x = y = 0
             if offset is not None:
                 y, x = offset[0], offset[1]
@@ -710,11 +835,16 @@ class Texture3D(BaseTexture):
         or GL_RGB, GL_RGBA). If not given the format is chosen automatically
         based on the number of channels. When the data has one channel,
         'luminance' is assumed.
+    internalformat : ENUM | None
+        The format in which GL stores the texture, e.g. a sized format such
+        as GL_LUMINANCE16 (desktop GL only). By default the format is used,
+        which lets the driver choose the precision (often 8 bits). It is
+        reset when the texture is resized to another number of channels.
     """
     _ndim = 3
 
     def __init__(self, data=None, shape=None, dtype=None, store=True,
-                 format=None, **kwargs):
+                 format=None, internalformat=None, **kwargs):
 
         # Import from PyOpenGL
         _gl = _check_pyopengl_3D()
@@ -727,7 +857,7 @@ class Texture3D(BaseTexture):
         BaseTexture.__init__(self, data=data, shape=shape, dtype=dtype,
                              base=base, resizeable=resizeable, store=store,
                              target=_gl.GL_TEXTURE_3D, offset=offset,
-                             format=format)
+                             format=format, internalformat=internalformat)
 
     @property
     def width(self):
@@ -754,13 +884,16 @@ class Texture3D(BaseTexture):
         """ Texture resize on GPU """
         logger.debug("GPU: Resizing texture(%sx%sx%s)" %
                      (self.depth, self.height, self.width))
-        glTexImage3D(self.target, 0, self._format, self._format,
-                     self._gtype, (self.depth, self.height, self.width))
+        glTexImage3D(self.target, 0, self._internalformat or self._format,
+                     self._format, self._gtype,
+                     (self.depth, self.height, self.width))
 
     def _update_data(self):
         """ Texture update on GPU """
-        while self._pending_data:
-            data, offset = self._pending_data.pop(0)
+        # Merge adjacent and overlapping regions
+        pending = _coalesce_regions(self._pending_data)
+        self._pending_data = []
+        for data, offset in pending:
             z = y = x = 0
             if offset is not None:
                 z, y, x = offset[0], offset[1], offset[2]
@@ -779,33 +912,58 @@ class Texture3D(BaseTexture):
 class TextureAtlas(Texture2D):
     """Group multiple small data regions into a larger texture.
 
-    The algorithm is based on the article by Jukka Jylänki : "A Thousand Ways
+    The algorithm is based on the article by Jukka Jylänki : "A Thousand Ways
     to Pack the Bin - A Practical Approach to Two-Dimensional Rectangle Bin
     Packing", February 27, 2010. More precisely, this is an implementation of
     the Skyline Bottom-Left algorithm based on C++ sources provided by Jukka
-    Jylänki at: http://clb.demon.fi/files/RectangleBinPack/.
+    Jylänki at: http://clb.demon.fi/files/RectangleBinPack/.
 
     Parameters
     ----------
     shape : tuple of int
         Texture width and height (optional).
+    dtype : dtype
+        The data type of the texture (default float32).
+    channels : int
+        The number of channels (default 3). Note that only textures with
+        3 or 4 channels can be rendered to.
+    max_shape : tuple of int | None
+        If given, the atlas grows when it is full, by doubling its height
+        or width, up to this shape. The content of the texture is kept
+        (copied on the GPU), but texture coordinates of existing regions
+        change.
 
     Notes
     -----
-    This creates a 2D texture that holds 1D float32 data.
+    This creates a 2D texture that holds 1D float32 data (by default).
     An example of simple access:
 
         >>> atlas = TextureAtlas()
         >>> bounds = atlas.get_free_region(20, 30)
         >>> atlas.set_region(bounds, np.random.rand(20, 30).T)
+
+    Regions that are no longer used can be released with ``free_region``,
+    after which the space can be allocated again. Adjacent released regions
+    are merged, and once all regions are released the atlas starts over
+    empty.
     """
-    def __init__(self, shape=(1024, 1024)):
+    def __init__(self, shape=(1024, 1024), dtype=np.float32, channels=3,
+                 max_shape=None):
         shape = np.array(shape, int)
         assert shape.ndim == 1 and shape.size == 2
-        shape = tuple(2 ** (np.log2(shape) + 0.5).astype(int)) + (3,)
-        self._atlas_nodes = [(0, 0, shape[1])]
-        data = np.zeros(shape, np.float32)
-        super(TextureAtlas, self).__init__(data)
+        shape = tuple(2 ** (np.log2(shape) + 0.5).astype(int)) + (channels,)
+        # The skyline: [y, previous x, next x] of the segment at each x,
+        # and the (y, x) of the segments sorted from low to high
+        self._skyline = {0: [0, None, shape[1]]}
+        self._skyline_order = [(0, 0)]
+        self._free_regions = []
+        self._n_regions = 0  # the number of allocated regions
+        self._max_shape = None if max_shape is None else tuple(max_shape)
+        self._copy_shape = None
+        data = np.zeros(shape, dtype)
+        # Textures that cannot be rendered to are grown using a copy on CPU
+        self._mirror = data if channels < 3 else None
+        super(TextureAtlas, self).__init__(data, store=False)
         self.interpolation = 'linear'
         self.wrapping = 'clamp_to_edge'
 
@@ -825,66 +983,196 @@ class TextureAtlas(Texture2D):
             A newly allocated region as (x, y, w, h) or None
             (if failed).
         """
-        best_height = best_width = np.inf
-        best_index = -1
-        for i in range(len(self._atlas_nodes)):
-            y = self._fit(i, width, height)
-            if y >= 0:
-                node = self._atlas_nodes[i]
-                if (y+height < best_height or
-                        (y+height == best_height and node[2] < best_width)):
-                    best_height = y+height
-                    best_index = i
-                    best_width = node[2]
-                    region = node[0], y, width, height
-        if best_index == -1:
-            return None
+        region = self._get_freed_region(width, height)
+        if region is None:
+            region = self._get_skyline_region(width, height)
+        while region is None and self._grow():
+            region = self._get_skyline_region(width, height)
+        if region is not None:
+            self._n_regions += 1
+        return region
 
-        node = region[0], region[1] + height, width
-        self._atlas_nodes.insert(best_index, node)
-        i = best_index+1
-        while i < len(self._atlas_nodes):
-            node = self._atlas_nodes[i]
-            prev_node = self._atlas_nodes[i-1]
-            if node[0] < prev_node[0]+prev_node[2]:
-                shrink = prev_node[0]+prev_node[2] - node[0]
-                x, y, w = self._atlas_nodes[i]
-                self._atlas_nodes[i] = x+shrink, y, w-shrink
-                if self._atlas_nodes[i][2] <= 0:
-                    del self._atlas_nodes[i]
-                    i -= 1
+    def free_region(self, region):
+        """Release a region, so that it can be allocated again
+
+        Parameters
+        ----------
+        region : tuple
+            A region (x, y, w, h) returned by ``get_free_region``.
+        """
+        self._n_regions -= 1
+        if self._n_regions <= 0:
+            # Nothing is allocated anymore: start over with an empty skyline
+            self._n_regions = 0
+            self._skyline = {0: [0, None, self.shape[1]]}
+            self._skyline_order = [(0, 0)]
+            self._free_regions = []
+            return
+        self._add_freed_region(tuple(int(r) for r in region))
+
+    def _add_freed_region(self, region):
+        """Add a freed region, merged with the freed regions that share a
+        whole edge with it
+        """
+        x, y, w, h = region
+        regions = self._free_regions
+        merged = True
+        while merged:
+            merged = False
+            for other in regions:
+                ox, oy, ow, oh = other
+                if oy == y and oh == h and (ox + ow == x or x + w == ox):
+                    x, w = min(x, ox), w + ow
+                elif ox == x and ow == w and (oy + oh == y or y + h == oy):
+                    y, h = min(y, oy), h + oh
                 else:
-                    break
-            else:
+                    continue
+                regions.remove(other)
+                merged = True
+                break
+        regions.append((x, y, w, h))
+
+    def _get_freed_region(self, width, height):
+        """Allocate (part of) the smallest fitting freed region"""
+        fits = [r for r in self._free_regions
+                if r[2] >= width and r[3] >= height]
+        if not fits:
+            return None
+        x, y, w, h = min(fits, key=lambda r: r[2] * r[3])
+        self._free_regions.remove((x, y, w, h))
+        # Split the remainder in a region right of and one below the result
+        if w > width:
+            self._add_freed_region((x + width, y, w - width, height))
+        if h > height:
+            self._add_freed_region((x, y + height, w, h - height))
+        return x, y, width, height
+
+    def _get_skyline_region(self, width, height):
+        """Allocate a region on top of the skyline
+
+        The segments are visited from low to high, so that the search can
+        stop at the first segment that is higher than the best fit found.
+        """
+        nodes, order = self._skyline, self._skyline_order
+        max_h, max_w = self.shape[:2]
+        best = None
+        for y, x in order:
+            top = y + height
+            if top > max_h or (best is not None and top > best[0]):
                 break
-            i += 1
-
-        # Merge nodes
-        i = 0
-        while i < len(self._atlas_nodes)-1:
-            node = self._atlas_nodes[i]
-            next_node = self._atlas_nodes[i+1]
-            if node[1] == next_node[1]:
-                self._atlas_nodes[i] = node[0], node[1], node[2]+next_node[2]
-                del self._atlas_nodes[i+1]
+            stop = x + width
+            if stop > max_w:
+                continue
+            # The region rests on the highest segment below it
+            nx = nodes[x][2]
+            w = nx - x
+            while nx < stop:
+                ny, _, nx_next = nodes[nx]
+                top = max(top, ny + height)
+                nx = nx_next
+            # lowest top first, then the narrowest segment, then the leftmost
+            if top <= max_h and (best is None or (top, w, x) < best):
+                best = top, w, x
+        if best is None:
+            return None
+        top, _, x = best
+        stop = x + width
+
+        # Update the skyline, and merge segments with the same height
+        left = nodes[x][1]
+        nx = x
+        while nx < stop:
+            y, _, nx_next = nodes.pop(nx)
+            del order[bisect_left(order, (y, nx))]
+            nx = nx_next
+        new = [(x, top)]
+        if nx > stop:
+            new.append((stop, y))
+        if left is not None and nodes[left][0] == top:
+            del new[0]
+        y = new[-1][1] if new else top
+        if nx < max_w and nodes[nx][0] == y:
+            del order[bisect_left(order, (y, nx))]
+            nx = nodes.pop(nx)[2]
+        for node_x, node_y in new:
+            nodes[node_x] = [node_y, left, None]
+            insort(order, (node_y, node_x))
+            if left is not None:
+                nodes[left][2] = node_x
+            left = node_x
+        nodes[left][2] = nx
+        if nx < max_w:
+            nodes[nx][1] = left
+        return x, top - height, width, height
+
+    def _grow(self):
+        """Double the height or width of the atlas, keeping its content.
+        Returns False if the atlas cannot grow.
+        """
+        if self._max_shape is None:
+            return False
+        h, w = self.shape[:2]
+        max_h, max_w = self._max_shape
+        if (h <= w or w * 2 > max_w) and h * 2 <= max_h:
+            shape = (h * 2, w)
+        elif w * 2 <= max_w:
+            shape = (h, w * 2)
+        else:
+            return False
+        logger.debug('Growing texture atlas to %sx%s' % shape)
+        pending = self._pending_data
+        self.resize(shape + self.shape[2:])
+        if self._mirror is not None:
+            # Copy on CPU: upload all content again
+            mirror = np.zeros(self.shape, self.dtype)
+            mirror[:h, :w] = self._mirror
+            self._mirror = mirror
+            self._pending_data = [(mirror, (0, 0, 0))]
+        else:
+            # Copy on GPU when the texture is next activated, then apply
+            # pending updates
+            if not self._need_create and self._copy_shape is None:
+                self._copy_shape = (h, w)
+            self._pending_data = pending
+        if shape[1] > w:
+            last = [x for x, node in self._skyline.items() if node[2] == w][0]
+            if self._skyline[last][0] == 0:
+                self._skyline[last][2] = shape[1]
             else:
-                i += 1
+                self._skyline[last][2] = w
+                self._skyline[w] = [0, last, shape[1]]
+                insort(self._skyline_order, (0, w))
+        return True
 
-        return region
+    def set_data(self, data, offset=None, copy=False):
+        Texture2D.set_data(self, data, offset, copy)
+        if self._mirror is not None:
+            data = self._normalize_shape(np.asarray(data))
+            if offset is None:
+                self._mirror = data.copy()
+                return
+            index = tuple(slice(o, o + n) for o, n in zip(offset, data.shape))
+            self._mirror[index] = data
+    set_data.__doc__ = Texture2D.set_data.__doc__
 
-    def _fit(self, index, width, height):
-        """Test if region (width, height) fit into self._atlas_nodes[index]"""
-        node = self._atlas_nodes[index]
-        x, y = node[0], node[1]
-        width_left = width
-        if x+width > self.shape[1]:
-            return -1
-        i = index
-        while width_left > 0:
-            node = self._atlas_nodes[i]
-            y = max(y, node[1])
-            if y+height > self.shape[0]:
-                return -1
-            width_left -= node[2]
-            i += 1
-        return y
+    def _resize(self):
+        """ Texture resize on GPU, copying the old content if needed """
+        if self._copy_shape is None:
+            return Texture2D._resize(self)
+        h, w = self._copy_shape
+        self._copy_shape = None
+        old_handle = self._handle
+        self._handle = gl.glCreateTexture()
+        gl.glBindTexture(self.target, self._handle)
+        Texture2D._resize(self)
+        self._need_parameterization = True
+        # Attach the old texture to a framebuffer to copy from
+        old_fbo = gl.glGetParameter(gl.GL_FRAMEBUFFER_BINDING)
+        fbo = gl.glCreateFramebuffer()
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, fbo)
+        gl.glFramebufferTexture2D(gl.GL_FRAMEBUFFER, gl.GL_COLOR_ATTACHMENT0,
+                                  self.target, old_handle, 0)
+        gl.glCopyTexSubImage2D(self.target, 0, 0, 0, 0, 0, w, h)
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, old_fbo or 0)
+        gl.glDeleteFramebuffer(fbo)
+        gl.glDeleteTexture(old_handle)
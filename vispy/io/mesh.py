@@ -5,12 +5,19 @@
 """ Reading and writing of data like images and meshes.
 """
 
+import os
 from os import path as op
 
+import numpy as np
+
 from .wavefront import WavefrontReader, WavefrontWriter
+from ..util import logger
+
+_CACHE_VERSION = 1
+_MESH_NAMES = ('vertices', 'faces', 'normals', 'texcoords')
 
 
-def read_mesh(fname):
+def read_mesh(fname, cache=True):
     """Read mesh data from file.
 
     Parameters
@@ -18,6 +25,10 @@ def read_mesh(fname):
     fname : str
         File name to read. Format will be inferred from the filename.
         Currently only '.obj' and '.obj.gz' are supported.
+    cache : bool
+        If True, the parsed mesh is stored in a binary file next to the
+        original (``fname + '.npz'``), which is read instead of parsing
+        the file again as long as the file is not modified.
 
     Returns
     -------
@@ -36,7 +47,12 @@ def read_mesh(fname):
         fmt = op.splitext(op.splitext(fname)[0])[1].lower()
 
     if fmt in ('.obj'):
-        return WavefrontReader.read(fname)
+        mesh = _read_mesh_cache(fname) if cache else None
+        if mesh is None:
+            mesh = WavefrontReader.read(fname)
+            if cache:
+                _write_mesh_cache(fname, mesh)
+        return mesh
     elif not format:
         raise ValueError('read_mesh needs could not determine format.')
     else:
@@ -74,3 +90,44 @@ def write_mesh(fname, vertices, faces, normals, texcoords, name='',
     if format not in ('obj'):
         raise ValueError('Only "obj" format writing currently supported')
     WavefrontWriter.write(fname, vertices, faces, normals, texcoords, name)
+    if op.isfile(fname + '.npz'):
+        os.remove(fname + '.npz')  # stale cache of a previous file
+
+
+def _file_stamp(fname):
+    """The modification time and size of a file"""
+    stat = os.stat(fname)
+    return np.array([stat.st_mtime, stat.st_size], np.float64)
+
+
+def _read_mesh_cache(fname):
+    """Read the cached mesh data of a file, or None if not up to date"""
+    cache_fname = fname + '.npz'
+    if not op.isfile(fname) or not op.isfile(cache_fname):
+        return None
+    try:
+        with np.load(cache_fname) as data:
+            if (int(data['version']) != _CACHE_VERSION or
+                    not np.array_equal(data['stamp'], _file_stamp(fname))):
+                return None
+            return tuple(data[name] if name in data.files else None
+                         for name in _MESH_NAMES)
+    except (IOError, OSError, ValueError, KeyError) as err:
+        logger.debug('Could not read mesh cache %s: %s' % (cache_fname, err))
+        return None
+
+
+def _write_mesh_cache(fname, mesh):
+    """Store mesh data in a binary file next to the original file"""
+    cache_fname = fname + '.npz'
+    arrays = dict((name, array) for name, array in zip(_MESH_NAMES, mesh)
+                  if array is not None)
+    try:
+        np.savez(cache_fname + '.tmp.npz', version=_CACHE_VERSION,
+                 stamp=_file_stamp(fname), **arrays)
+        if op.isfile(cache_fname):
+            os.remove(cache_fname)  # rename does not overwrite on Windows
+        os.rename(cache_fname + '.tmp.npz', cache_fname)
+    except (IOError, OSError) as err:
+        # e.g. a read-only directory; the file is then parsed each time
+        logger.debug('Could not write mesh cache %s: %s' % (cache_fname, err))
@@ -3,7 +3,7 @@
 # Distributed under the (new) BSD License. See LICENSE.txt for more info.
 import numpy as np
 from os import path as op
-from nose.tools import assert_equal, assert_raises
+from nose.tools import assert_equal, assert_raises, assert_true
 from numpy.testing import assert_allclose, assert_array_equal
 
 from vispy.io import write_mesh, read_mesh, load_data_file
@@ -36,6 +36,34 @@ def test_wavefront():
                     rtol=1e-7, atol=1e-7)
 
 
+def test_wavefront_polygons():
+    """Test reading polygons and the binary mesh cache"""
+    fname = op.join(temp_dir, 'polygons.obj')
+    with open(fname, 'w') as fid:
+        fid.write('# square and triangle\nv 0 0 0\nv 1 0 0 # corner\n'
+                  'v  1 1 0\nv 0 1 0 1.0\n\tv 2 0 0\nvt 0 0\nvt 1 0\n'
+                  'vt 1 1#\ng foo\nf 1/1 2/2 3/3 4/3\nf -4/1 -1/2 -3/3 \n')
+    vertices, faces, normals, texcoords = read_mesh(fname)
+    assert_array_equal(vertices, [[0, 0, 0], [1, 0, 0], [1, 1, 0],
+                                  [0, 1, 0], [1, 0, 0], [2, 0, 0]])
+    assert_array_equal(faces, [[0, 1, 2], [0, 2, 3], [4, 5, 2]])
+    assert_array_equal(texcoords, [[0, 0], [1, 0], [1, 1], [1, 1],
+                                   [0, 0], [1, 0]])
+    assert_allclose(normals[:4], [[0, 0, 1]] * 4)
+    assert_true(op.isfile(fname + '.npz'))
+
+    # The cache is used until the file changes
+    np.savez(fname + '.npz', **dict(np.load(fname + '.npz'),
+                                    vertices=vertices + 1))
+    assert_array_equal(read_mesh(fname)[0], vertices + 1)
+    assert_array_equal(read_mesh(fname, cache=False)[0], vertices)
+    with open(fname, 'a') as fid:
+        fid.write('f 1 2 3\n')
+    vertices, faces, normals, texcoords = read_mesh(fname)
+    assert_equal(len(faces), 4)
+    assert_equal(texcoords, None)  # not given for all faces
+
+
 def _slow_calculate_normals(rr, tris):
     """Efficiently compute vertex normals for triangulated surface"""
     # first, compute triangle normals
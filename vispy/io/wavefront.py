@@ -18,8 +18,10 @@ The classes are written with compatibility of Python3 in mind.
 
 """
 
-import numpy as np
+import re
 import time
+
+import numpy as np
 from os import path as op
 
 from ..ext.gzip_open import gzip_open
@@ -28,195 +30,218 @@ from ..util import logger
 
 
 class WavefrontReader(object):
+    """ Reader for the mesh data in an OBJ file.
+
+    The whole file is split into keywords and arguments once, after which
+    the numbers of each kind of line (vertices, normals, texcords and
+    faces) are parsed in bulk with numpy. Polygons are triangulated as
+    fans around their first corner.
+    """
 
     def __init__(self, f):
         self._f = f
 
-        # Original vertices, normals and texture coords.
-        # These are not necessarily of the same length.
-        self._v = []
-        self._vn = []
-        self._vt = []
-
-        # Final vertices, normals and texture coords.
-        # All three lists are of the same length, as opengl wants it.
-        self._vertices = []
-        self._normals = []
-        self._texcords = []
-
-        # The faces, indices to vertex/normal/texcords arrays.
-        self._faces = []
-
-        # Dictionary to keep track of processed face data, so we can
-        # convert the original v/vn/vn to the final vertices/normals/texcords.
-        self._facemap = {}
+        # Keyword and contents of each line
+        self._kw = None
+        self._lines = None
 
     @classmethod
     def read(cls, fname):
-        """ read(fname, fmt)
+        """ read(fname)
 
         This classmethod is the entry point for reading OBJ files.
 
         Parameters
         ----------
         fname : str
-            The name of the file to read.
-        fmt : str
-            Can be "obj" or "gz" to specify the file format.
+            The name of the file to read. Can be an ".obj" or ".gz" file.
         """
         # Open file
         fmt = op.splitext(fname)[1].lower()
         assert fmt in ('.obj', '.gz')
         opener = open if fmt == '.obj' else gzip_open
+        t0 = time.time()
         with opener(fname, 'rb') as f:
-            try:
-                reader = WavefrontReader(f)
-                while True:
-                    reader.readLine()
-            except EOFError:
-                pass
+            mesh = WavefrontReader(f).readMesh()
 
         # Done
-        t0 = time.time()
-        mesh = reader.finish()
         logger.debug('reading mesh took ' + str(time.time() - t0) + ' seconds')
         return mesh
 
-    def readLine(self):
-        """ The method that reads a line and processes it.
+    def readMesh(self):
+        """ Read and parse the complete file.
+
+        Returns
+        -------
+        vertices : array
+            Vertices.
+        faces : array | None
+            Triangle face definitions.
+        normals : array
+            Normals for the mesh.
+        texcoords : array | None
+            Texture coordinates.
         """
-
-        # Read line
-        line = self._f.readline().decode('ascii', 'ignore')
-        if not line:
-            raise EOFError()
-        line = line.strip()
-
-        if line.startswith('v '):
-            # self._vertices.append( *self.readTuple(line) )
-            self._v.append(self.readTuple(line))
-        elif line.startswith('vt '):
-            self._vt.append(self.readTuple(line, 3))
-        elif line.startswith('vn '):
-            self._vn.append(self.readTuple(line))
-        elif line.startswith('f '):
-            self._faces.append(self.readFace(line))
-        elif line.startswith('#'):
-            pass  # Comment
-        elif line.startswith('mtllib '):
-            logger.warning('Notice reading .OBJ: material properties are '
-                           'ignored.')
-        elif any(line.startswith(x) for x in ('g ', 's ', 'o ', 'usemtl ')):
-            pass  # Ignore groups and smoothing groups, obj names, material
-        elif not line.strip():
-            pass
+        self.readLines()
+        v = self.readTuples('v', 3)
+        idx, tris = self.readFaces()
+        if tris is None:
+            # Use vertices only
+            vertices = v.astype(np.float32)
+            return (vertices, None, self._calculate_normals(vertices, None),
+                    None)
+
+        # Each distinct combination of vertex/texcord/normal index becomes
+        # a final vertex, numbered in order of first appearance.
+        sizes = idx.max(axis=0) + 1
+        if np.prod(sizes.astype(np.float64)) < 2 ** 62:
+            keys = (idx[:, 0] * sizes[1] + idx[:, 1]) * sizes[2] + idx[:, 2]
         else:
-            logger.warning('Notice reading .OBJ: ignoring %s command.'
-                           % line.strip())
-
-    def readTuple(self, line, n=3):
-        """ Reads a tuple of numbers. e.g. vertices, normals or teture coords.
+            keys = np.ascontiguousarray(idx).view(
+                np.dtype((np.void, idx.dtype.itemsize * 3)))[:, 0]
+        _, first, inverse = np.unique(keys, return_index=True,
+                                      return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty(len(order), np.intp)
+        rank[order] = np.arange(len(order))
+        idx = idx[first[order]]
+        faces = rank[inverse][tris].astype(np.uint32)
+
+        vertices = v[idx[:, 0] - 1].astype(np.float32)
+        # If a single face does not specify the texcord index, the
+        # texcords are ignored. Likewise for the normals.
+        texcoords = normals = None
+        if (idx[:, 1] > 0).all():
+            vt = self.readTuples('vt', 3)
+            texcoords = vt[idx[:, 1] - 1].astype(np.float32)
+        elif (idx[:, 1] > 0).any():
+            logger.warning('Ignoring texture coordinates because '
+                           'it is not specified for all faces.')
+        if (idx[:, 2] > 0).all():
+            vn = self.readTuples('vn', 3)
+            normals = vn[idx[:, 2] - 1].astype(np.float32)
+        else:
+            if (idx[:, 2] > 0).any():
+                logger.warning('Ignoring normals because it is not '
+                               'specified for all faces.')
+            normals = self._calculate_normals(vertices, faces)
+        return vertices, faces, normals, texcoords
+
+    def readLines(self):
+        """ Read the file and get the keyword of each line.
         """
-        numbers = [num for num in line.split(' ') if num]
-        return [float(num) for num in numbers[1:n + 1]]
-
-    def readFace(self, line):
-        """ Each face consists of three or more sets of indices. Each set
-        consists of 1, 2 or 3 indices to vertices/normals/texcords.
+        text = self._f.read().decode('ascii', 'ignore').replace('\t', ' ')
+        if '#' in text:
+            # Comments can also follow the contents of a line
+            text = re.sub('#[^\r\n]*', '', text)
+        lines = text.splitlines()
+        if '\n ' in text or text.startswith(' '):
+            lines = [line.lstrip() for line in lines]
+        self._kw = np.array([line.partition(' ')[0] for line in lines])
+        self._lines = np.array(lines, dtype=object)
+
+        for kw in np.unique(self._kw):
+            if kw == 'mtllib':
+                logger.warning('Notice reading .OBJ: material properties are '
+                               'ignored.')
+            elif kw not in ('', 'v', 'vt', 'vn', 'f', 'g', 's', 'o',
+                            'usemtl'):
+                logger.warning('Notice reading .OBJ: ignoring %s command.'
+                               % kw)
+
+    def readArgs(self, kw):
+        """ Get the arguments of all lines with keyword kw as a string with
+        one line per line in the file, and the number of arguments of each.
         """
+        lines = self._lines[self._kw == kw]
+        text = '\n'.join(lines).replace(kw + ' ', '')
+        if ('  ' in text or ' \n' in text or '\n ' in text or
+                text.startswith(' ') or text.endswith(' ')):
+            text = re.sub(' *\n *', '\n', re.sub(' +', ' ', text)).strip()
+        counts = np.array([line.count(' ') + 1 for line in
+                           text.split('\n')] if text else [], np.intp)
+        return text, counts
+
+    def readTuples(self, kw, n=3):
+        """ Reads the tuples of numbers of all lines with keyword kw, e.g.
+        vertices, normals or texture coords. Gives an array with at most n
+        columns.
+        """
+        text, counts = self.readArgs(kw)
+        values = np.fromstring(text, sep=' ')
+        if values.size != counts.sum():
+            raise ValueError('Could not read the numbers of the "%s" lines'
+                             % kw)
+        if len(counts) and kw == 'vt':
+            n = min(n, counts.max())
+        if (counts == n).all():
+            return values.reshape(-1, n)
+        starts = np.cumsum(counts) - counts
+        tuples = np.zeros((len(counts), n))
+        for i in range(n):
+            mask = counts > i
+            tuples[mask, i] = values[starts[mask] + i]
+        return tuples
+
+    def readFaces(self):
+        """ Each face consists of three or more sets of indices. Each set
+        consists of 1, 2 or 3 indices to vertices/texcords/normals.
 
-        # Get parts (skip first)
-        indexSets = [num for num in line.split(' ') if num][1:]
-
-        final_face = []
-        for indexSet in indexSets:
-
-            # Did we see this exact index earlier? If so, it's easy
-            final_index = self._facemap.get(indexSet)
-            if final_index is not None:
-                final_face.append(final_index)
-                continue
-
-            # If not, we need to sync the vertices/normals/texcords ...
-
-            # Get and store final index
-            final_index = len(self._vertices)
-            final_face.append(final_index)
-            self._facemap[indexSet] = final_index
-
-            # What indices were given?
-            indices = [i for i in indexSet.split('/')]
-
-            # Store new set of vertex/normal/texcords.
-            # If there is a single face that does not specify the texcord
-            # index, the texcords are ignored. Likewise for the normals.
-            if True:
-                vertex_index = self._absint(indices[0], len(self._v))
-                self._vertices.append(self._v[vertex_index])
-            if self._texcords is not None:
-                if len(indices) > 1 and indices[1]:
-                    texcord_index = self._absint(indices[1], len(self._vt))
-                    self._texcords.append(self._vt[texcord_index])
-                else:
-                    if self._texcords:
-                        logger.warning('Ignoring texture coordinates because '
-                                       'it is not specified for all faces.')
-                    self._texcords = None
-            if self._normals is not None:
-                if len(indices) > 2 and indices[2]:
-                    normal_index = self._absint(indices[2], len(self._vn))
-                    self._normals.append(self._vn[normal_index])
-                else:
-                    if self._normals:
-                        logger.warning('Ignoring normals because it is not '
-                                       'specified for all faces.')
-                    self._normals = None
-
-        # Check face
-        if self._faces and len(self._faces[0]) != len(final_face):
-            raise RuntimeError(
-                'Vispy requires that all faces are either triangles or quads.')
-
-        # Done
-        return final_face
-
-    def _absint(self, i, ref):
-        i = int(i)
-        if i > 0:
-            return i - 1
+        Returns an (N, 3) array with the absolute 1-based indices of all
+        face corners, which are 0 where not given, and an (M, 3) array of
+        corners that form triangles. Both are None if there are no faces.
+        """
+        corners, counts = self.readArgs('f')
+        if len(counts) == 0:
+            return None, None
+        n = counts.sum()
+
+        # Give empty indices the value 0, e.g. "1//2" becomes "1/0/2"
+        corners = (corners + ' ').replace('//', '/0/').replace('/ ', '/0 ')
+        corners = corners.replace('/\n', '/0\n').replace('\n', ' ')
+        n_slash = corners.count('/')
+        if n_slash == 0:
+            ncol = 1
+        elif n_slash == 2 * n:
+            ncol = 3
+        elif n_slash == n and re.search(r'/[^ /]*/', corners) is None:
+            ncol = 2
         else:
-            return ref + i
-
-    def _calculate_normals(self):
-        vertices, faces = self._vertices, self._faces
+            ncol = 0  # mixed formats
+        if ncol:
+            values = np.fromstring(corners.replace('/', ' '), sep=' ')
+        if not ncol or values.size != n * ncol:
+            sets = [c.split('/') for c in corners.split()]
+            ncol = max(len(s) for s in sets)
+            values = np.array([int(i) for s in sets
+                               for i in s + ['0'] * (ncol - len(s))])
+        idx = np.zeros((n, 3), np.int64)
+        idx[:, :ncol] = values.reshape(n, ncol)[:, :3]
+
+        # Make relative (negative) indices absolute
+        for col, kw in enumerate(('v', 'vt', 'vn')):
+            neg = idx[:, col] < 0
+            if neg.any():
+                before = np.cumsum(self._kw == kw)[self._kw == 'f']
+                before = before.repeat(counts)
+                idx[neg, col] += before[neg] + 1
+
+        # Triangulate each polygon as a fan around its first corner
+        starts = np.cumsum(counts) - counts
+        n_tris = np.maximum(counts - 2, 0)
+        line = np.repeat(np.arange(len(counts)), n_tris)
+        offset = np.arange(n_tris.sum()) - (np.cumsum(n_tris) - n_tris)[line]
+        first = starts[line]
+        tris = np.column_stack([first, first + offset + 1, first + offset + 2])
+        return idx, tris
+
+    def _calculate_normals(self, vertices, faces):
         if faces is None:
             # ensure it's always 2D so we can use our methods
             faces = np.arange(0, vertices.size, dtype=np.uint32)[:, np.newaxis]
         normals = _calculate_normals(vertices, faces)
         return normals
 
-    def finish(self):
-        """ Converts gathere lists to numpy arrays and creates
-        BaseMesh instance.
-        """
-        self._vertices = np.array(self._vertices, 'float32')
-        if self._faces:
-            self._faces = np.array(self._faces, 'uint32')
-        else:
-            # Use vertices only
-            self._vertices = np.array(self._v, 'float32')
-            self._faces = None
-        if self._normals:
-            self._normals = np.array(self._normals, 'float32')
-        else:
-            self._normals = self._calculate_normals()
-        if self._texcords:
-            self._texcords = np.array(self._texcords, 'float32')
-        else:
-            self._texcords = None
-
-        return self._vertices, self._faces, self._normals, self._texcords
-
 
 class WavefrontWriter(object):
 
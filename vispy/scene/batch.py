@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Vispy Development Team.
+# Distributed under the (new) BSD License. See LICENSE.txt for more info.
+
+from __future__ import division
+
+import numpy as np
+
+from .. import gloo
+
+
+class VisualBatch(object):
+    """ The vertex data of a group of visuals, concatenated into shared
+    buffers so that the group can be drawn with a single draw call.
+
+    The DrawingSystem creates a VisualBatch for each group of sibling
+    visuals that have the same ``batch_key()``, and passes it to
+    ``draw_batch()`` of the first visual in the group. The batch is kept
+    between frames; the buffers are only rebuilt when the set of visuals
+    or the data of one of them changes.
+
+    Attributes
+    ----------
+    visuals : list
+        The visuals in this batch, in drawing order.
+    buffers : dict
+        A VertexBuffer for each vertex attribute returned by
+        ``Visual.batch_data()``.
+    index : IndexBuffer | None
+        The concatenated indices of all visuals.
+    program : object
+        Free for use by ``draw_batch()`` to store its program.
+    """
+
+    def __init__(self):
+        self.visuals = []
+        self.buffers = {}
+        self.index = None
+        self.program = None
+        self._sources = []
+
+    def set_visuals(self, visuals):
+        """ Set the visuals of this batch and update the buffers if
+        needed. Returns True if the buffers were rebuilt.
+        """
+        sources = [visual.batch_data() for visual in visuals]
+        if (len(sources) == len(self._sources) and
+                all(a is b for a, b in zip(sources, self._sources))):
+            return False
+        self.visuals = list(visuals)
+        self._sources = sources
+
+        names = sorted(name for name in sources[0] if name != 'index')
+        for name in names:
+            data = np.concatenate([s[name] for s in sources])
+            data = data.astype(np.float32)
+            if name in self.buffers:
+                self.buffers[name].set_data(data)
+            else:
+                self.buffers[name] = gloo.VertexBuffer(data)
+
+        if 'index' in sources[0]:
+            sizes = [len(s[names[0]]) for s in sources]
+            offsets = np.cumsum([0] + sizes[:-1])
+            index = np.concatenate([s['index'] + offset for s, offset
+                                    in zip(sources, offsets)])
+            index = index.astype(np.uint32)
+            if self.index is None:
+                self.index = gloo.IndexBuffer(index)
+            else:
+                self.index.set_data(index)
+        return True
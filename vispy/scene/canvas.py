@@ -12,6 +12,8 @@ from .subscene import SubScene
 from .entity import Entity
 from .transforms import STTransform, TransformCache
 from .events import SceneDrawEvent, SceneMouseEvent
+from .profiler import FrameProfiler
+from .shaders.program import ProgramCache, use_program_cache
 from ..color import Color
 from ..util import logger
 from .widgets import Widget
@@ -83,7 +85,17 @@ class SceneCanvas(app.Canvas):
         self._fb_stack = []  # for storing information about framebuffers used
         self._vp_stack = []  # for storing information about viewports used
         self._scene = None
+        self._profiler = None
         self._bgcolor = Color(kwargs.pop('bgcolor', 'black')).rgba
+
+        # Canvases that share a GL context also share compiled programs
+        context = kwargs.get('context', None)
+        shared = getattr(getattr(context, 'value', None), '_vispy_canvas',
+                         None)
+        self._program_cache = getattr(shared, '_program_cache', None)
+        if self._program_cache is None:
+            self._program_cache = ProgramCache()
+        self._program_cache.n_canvases += 1
         
         # A default widget that follows the shape of the canvas
         self._central_widget = None
@@ -135,7 +147,44 @@ class SceneCanvas(app.Canvas):
     def _scene_update(self, event):
         self.update()
 
+    @property
+    def profiler(self):
+        """ The FrameProfiler that collects per-frame statistics, or None
+        if profiling is disabled. See ``measure_frames()``.
+        """
+        return self._profiler
+
+    def measure_frames(self, n_frames=100):
+        """ Enable or disable collecting per-frame draw statistics.
+
+        When enabled, a report is stored for each drawn frame, containing
+        the number of calls per GL function, the number of bytes uploaded
+        to buffers and textures, the number of shader compilations and
+        program links, and the time spent drawing each visual. The
+        reports are available via ``canvas.profiler.frames``.
+
+        Parameters
+        ----------
+        n_frames : int
+            The number of most recent frames to keep. If 0, profiling
+            is disabled.
+        """
+        if n_frames:
+            self._profiler = FrameProfiler(n_frames)
+        else:
+            self._profiler = None
+
     def on_draw(self, event):
+        profiler = self._profiler
+        if profiler is not None:
+            profiler.begin_frame()
+        try:
+            self._draw_scene()
+        finally:
+            if profiler is not None:
+                profiler.end_frame(getattr(self, '_process_entity_count', 0))
+
+    def _draw_scene(self):
         gloo.clear(color=self._bgcolor, depth=True)
         if self._scene is None:
             return  # Can happen on initialization
@@ -166,6 +215,7 @@ class SceneCanvas(app.Canvas):
         scene_event = SceneDrawEvent(canvas=self, event=event, 
                                      transform_cache=tr_cache)
         scene_event.push_viewport((0, 0) + self.size)
+        prev_cache = use_program_cache(self._program_cache)
         try:
             # Force update of transforms on base entities
             # TODO: this should happen as a reaction to resize, push_viewport,
@@ -180,6 +230,7 @@ class SceneCanvas(app.Canvas):
             scene_event.push_entity(visual)
             visual.draw(scene_event)
         finally:
+            use_program_cache(prev_cache)
             scene_event.pop_viewport()
 
     def _process_mouse_event(self, event):
@@ -201,6 +252,15 @@ class SceneCanvas(app.Canvas):
         if self._central_widget is not None:
             self._central_widget.size = self.size
 
+    def on_close(self, event):
+        # Delete the cached programs while their GL context still exists,
+        # unless other canvases share the context
+        cache = self._program_cache
+        cache.n_canvases -= 1
+        if cache.n_canvases == 0 and self._backend is not None:
+            self._backend._vispy_set_current()
+            cache.clear()
+
     # -------------------------------------------------- transform handling ---
     def push_viewport(self, viewport):
         """ Push a viewport (x, y, w, h) on the stack. It is the
@@ -2,7 +2,8 @@
 # Copyright (c) 2014, Vispy Development Team.
 # Distributed under the (new) BSD License. See LICENSE.txt for more info.
 
-from .color import UniformColorComponent, VertexColorComponent  # noqa
+from .color import (UniformColorComponent, VertexColorComponent,  # noqa
+                    ColormapComponent)  # noqa
 from .component import VisualComponent  # noqa
 from .material import GridContourComponent, ShadingComponent  # noqa
 from .normal import VertexNormalComponent  # noqa
@@ -7,7 +7,8 @@ Color components are modular shader components used for retrieving or
 generating fragment colors.
 
 These components create a function in the fragment shader that accepts no
-arguments and returns a vec4 color.
+arguments and returns a vec4 color, except ColormapComponent, which maps the
+color returned by the previous component.
 """
 
 from __future__ import division
@@ -15,8 +16,10 @@ from __future__ import division
 import numpy as np
 
 from .component import VisualComponent
-from ..shaders import Varying
+from ..shaders import Function, Varying
 from ... import gloo
+from ...color import ColorArray, colormaps, get_colormap
+from ...ext.six import string_types
 
 
 class UniformColorComponent(VisualComponent):
@@ -91,3 +94,92 @@ class VertexColorComponent(VisualComponent):
     def activate(self, program, mode):
         vf = self._funcs['vert_post_hook']
         vf['input_color'] = self.vbo
+
+
+class ColormapComponent(VisualComponent):
+    """
+    Maps the red channel of the previous color component through a colormap.
+
+    This is used after a TextureComponent to draw single-channel (luminance)
+    textures. The red channel is scaled so that *clim* maps to 0..1. Changing
+    *clim* only updates a uniform, and changing a lookup table of the same
+    size only uploads the table.
+
+    Parameters
+    ----------
+    cmap : str | Function | array
+        The name of a colormap in ``vispy.color.colormaps``, a Function that
+        maps a float in 0..1 to a vec4 color, or an (N, 3) or (N, 4) array of
+        colors (or ColorArray) that is used as a lookup table.
+    clim : tuple
+        The values of the red channel that map to the ends of the colormap.
+    """
+
+    SHADERS = dict(
+        frag_color="""
+            vec4 colormap(vec4 color) {
+                float t = clamp((color.r - $clim_min) * $clim_scale, 0.0, 1.0);
+                return $cmap(t);
+            }
+        """)
+
+    LUT_SHADER = """
+        vec4 lut(float t) {
+            float x = t * $lut_scale + $lut_offset;
+            return texture2D($lut_texture, vec2(x, 0.5));
+        }
+    """
+
+    def __init__(self, cmap='grays', clim=(0., 1.)):
+        super(ColormapComponent, self).__init__()
+        self._lut_func = Function(self.LUT_SHADER)
+        self._lut = None
+        self.cmap = cmap
+        self.clim = clim
+
+    @property
+    def cmap(self):
+        return self._cmap
+
+    @cmap.setter
+    def cmap(self, cmap):
+        if isinstance(cmap, string_types):
+            if cmap not in colormaps:
+                raise ValueError('Unknown colormap %r, must be one of %s'
+                                 % (cmap, ', '.join(colormaps)))
+            self._cmap_func = Function(get_colormap(cmap))
+        elif isinstance(cmap, Function):
+            self._cmap_func = cmap
+        else:
+            rgba = ColorArray(cmap).rgba.astype(np.float32)
+            rgba = rgba.reshape(1, len(rgba), 4)
+            if self._lut is not None and self._lut.shape[:2] == rgba.shape[:2]:
+                self._lut.set_data(rgba)
+            else:
+                self._lut = gloo.Texture2D(rgba)
+                self._lut.interpolation = 'linear'
+            # sample between the centers of the first and last texel
+            n = rgba.shape[1]
+            self._lut_func['lut_texture'] = self._lut
+            self._lut_func['lut_scale'] = (n - 1.) / n
+            self._lut_func['lut_offset'] = 0.5 / n
+            self._cmap_func = self._lut_func
+        self._cmap = cmap
+        self.update()
+
+    @property
+    def clim(self):
+        return self._clim
+
+    @clim.setter
+    def clim(self, clim):
+        lo, hi = float(clim[0]), float(clim[1])
+        self._clim = (lo, hi)
+        self.update()
+
+    def activate(self, program, mode):
+        lo, hi = self._clim
+        ff = self._funcs['frag_color']
+        ff['cmap'] = self._cmap_func
+        ff['clim_min'] = lo
+        ff['clim_scale'] = 1. / (hi - lo) if hi != lo else 0.
@@ -19,6 +19,12 @@ from .component import VisualComponent
 from ... import gloo
 
 
+def _same_layout(a, b):
+    """Whether arrays a and b can be stored in the same vertex buffer"""
+    return (a is not None and a.dtype == b.dtype and
+            a.shape[1:] == b.shape[1:])
+
+
 class XYPosComponent(VisualComponent):
     """
     generate local coordinate from xy (vec2) attribute and z (float) uniform
@@ -49,14 +55,16 @@ class XYPosComponent(VisualComponent):
 
     def set_data(self, xy=None, z=None, index=None):
         if xy is not None:
+            if not _same_layout(self._xy, xy):
+                self._vbo = None
+            elif self._vbo is not None:
+                self._vbo.set_data(xy)  # re-upload into the same buffer
             self._xy = xy
         if z is not None:
             self._z = z
         if index is not None:
             self._index = index
-        # TODO: might be better to re-upload data rather than creating
-        # a new VB, if possible.
-        self._vbo = None
+            self._ibo = None
         self.update()
 
     @property
@@ -115,12 +123,14 @@ class XYZPosComponent(VisualComponent):
 
     def set_data(self, pos=None, index=None):
         if pos is not None:
+            if not _same_layout(self._pos, pos):
+                self._vbo = None
+            elif self._vbo is not None:
+                self._vbo.set_data(pos)  # re-upload into the same buffer
             self._pos = pos
         if index is not None:
             self._index = index
-        # TODO: might be better to re-upload data rather than creating
-        # a new VB, if possible.
-        self._vbo = None
+            self._ibo = None
         self.update()
 
     @property
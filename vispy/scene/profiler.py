@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Vispy Development Team.
+# Distributed under the (new) BSD License. See LICENSE.txt for more info.
+
+from __future__ import division
+
+from collections import deque
+
+from ..gloo import gl
+from ..util.ptime import time
+
+# GL functions that upload data, and functions that build programs
+_UPLOAD_FUNCS = ('glBufferData', 'glBufferSubData', 'glTexImage2D',
+                 'glTexSubImage2D', 'glCompressedTexImage2D',
+                 'glCompressedTexSubImage2D')
+_COMPILE_FUNCS = {'glCompileShader': 'n_compile', 'glLinkProgram': 'n_link'}
+
+
+class FrameProfiler(object):
+    """ Collects per-frame statistics for a SceneCanvas.
+
+    For each drawn frame a report (a dict) is stored with the following
+    keys:
+
+    * time - the wall time (in seconds) of the complete draw.
+    * n_entities - the number of entities visited by the drawing system.
+    * gl_calls - a dict mapping GL function names to the number of calls.
+    * n_gl_calls - the total number of GL calls.
+    * upload_bytes - the number of bytes passed to buffer and texture
+      upload functions (e.g. glBufferSubData and glTexSubImage2D).
+    * n_compile, n_link - the number of shader compilations and program
+      links.
+    * visuals - a list of (description, seconds) tuples, one for each
+      visual that was drawn, in drawing order. The time is inclusive,
+      i.e. for visuals that draw a subscene (e.g. a ViewBox) it includes
+      the time to draw that subscene.
+
+    Parameters
+    ----------
+    n_frames : int
+        The number of most recent frames to keep.
+
+    Notes
+    -----
+    During a frame, the functions in the ``gloo.gl`` namespace are
+    temporarily replaced with counting wrappers. This adds some overhead
+    to each GL call, so absolute timings are somewhat pessimistic.
+    """
+
+    def __init__(self, n_frames=100):
+        self.frames = deque(maxlen=int(n_frames))
+        self._current = None
+        self._t0 = 0.0
+        self._orig_funcs = {}
+
+    @property
+    def last_frame(self):
+        """ The report of the most recently completed frame, or None.
+        """
+        return self.frames[-1] if self.frames else None
+
+    def clear(self):
+        """ Remove all collected frame reports.
+        """
+        self.frames.clear()
+
+    def begin_frame(self):
+        """ Start collecting statistics for a new frame.
+        """
+        self._current = dict(time=0.0, n_entities=0, gl_calls={},
+                             n_gl_calls=0, upload_bytes=0, n_compile=0,
+                             n_link=0, visuals=[])
+        self._install()
+        self._t0 = time()
+
+    def end_frame(self, n_entities=0):
+        """ Finish the current frame and store its report.
+        """
+        if self._current is None:
+            return
+        report = self._current
+        report['time'] = time() - self._t0
+        self._uninstall()
+        report['n_entities'] = n_entities
+        report['n_gl_calls'] = sum(report['gl_calls'].values())
+        self._current = None
+        self.frames.append(report)
+
+    def add_visual(self, visual, seconds):
+        """ Register the time it took to draw a visual.
+        """
+        if self._current is None:
+            return
+        if visual.name:
+            desc = '%s %r' % (visual.__class__.__name__, visual.name)
+        else:
+            desc = '%s at 0x%x' % (visual.__class__.__name__, id(visual))
+        self._current['visuals'].append((desc, seconds))
+
+    def _install(self):
+        """ Replace the functions in the gl namespace with counting wrappers.
+        """
+        if self._orig_funcs:
+            return
+        self._orig_funcs = dict((name, getattr(gl, name)) for name in dir(gl)
+                                if name.startswith('gl') and
+                                callable(getattr(gl, name)))
+        for name, func in self._orig_funcs.items():
+            setattr(gl, name, self._wrap(name, func))
+
+    def _uninstall(self):
+        """ Restore the original functions in the gl namespace.
+        """
+        for name, func in self._orig_funcs.items():
+            setattr(gl, name, func)
+        self._orig_funcs = {}
+
+    def _wrap(self, name, func):
+        report = self._current
+        calls = report['gl_calls']
+        if name in _UPLOAD_FUNCS:
+            def wrapper(*args):
+                calls[name] = calls.get(name, 0) + 1
+                report['upload_bytes'] += sum(getattr(a, 'nbytes', 0)
+                                              for a in args)
+                return func(*args)
+        elif name in _COMPILE_FUNCS:
+            key = _COMPILE_FUNCS[name]
+
+            def wrapper(*args):
+                calls[name] = calls.get(name, 0) + 1
+                report[key] += 1
+                return func(*args)
+        else:
+            def wrapper(*args):
+                calls[name] = calls.get(name, 0) + 1
+                return func(*args)
+        wrapper.__name__ = name
+        return wrapper
@@ -7,6 +7,20 @@ from __future__ import division
 import re
 
 from ... import gloo
+from ...ext.ordereddict import OrderedDict
+
+
+# Process-wide cache of compilation results {signature: (code, names)}. Only
+# results of pretty compilations are cached, since the names generated by 
+# _rename_objects_fast() depend on the identity of the objects.
+_compile_cache = OrderedDict()
+_COMPILE_CACHE_SIZE = 256
+
+
+def clear_compile_cache():
+    """ Remove all cached compilation results.
+    """
+    _compile_cache.clear()
 
 
 class Compiler(object):
@@ -63,21 +77,19 @@ class Compiler(object):
         #
         # 1. collect list of dependencies for each shader
         #
+        self._collect_dependencies()
         
-        # maps {shader_name: [deps]}
-        self._shader_deps = {}
-        
-        for shader_name, shader in self.shaders.items():
-            this_shader_deps = []
-            self._shader_deps[shader_name] = this_shader_deps
-            dep_set = set()
-            
-            for dep in shader.dependencies(sort=True):
-                # visit each object no more than once per shader
-                if dep.name is None or dep in dep_set:
-                    continue
-                this_shader_deps.append(dep)
-                dep_set.add(dep)
+        # Structurally identical dependency graphs generate identical code;
+        # look up the result of an earlier compilation.
+        if pretty:
+            deps, signature = self._signature()
+            cached = _compile_cache.pop(signature, None)
+            if cached is not None:
+                _compile_cache[signature] = cached  # mark as recently used
+                code, names = cached
+                self._object_names = dict(zip(deps, names))
+                self.code = dict(code)
+                return dict(code)
 
         #
         # 2. Assign names to all objects.
@@ -114,8 +126,54 @@ class Compiler(object):
             compiled[shader_name] = '\n'.join(code)
             
         self.code = compiled
+        
+        if pretty:
+            _compile_cache[signature] = (dict(compiled),
+                                         [obj_names[dep] for dep in deps])
+            while len(_compile_cache) > _COMPILE_CACHE_SIZE:
+                _compile_cache.popitem(last=False)
+        
         return compiled
 
+    def _collect_dependencies(self):
+        """ Collect the list of dependencies for each shader, in the order 
+        that their definitions must appear in the code.
+        """
+        # maps {shader_name: [deps]}
+        self._shader_deps = {}
+        
+        for shader_name, shader in self.shaders.items():
+            this_shader_deps = []
+            self._shader_deps[shader_name] = this_shader_deps
+            dep_set = set()
+            
+            for dep in shader.dependencies(sort=True):
+                # visit each object no more than once per shader
+                if dep.name is None or dep in dep_set:
+                    continue
+                this_shader_deps.append(dep)
+                dep_set.add(dep)
+
+    def _signature(self):
+        """ Return the list of all unique dependencies, and a hashable 
+        signature of the structure of the dependency graph. Objects are 
+        referred to by their position in the list of dependencies, so that
+        distinct but identically composed graphs have equal signatures.
+        """
+        index = {}
+        deps = []
+        shader_keys = []
+        for shader_name in sorted(self._shader_deps):
+            shader_deps = self._shader_deps[shader_name]
+            for dep in shader_deps:
+                if dep not in index:
+                    index[dep] = len(deps)
+                    deps.append(dep)
+            shader_keys.append((shader_name, 
+                                tuple(index[dep] for dep in shader_deps)))
+        obj_keys = tuple(dep.signature_key(index) for dep in deps)
+        return deps, (tuple(shader_keys), obj_keys)
+
     def _rename_objects_fast(self):
         """ Rename all objects quickly to guaranteed-unique names using the 
         id() of each object.
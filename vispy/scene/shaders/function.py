@@ -18,6 +18,8 @@ trigger a recompile.
 """
 
 import re
+from itertools import count
+
 import numpy as np
 
 from ...util.event import EventEmitter, Event
@@ -30,6 +32,22 @@ from .compiler import Compiler
 
 VARIABLE_TYPES = ('const', 'uniform', 'attribute', 'varying', 'inout')
 
+# Source of Variable.state_id values
+_state_ids = count(1)
+
+
+def _ref_key(obj, index):
+    """ Return the key used to refer to *obj* in a signature key: its 
+    position in *index* if present, its own signature key for other shader
+    objects (inline expressions), or *obj* itself (e.g. a string).
+    """
+    if isinstance(obj, ShaderObject):
+        i = index.get(obj, None)
+        if i is not None:
+            return i
+        return obj.signature_key(index)
+    return obj
+
 
 class ShaderChangeEvent(Event):
     def __init__(self, code_changed=False, value_changed=False, **kwds):
@@ -131,6 +149,18 @@ class ShaderObject(object):
         """
         return []
     
+    def signature_key(self, index):
+        """ Return a hashable description of the code generated for this 
+        object. 
+        
+        References to other objects are described by their position in 
+        *index* (a dict {obj: int}). Two objects with equal keys generate 
+        identical code, provided that the referenced objects are given the
+        same names. This is used by the Compiler to cache compilation 
+        results.
+        """
+        return (self.__class__.__name__, self.name)
+    
     def _add_dep(self, dep):
         """ Increment the reference count for *dep*. If this is a new 
         dependency, then connect to its *changed* event.
@@ -338,6 +368,9 @@ class Function(ShaderObject):
         # Create static Variable instances for any global variables declared
         # in the code
         self._static_vars = None
+        
+        # The last generated definition: (key, code)
+        self._definition_cache = (None, None)
     
     def __setitem__(self, key, val):
         """ Setting of replacements through a dict-like syntax.
@@ -523,6 +556,7 @@ class Function(ShaderObject):
         """
         if str2 != self._replacements.get(str1, None):
             self._replacements[str1] = str2
+            self._definition_cache = (None, None)
             self.changed(code_changed=True)
             #self._last_changed = time.time()
     
@@ -587,11 +621,30 @@ class Function(ShaderObject):
         return code + '\n'
     
     def definition(self, names):
-        return self._get_replaced_code(names)
+        # The definition only depends on our own name and on the expressions
+        # that are substituted; reuse the last result if these are unchanged.
+        exprs = tuple((key, val.expression(names)) 
+                      for key, val in self._expressions.items())
+        hooks = tuple((names[key] if isinstance(key, Variable) else key,
+                       val.expression(names) 
+                       if isinstance(val, ShaderObject) else val)
+                      for key, val in self._post_hooks.items())
+        key = names[self], exprs, hooks
+        if self._definition_cache[0] != key:
+            self._definition_cache = key, self._get_replaced_code(names)
+        return self._definition_cache[1]
 
     def expression(self, names):
         return names[self]
     
+    def signature_key(self, index):
+        exprs = tuple((key, _ref_key(val, index)) 
+                      for key, val in self._expressions.items())
+        hooks = tuple((_ref_key(key, index), _ref_key(val, index))
+                      for key, val in self._post_hooks.items())
+        return (self.__class__.__name__, self._code, 
+                tuple(self._replacements.items()), exprs, hooks)
+    
     def _clean_code(self, code):
         """ Return *code* with indentation and leading/trailing blank lines
         removed. 
@@ -696,7 +749,7 @@ class Variable(ShaderObject):
         if not (isinstance(name, string_types) or name is None):
             raise TypeError("Variable name must be string or None.")
         
-        self._state_counter = 0
+        self._state_id = next(_state_ids)
         self._name = name
         self._vtype = vtype
         self._dtype = dtype
@@ -776,7 +829,7 @@ class Variable(ShaderObject):
                             (type(value), self))
 
         self._value = value
-        self._state_counter += 1
+        self._state_id = next(_state_ids)
         
         if self._type_locked:
             if dtype != self._dtype or vtype != self._vtype:
@@ -799,8 +852,9 @@ class Variable(ShaderObject):
     def state_id(self):
         """Return a unique ID that changes whenever the state of the Variable
         has changed. This allows ModularProgram to quickly determine whether
-        the value has changed since it was last used."""
-        return id(self), self._state_counter
+        the value has changed since it was last used. IDs are never reused,
+        not even by other Variables."""
+        return self._state_id
 
     def __repr__(self):
         return ("<%s \"%s %s %s\" at 0x%x>" % (self.__class__.__name__,
@@ -810,6 +864,11 @@ class Variable(ShaderObject):
     def expression(self, names):
         return names[self]
     
+    def signature_key(self, index):
+        value = '%s' % (self.value,) if self.vtype == 'const' else None
+        return (self.__class__.__name__, self.name, self.vtype, self.dtype,
+                value)
+    
     def definition(self, names):
         if self.vtype is None:
             raise RuntimeError("Variable has no vtype: %r" % self)
@@ -891,6 +950,9 @@ class TextExpression(Expression):
     def expression(self, names=None):
         return self._text
     
+    def signature_key(self, index):
+        return (self.__class__.__name__, self._text)
+    
     @property
     def text(self):
         return self._text
@@ -952,6 +1014,10 @@ class FunctionCall(Expression):
     def dtype(self):
         return self._function.rtype
     
+    def signature_key(self, index):
+        return (self.__class__.__name__, _ref_key(self._function, index),
+                tuple(_ref_key(arg, index) for arg in self._args))
+    
     def expression(self, names):
         str_args = [arg.expression(names) for arg in self._args]
         args = ', '.join(str_args)
@@ -1129,6 +1195,11 @@ class FunctionChain(Function):
     def static_names(self):
         return []
 
+    def signature_key(self, index):
+        return (self.__class__.__name__, self._name, 
+                tuple(_ref_key(fn, index) for fn in self._funcs),
+                tuple(tuple(arg) for arg in self.args), self.rtype)
+
     def __repr__(self):
         fn = ",\n                ".join(map(repr, self.functions))
         return "<FunctionChain [%s] at 0x%x>" % (fn, id(self))
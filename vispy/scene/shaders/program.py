@@ -4,20 +4,141 @@
 
 from __future__ import division, print_function
 
-from ...gloo import Program
+import weakref
+
+from ...gloo import Program, VertexShader, FragmentShader, gl
 from ...util import logger
 from ...util.event import EventEmitter
+from ...ext.ordereddict import OrderedDict
 from ...ext.six import string_types  # noqa
 from .function import MainFunction, Variable
 from .compiler import Compiler
 
 
+class _LinkedProgram(object):
+    """ A linked GL program that is shared by all ModularPrograms that
+    generate the same code.
+    """
+    def __init__(self, handle, vert, frag, cache):
+        self.handle = handle
+        self.vert = vert
+        self.frag = frag
+        self.cache = cache
+        # The ModularPrograms that currently use this program
+        self.users = weakref.WeakKeyDictionary()
+        # The ModularProgram whose uniform values are currently stored in
+        # the GL program
+        self.owner = lambda: None
+
+
+class ProgramCache(object):
+    """ Compiled shaders and linked programs of one GL context (or of a
+    group of contexts that share their objects), keyed by the generated
+    GLSL code.
+
+    A SceneCanvas makes its cache current while it draws, so that the
+    ModularPrograms that are built at that time can share GL programs.
+    Programs that are built while no cache is current are not shared.
+
+    Parameters
+    ----------
+    size : int
+        The number of linked programs to keep. When more are added, the
+        least recently used programs that are not used by any
+        ModularProgram are deleted from the GPU.
+    """
+    def __init__(self, size=64):
+        self.size = size
+        self._shaders = {}  # {(shader_class, code): Shader}
+        self._programs = OrderedDict()  # {(vert_code, frag_code): linked}
+        # The number of canvases that use this cache
+        self.n_canvases = 0
+
+    def __len__(self):
+        return len(self._programs)
+
+    def get_shader(self, cls, code):
+        """ Get a (possibly already compiled) shader of class *cls* for
+        *code*.
+        """
+        key = cls, code
+        shader = self._shaders.get(key, None)
+        if shader is None:
+            shader = self._shaders[key] = cls(code)
+        return shader
+
+    def get_program(self, key):
+        """ Get the linked program for *key*, or None.
+        """
+        linked = self._programs.pop(key, None)
+        if linked is not None:
+            self._programs[key] = linked  # mark as recently used
+        return linked
+
+    def add_program(self, key, linked):
+        """ Add a linked program, and delete unused programs if the cache
+        is full. The program that is added is never deleted, so the cache
+        may hold more programs than its size while they are all in use.
+        """
+        self._programs[key] = linked
+        unused = [k for k, p in self._programs.items()
+                  if not p.users and k != key]
+        for k in unused[:max(0, len(self._programs) - self.size)]:
+            self._delete_program(k)
+
+    def clear(self):
+        """ Delete all shaders and programs from the GPU. This requires
+        the GL context of the cache to be current. ModularPrograms that
+        used them are rebuilt when they are drawn again.
+        """
+        for key in list(self._programs):
+            self._delete_program(key)
+        for shader in self._shaders.values():
+            if shader.handle > 0:
+                gl.glDeleteShader(shader.handle)
+        self._shaders.clear()
+
+    def _delete_program(self, key):
+        linked = self._programs.pop(key)
+        for user in list(linked.users.keys()):
+            user._linked = None
+            user._need_build = True
+        gl.glDeleteProgram(linked.handle)
+        # Delete the shaders that no other program uses
+        used = set()
+        for other in self._programs.values():
+            used.update((other.vert, other.frag))
+        for shader in (linked.vert, linked.frag):
+            if shader in used:
+                continue
+            if shader.handle > 0:
+                gl.glDeleteShader(shader.handle)
+            for k, v in list(self._shaders.items()):
+                if v is shader:
+                    del self._shaders[k]
+
+
+# The cache of the canvas that is drawing
+_current_cache = [None]
+
+
+def use_program_cache(cache):
+    """ Make *cache* (a ProgramCache or None) the cache that is used to
+    build ModularPrograms, and return the cache that was current.
+    """
+    previous = _current_cache[0]
+    _current_cache[0] = cache
+    return previous
+
+
 class ModularProgram(Program):
     """
     Shader program using Function instances as basis for its shaders.
     
     Automatically rebuilds program when functions have changed and uploads 
-    program variables.
+    program variables. Changes that do not affect the generated code (for
+    example, assigning a new transform of the same type) only cause the
+    new variable values to be uploaded.
     """
     def __init__(self, vcode, fcode):
         Program.__init__(self, '', '')
@@ -32,13 +153,19 @@ class ModularProgram(Program):
         # Cache state of Variables so we know which ones require update
         self._variable_state = {}
         
+        # The generated code and the (shared) linked program that is 
+        # currently in use
+        self._code = None
+        self._linked = None
+        
+        self._code_changed = True
         self._need_build = True
 
     def prepare(self):
         """ Prepare the Program so we can set attributes and uniforms.
         """
         # TEMP function to fix sync issues for now
-        self._create()
+        self._update_code()
         if self._need_build:
             self._build()
             self._need_build = False
@@ -46,26 +173,92 @@ class ModularProgram(Program):
     def _source_changed(self, ev):
         logger.debug("ModularProgram source changed: %s" % self)
         if ev.code_changed:
-            self._need_build = True
+            self._code_changed = True
         self.changed()
+    
+    def _update_code(self):
+        """ Regenerate the code if the shader functions have changed. The
+        program is only rebuilt if the code is actually different.
+        """
+        if not self._code_changed:
+            return
+        self._code_changed = False
+        # The variables (and their names) may have changed even if the
+        # code did not, so upload all values again
+        self._variable_state = {}
+        self.compiler = Compiler(vert=self.vert, frag=self.frag)
+        code = self.compiler.compile()
+        code = code['vert'], code['frag']
+        if code != self._code:
+            self._code = code
+            self._need_build = True
+    
+    def _activate(self):
+        self._update_code()
+        # A program that was linked for another canvas' context is rebuilt
+        cache = _current_cache[0]
+        if (cache is not None and self._linked is not None and
+                self._linked.cache is not cache):
+            self._need_build = True
+        super(ModularProgram, self)._activate()
         
+    def _create(self):
+        # The GL program is obtained in _build(), since it may be shared 
+        # with other ModularPrograms that generate the same code.
+        pass
+    
     def _build(self):
         logger.debug("Rebuild ModularProgram: %s" % self)
-        self.compiler = Compiler(vert=self.vert, frag=self.frag)
-        code = self.compiler.compile()
-        self.shaders[0].code = code['vert']
-        self.shaders[1].code = code['frag']
+        vcode, fcode = key = self._code
         
-        logger.debug('==== Vertex Shader ====\n\n' + code['vert'] + "\n")
-        logger.debug('==== Fragment shader ====\n\n' + code['frag'] + "\n")
+        logger.debug('==== Vertex Shader ====\n\n' + vcode + "\n")
+        logger.debug('==== Fragment shader ====\n\n' + fcode + "\n")
         
-        self._create_variables()  # force update
+        cache = _current_cache[0]
+        linked = cache.get_program(key) if cache is not None else None
+        if linked is None:
+            # Compile (if not cached) and link new program
+            if cache is not None:
+                self._verts = [cache.get_shader(VertexShader, vcode)]
+                self._frags = [cache.get_shader(FragmentShader, fcode)]
+            else:
+                self._verts = [VertexShader(vcode)]
+                self._frags = [FragmentShader(fcode)]
+            if (cache is not None or self._linked is None or
+                    self._linked.cache is not None):
+                self._handle = -1  # the old program may be shared
+            Program._create(self)
+            self._create_variables()
+            super(ModularProgram, self)._build()
+            linked = _LinkedProgram(self._handle, self._verts[0],
+                                    self._frags[0], cache)
+            linked.users[self] = True
+            if cache is not None:
+                cache.add_program(key, linked)
+        else:
+            # Use the program that was linked for the same code
+            logger.debug("Using cached program for %s" % self)
+            self._verts = [linked.vert]
+            self._frags = [linked.frag]
+            self._handle = linked.handle
+            self._create_variables()
+            self._enable_variables()
+        if self._linked is not None and self._linked is not linked:
+            self._linked.users.pop(self, None)
+        linked.users[self] = True
+        self._linked = linked
         self._variable_state = {}
-        
-        # and continue.
-        super(ModularProgram, self)._build()
 
     def _activate_variables(self):
+        # Uniform values are stored in the GL program, which may be shared
+        # with other ModularPrograms; upload all of ours if another program
+        # used it last.
+        linked = self._linked
+        if linked is not None and linked.owner() is not self:
+            for uniform in self._uniforms.values():
+                uniform._need_update = True
+            linked.owner = weakref.ref(self)
+        
         # set all variables
         settable_vars = 'attribute', 'uniform'
         logger.debug("Apply variables:")
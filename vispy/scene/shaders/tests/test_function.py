@@ -438,6 +438,66 @@ def test_MainFunction():
     assert sn == set(['pi', 'rotate', 'pos', 'm_transform', 'a_pos'])
     
 
+def test_compile_cache():
+    """ Structurally identical graphs share compilation results.
+    """
+    from vispy.scene.shaders.compiler import Compiler, _compile_cache
+    
+    def make(scale):
+        main = MainFunction('void main() { gl_Position = $pos; }')
+        t1 = Function(transformScale)
+        t2 = Function(transformScale)
+        pos = Variable('attribute vec4 a_position')
+        main['pos'] = t1(t2(pos))
+        t1['scale'] = scale
+        t2['scale'] = scale
+        return main, t1, t2, pos
+    
+    main1, t11, t21, pos1 = make(2.0)
+    main2, t12, t22, pos2 = make(3.0)
+    comp1 = Compiler(vert=main1)
+    code1 = comp1.compile()
+    n = len(_compile_cache)
+    comp2 = Compiler(vert=main2)
+    code2 = comp2.compile()
+    assert_equal(len(_compile_cache), n)
+    assert_equal(code1, code2)
+    for obj1, obj2 in [(t11, t12), (t21, t22), (pos1, pos2),
+                       (t11['scale'], t12['scale'])]:
+        assert_is(type(comp2[obj2]), str)
+        assert_equal(comp1[obj1], comp2[obj2])
+    assert_not_in(t11, comp2._object_names)
+    
+    # Different structure gives different code
+    t12['scale'] = 'u_custom'
+    code3 = Compiler(vert=main2).compile()
+    assert_in('u_custom', code3['vert'])
+    assert_not_equal(code3, code1)
+    
+    # Sharing an object is not the same as using two equal objects
+    main3, t13, t23, pos3 = make(2.0)
+    main3['pos'] = t13(t13(pos3))
+    code4 = Compiler(vert=main3).compile()
+    assert_not_equal(code4, code1)
+    
+
+def test_definition_cache():
+    """ Function definitions are reused while names and expressions are
+    unchanged.
+    """
+    fun = Function(transformScale)
+    fun['scale'] = 'x'
+    names = {fun: 'scale_1'}
+    code1 = fun.definition(names)
+    assert_is(fun.definition(names), code1)
+    assert_in('scale_1(', fun.definition({fun: 'scale_1'}))
+    assert_in('scale_2(', fun.definition({fun: 'scale_2'}))
+    fun['scale'] = 'y'
+    assert_in('*= y', fun.definition(names))
+    fun.replace('pos.xyz', 'pos.xy')
+    assert_in('pos.xy *= y', fun.definition(names))
+
+
 if __name__ == '__main__':
     for key in [key for key in globals()]:
         if key.startswith('test_'):
@@ -0,0 +1,128 @@
+from nose.tools import assert_true, assert_false, assert_equal
+
+from vispy.gloo import VertexShader
+from vispy.scene.shaders import ModularProgram
+from vispy.scene.shaders.program import ProgramCache, _LinkedProgram
+from vispy.scene.transforms import STTransform, AffineTransform
+
+
+def test_modular_program_update():
+    """ Only changes in the generated code require a rebuild.
+    """
+    prog = ModularProgram("void main() { gl_Position = $transform($pos); }",
+                          "void main() { gl_FragColor = $color; }")
+    prog.vert['pos'] = 'vec4(0, 0, 0, 1)'
+    prog.frag['color'] = (1., 0., 0., 1.)
+    prog.vert['transform'] = STTransform(scale=(2, 2)).shader_map()
+    prog._update_code()
+    assert_true(prog._need_build)
+    code = prog._code
+    prog._need_build = False  # pretend that we built the program
+    
+    # A new transform of the same type only changes variable values
+    tr = STTransform(scale=(3, 3), translate=(1, 2))
+    prog.vert['transform'] = tr.shader_map()
+    assert_true(prog._code_changed)
+    prog._update_code()
+    assert_false(prog._need_build)
+    assert_equal(prog._code, code)
+    scale = tr.shader_map()['scale']
+    assert_equal(prog.compiler[scale], 'u_scale')
+    
+    # Changing a value does not even require new code
+    tr.scale = (4, 4)
+    assert_false(prog._code_changed)
+    
+    # A different type of transform requires a rebuild
+    prog.vert['transform'] = AffineTransform().shader_map()
+    prog._update_code()
+    assert_true(prog._need_build)
+    assert_true(prog._code != code)
+
+
+def test_modular_program_variable_state():
+    """ New variables are always uploaded, even if the code is the same.
+    """
+    prog = ModularProgram("void main() { gl_Position = $transform($pos); }",
+                          "void main() { gl_FragColor = vec4(1.0); }")
+    prog.vert['pos'] = 'vec4(0, 0, 0, 1)'
+    prog.vert['transform'] = STTransform(scale=(2, 2)).shader_map()
+    prog._update_code()
+    prog._variable_state = {'u_scale': 'uploaded'}
+    prog.vert['transform'] = STTransform(scale=(3, 3)).shader_map()
+    prog._update_code()
+    assert_equal(prog._variable_state, {})
+    
+    # State IDs are not reused by new variables
+    ids = set()
+    for i in range(50):
+        ids.add(STTransform(scale=(i, i)).shader_map()['scale'].state_id)
+    assert_equal(len(ids), 50)
+
+
+class _Shader(object):
+    def __init__(self, handle):
+        self.handle = handle
+
+
+class _RecordingGL(object):
+    def __init__(self):
+        self.deleted = []
+
+    def __getattr__(self, name):
+        return lambda handle: self.deleted.append((name, handle))
+
+
+def test_program_cache():
+    """ Unused programs are deleted when the cache is full or cleared.
+    """
+    from vispy.scene.shaders import program as program_module
+    orig_gl = program_module.gl
+    program_module.gl = gl = _RecordingGL()
+    try:
+        cache = ProgramCache(size=2)
+        vert = cache.get_shader(VertexShader, 'void main() {}')
+        assert_true(cache.get_shader(VertexShader, 'void main() {}') is vert)
+        
+        shared = _Shader(10)
+        user = ModularProgram("void main() {}", "void main() {}")
+        for i in range(3):
+            linked = _LinkedProgram(i + 1, shared, _Shader(i + 11), cache)
+            if i == 0:
+                linked.users[user] = True
+                user._linked = linked
+            cache.add_program(('v', str(i)), linked)
+        # The oldest unused program is deleted with its own shader
+        assert_equal(len(cache), 2)
+        assert_true(cache.get_program(('v', '1')) is None)
+        assert_equal(gl.deleted, [('glDeleteProgram', 2),
+                                  ('glDeleteShader', 12)])
+        
+        user._need_build = False
+        cache.clear()
+        assert_equal(len(cache), 0)
+        assert_equal(sorted(h for f, h in gl.deleted[2:]), [1, 3, 10, 11, 13])
+        assert_true(user._linked is None)
+        assert_true(user._need_build)
+        
+        # A program that was just added is kept even if all others are used
+        cache = ProgramCache(size=1)
+        gl.deleted = []
+        users = [ModularProgram("void main() {}", "void main() {}")
+                 for i in range(2)]
+        for i, user in enumerate(users):
+            linked = _LinkedProgram(i + 1, _Shader(i + 20), _Shader(i + 30),
+                                    cache)
+            linked.users[user] = True
+            cache.add_program(('v', str(i)), linked)
+        assert_equal(len(cache), 2)
+        assert_equal(gl.deleted, [])
+        # It is deleted once it is unused and the cache is full
+        del cache.get_program(('v', '1')).users[users[1]]
+        cache.add_program(('v', '2'), _LinkedProgram(3, _Shader(22),
+                                                     _Shader(32), cache))
+        assert_equal(len(cache), 2)
+        assert_true(cache.get_program(('v', '1')) is None)
+        assert_equal(gl.deleted[0], ('glDeleteProgram', 2))
+    finally:
+        program_module.gl = orig_gl
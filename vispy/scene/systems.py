@@ -6,31 +6,51 @@ from __future__ import division
 
 import sys
 
+from .batch import VisualBatch
 from .visuals.visual import Visual
 from ..util.logs import logger, _handle_exception
+from ..util.ptime import time
 
 
 class DrawingSystem(object):
     """ Simple implementation of a drawing engine. There is one system
     per viewbox.
 
+    Sibling visuals that have the same ``batch_key()`` (and no children)
+    are drawn together with a single draw call, see VisualBatch. Set the
+    ``batching`` attribute to False to draw each visual separately.
     """
+    def __init__(self):
+        self.batching = True
+        self._batches = {}
+        self._used_batches = {}
+
     def process(self, event, subscene):
         # Iterate over entities
         #assert isinstance(subscene, SubScene)  # LC: allow any part of the
                                                 #     scene to be drawn
-        self._process_entity(event, subscene, force_recurse=True)
+        self._used_batches = {}
+        try:
+            self._process_entity(event, subscene, force_recurse=True)
+        finally:
+            # Drop the batches that were not drawn
+            self._batches = self._used_batches
 
     def _process_entity(self, event, entity, force_recurse=False):
         event.canvas._process_entity_count += 1
 
         if isinstance(entity, Visual):
+            profiler = getattr(event.canvas, '_profiler', None)
+            if profiler is not None:
+                t0 = time()
             try:
                 entity.draw(event)
             except Exception:
                 # get traceback and store (so we can do postmortem
                 # debugging)
                 _handle_exception(False, 'reminders', self, entity=entity)
+            if profiler is not None:
+                profiler.add_visual(entity, time() - t0)
 
         # Processs children; recurse.
         # Do not go into subscenes (SubScene.draw processes the subscene)
@@ -41,12 +61,61 @@ class DrawingSystem(object):
         from .subscene import SubScene
         
         if force_recurse or not isinstance(entity, SubScene):
-            for sub_entity in entity.children:
-                event.push_entity(sub_entity)
-                try:
-                    self._process_entity(event, sub_entity)
-                finally:
-                    event.pop_entity()
+            # Children are unordered, so visuals that can be batched are
+            # grouped and drawn at the position of the first in the group
+            children = [(self._batch_key(e), e) for e in entity.children]
+            groups = {}
+            for key, sub_entity in children:
+                if key is not None:
+                    groups.setdefault(key, []).append(sub_entity)
+            for key, sub_entity in children:
+                if key is None:
+                    self._process_child(event, sub_entity)
+                elif groups[key][0] is sub_entity:
+                    self._process_group(event, entity, key, groups[key])
+
+    def _process_child(self, event, entity):
+        event.push_entity(entity)
+        try:
+            self._process_entity(event, entity)
+        finally:
+            event.pop_entity()
+
+    def _batch_key(self, entity):
+        """ Get the batch key of an entity, or None if it must be drawn
+        separately.
+        """
+        if (not self.batching or not isinstance(entity, Visual) or
+                entity.children or entity.document is not None):
+            return None
+        return entity.batch_key()
+
+    def _process_group(self, event, parent, key, group):
+        """ Draw a group of sibling visuals that have the same batch key.
+        """
+        if len(group) == 1:
+            self._process_child(event, group[0])
+            return
+        event.canvas._process_entity_count += len(group)
+        key = (id(parent), key)
+        batch = self._batches.get(key, None)
+        if batch is None:
+            batch = VisualBatch()
+        self._used_batches[key] = batch
+
+        profiler = getattr(event.canvas, '_profiler', None)
+        if profiler is not None:
+            t0 = time()
+        try:
+            # The visuals are drawn with the transform of their parent
+            batch.set_visuals(group)
+            group[0].draw_batch(event, batch)
+        except Exception:
+            _handle_exception(False, 'reminders', self, entity=group[0])
+        if profiler is not None:
+            dt = (time() - t0) / len(group)
+            for visual in group:
+                profiler.add_visual(visual, dt)
 
 
 class MouseInputSystem(object):
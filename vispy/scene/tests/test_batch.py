@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests for batched drawing of visuals
+"""
+
+import numpy as np
+from nose.tools import assert_equal, assert_true
+
+from vispy.scene import visuals, transforms
+from vispy.scene.batch import VisualBatch
+
+
+def test_visual_batch():
+    """Test concatenating the data of Line visuals into a VisualBatch"""
+    pos = np.array([[0, 0], [1, 0], [1, 1]], np.float32)
+    line1 = visuals.Line(pos=pos, color=(1, 0, 0, 1))
+    line2 = visuals.Line(pos=pos, color=(0, 1, 0, 1), connect='segments')
+    line2.transform = transforms.STTransform(translate=(10, 0))
+    assert_equal(line1.batch_key(), line2.batch_key())
+    assert_true(visuals.Line(pos=pos, width=3).batch_key() !=
+                line1.batch_key())
+    assert_true(visuals.Line(pos=pos, mode='agg').batch_key() is None)
+
+    # Per-visual transforms are applied to the batch data
+    data = line2.batch_data()
+    assert_equal(data['pos'].shape, (3, 4))
+    assert_equal(data['pos'][:, 0].tolist(), [10, 11, 11])
+    assert_equal(data['index'].tolist(), [0, 1])
+    assert_true(line2.batch_data() is data)
+    line2.transform.translate = (20, 0)
+    assert_true(line2.batch_data() is not data)
+
+    batch = VisualBatch()
+    assert_true(batch.set_visuals([line1, line2]))
+    assert_true(not batch.set_visuals([line1, line2]))
+    assert_equal(batch.buffers['pos'].size, 6)
+    assert_equal(batch.buffers['color'].size, 6)
+    assert_equal(batch.index.data.tolist(), [0, 1, 1, 2, 3, 4])
+
+    # Changing the data of a visual rebuilds the batch
+    line1.set_data(pos=pos[:2])
+    assert_true(batch.set_visuals([line1, line2]))
+    assert_equal(batch.index.data.tolist(), [0, 1, 2, 3])
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the per-frame profiler of SceneCanvas
+"""
+
+import numpy as np
+from nose.tools import assert_equal, assert_true
+
+from vispy.gloo import gl
+from vispy.scene import Entity
+from vispy.scene.profiler import FrameProfiler
+
+
+def test_frame_profiler():
+    """Test collecting frame reports with FrameProfiler"""
+    names = ('glBufferSubData', 'glUseProgram', 'glLinkProgram')
+    orig = dict((name, getattr(gl, name)) for name in names)
+    dummy = lambda *args: None  # noqa
+    for name in names:
+        setattr(gl, name, dummy)
+    try:
+        profiler = FrameProfiler(n_frames=2)
+        assert_true(profiler.last_frame is None)
+        for i in range(3):
+            profiler.begin_frame()
+            gl.glUseProgram(1)
+            gl.glUseProgram(1)
+            gl.glLinkProgram(1)
+            gl.glBufferSubData(gl.GL_ARRAY_BUFFER, 0, np.zeros(10, 'f4'))
+            profiler.add_visual(Entity(name='foo'), 0.5)
+            profiler.end_frame(n_entities=4)
+            # gl functions are restored after each frame
+            assert_true(gl.glUseProgram is dummy)
+        assert_equal(len(profiler.frames), 2)
+        report = profiler.last_frame
+        assert_equal(report['gl_calls'], {'glUseProgram': 2,
+                                          'glLinkProgram': 1,
+                                          'glBufferSubData': 1})
+        assert_equal(report['n_gl_calls'], 4)
+        assert_equal(report['upload_bytes'], 40)
+        assert_equal(report['n_link'], 1)
+        assert_equal(report['n_compile'], 0)
+        assert_equal(report['n_entities'], 4)
+        assert_equal(report['visuals'], [("Entity 'foo'", 0.5)])
+        assert_true(report['time'] >= 0)
+    finally:
+        for name in names:
+            setattr(gl, name, orig[name])
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests for ViewBox
+"""
+
+from nose.tools import assert_true
+from numpy.testing import assert_array_equal
+
+from vispy.gloo.util import _screenshot
+from vispy.scene import visuals, transforms
+from vispy.scene.widgets import ViewBox
+from vispy.testing import requires_application, TestingCanvas
+
+
+def test_viewbox_scene_changed():
+    """Test that ViewBox tracks changes to its subscene"""
+    vb = ViewBox()
+    assert_true(vb._scene_changed)
+
+    # Adding a visual, changing a transform or moving the camera marks
+    # the subscene as changed
+    vb._scene_changed = False
+    ellipse = visuals.Ellipse(pos=(0, 0), radius=1)
+    vb.add(ellipse)
+    assert_true(vb._scene_changed)
+
+    vb._scene_changed = False
+    ellipse.transform = transforms.STTransform(scale=(2, 2))
+    assert_true(vb._scene_changed)
+
+    vb._scene_changed = False
+    vb.camera.rect = (0, 0, 10, 10)
+    assert_true(vb._scene_changed)
+
+    # A second viewbox on the same scene is notified as well
+    vb2 = ViewBox(scene=vb.scene)
+    vb._scene_changed = vb2._scene_changed = False
+    ellipse.transform.translate = (1, 1)
+    assert_true(vb._scene_changed and vb2._scene_changed)
+
+
+@requires_application()
+def test_viewbox_fbo_reuse():
+    """Test drawing several ViewBoxes through their reused FBOs"""
+    with TestingCanvas() as c:
+        boxes = []
+        for i, color in enumerate(('red', 'blue')):
+            vb = ViewBox(parent=c.scene, pos=(50 * i, 0), size=(50, 100),
+                         bgcolor=color, border_color=color)
+            vb.clip_method = 'fbo'
+            boxes.append(vb)
+        for i in range(2):
+            c.draw_visual(c.scene)
+            image = _screenshot(alpha=False)
+            assert_array_equal(image[50, 25], (255, 0, 0))
+            assert_array_equal(image[50, 75], (0, 0, 255))
+        fbo = boxes[0]._fbo
+        assert_true(fbo is not None and fbo is not boxes[1]._fbo)
+
+        # The cached image is not used after the background changed
+        boxes[0].bgcolor = (0, 1, 0)
+        c.draw_visual(c.scene)
+        assert_true(boxes[0]._fbo is fbo)
+        assert_array_equal(_screenshot(alpha=False)[50, 25], (0, 255, 0))
@@ -15,13 +15,14 @@ images, text, etc.
 
 __all__ = ['Visual', 'Ellipse', 'GridLines', 'Image', 'Line', 'LinePlot',
            'Markers', 'marker_types', 'Mesh', 'Polygon', 'Rectangle',
-           'RegularPolygon', 'SurfacePlot', 'Text', 'XYZAxis']
+           'RegularPolygon', 'SurfacePlot', 'Text', 'TiledImage', 'XYZAxis']
 
 from .visual import Visual  # noqa
 from .line import Line  # noqa
 from .markers import Markers, marker_types  # noqa
 from .mesh import Mesh  # noqa
 from .image import Image  # noqa
+from .tiled_image import TiledImage  # noqa
 from .polygon import Polygon  # noqa
 from .ellipse import Ellipse  # noqa
 from .regular_polygon import RegularPolygon  # noqa
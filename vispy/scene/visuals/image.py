@@ -7,10 +7,12 @@ from __future__ import division
 import numpy as np
 
 from ... import gloo
+from ...gloo.texture import GL_LUMINANCE16
+from ...ext.six import string_types
 from ..transforms import STTransform, NullTransform
 from .modular_mesh import ModularMesh
 from ..components import (TextureComponent, VertexTextureCoordinateComponent,
-                          TextureCoordinateComponent)
+                          TextureCoordinateComponent, ColormapComponent)
 
 
 class Image(ModularMesh):
@@ -18,8 +20,11 @@ class Image(ModularMesh):
 
     Parameters
     ----------
-    data : (height, width, 4) ubyte array
-        Image data.
+    data : ndarray
+        Image data. Can be (height, width, 3) or (height, width, 4) for RGB(A)
+        images, or (height, width) for scalar data that is shown with a
+        colormap. Scalar uint8 and uint16 data is uploaded as is, other types
+        are converted to float32.
     method : str
         Selects method of rendering image in case of non-linear transforms.
         Each method produces similar results, but may trade efficiency
@@ -35,16 +40,49 @@ class Image(ModularMesh):
     grid: tuple (rows, cols)
         If method='subdivide', this tuple determines the number of rows and
         columns in the image grid.
+    cmap : str | Function | array
+        The colormap for scalar data: the name of a colormap in
+        ``vispy.color.colormaps``, a Function that maps a float in 0..1 to a
+        vec4 color, or an (N, 3) or (N, 4) array of colors that is used as a
+        lookup table.
+    clim : None | 'auto' | tuple
+        The data values that map to the ends of the colormap. None maps the
+        range of the data type (0-255 for uint8, 0-65535 for uint16 and 0-1
+        for other types), 'auto' maps the range of the data.
+
+    Notes
+    -----
+    Scalar data is colormapped on the GPU, so changing ``cmap`` or ``clim``
+    usually does not upload the image again. Non-uint8 data is stored in a
+    16 bit texture on desktop GL, but OpenGL ES only has 8 bit luminance
+    textures. If ``clim`` spans too few levels of the texture to show the
+    data without banding, the data is rescaled to ``clim`` on the CPU and
+    uploaded again.
     """
-    def __init__(self, data, method='subdivide', grid=(10, 10), **kwargs):
+    def __init__(self, data, method='subdivide', grid=(10, 10), cmap='grays',
+                 clim=None, **kwargs):
         super(Image, self).__init__(**kwargs)
 
         self._data = None
+        self._scalar_data = None
+        self._data_range = None
+        # the values of scalar data that map to 0 and 1 in the texture, for
+        # the full data and for the data in the texture
+        self._full_range = self._tex_range = (0., 1.)
+        self._cmap_comp = ColormapComponent(cmap)
+        self._clim = clim
 
         # maps from quad coordinates to texture coordinates
         self._tex_transform = STTransform()
 
         self._texture = None
+        self._need_upload = False
+        # the (method, grid) and image shape the geometry was built for
+        self._geometry = None
+        self._geometry_shape = None
+        self._tex_coords = None
+        self._tex_coord_comp = None
+        self._tex_comp = None
         self._interpolation = 'nearest'
         self.set_data(data)
         self.set_gl_options(cull_face=('front_and_back',))
@@ -53,11 +91,86 @@ class Image(ModularMesh):
         self.grid = grid
 
     def set_data(self, image=None, **kwds):
+        """Set the image data
+
+        If a texture was created for previous data, it is reused: data of
+        the same shape and type is uploaded into it, and it is resized if
+        only the shape changed. The geometry is kept.
+        """
         if image is not None:
+            image = np.ascontiguousarray(image)
+            if image.ndim == 3 and image.shape[2] == 1:
+                image = image[..., 0]
+            self._data_range = self._scalar_data = None
+            if image.ndim == 2:
+                self._scalar_data = image
+                image, self._full_range, self._data_range = \
+                    _scalar_texture_data(image)
+                self._tex_range = self._full_range
             self._data = image
-            self._texture = None
+            self._need_upload = True
+            self._update_clim()
+            self.update()
         super(Image, self).set_data(**kwds)
 
+    @property
+    def cmap(self):
+        """The colormap used for scalar data"""
+        return self._cmap_comp.cmap
+
+    @cmap.setter
+    def cmap(self, cmap):
+        self._cmap_comp.cmap = cmap
+
+    @property
+    def clim(self):
+        """The data values that map to the ends of the colormap"""
+        return self._clim
+
+    @clim.setter
+    def clim(self, clim):
+        self._clim = clim
+        self._update_clim()
+
+    def _update_clim(self):
+        if self._data is None or self._data.ndim != 2:
+            return
+        clim = self._clim
+        if clim is None:
+            clim = {np.dtype(np.uint8): (0., 255.),
+                    np.dtype(np.uint16): (0., 65535.)}.get(
+                        self._scalar_data.dtype, (0., 1.))
+        elif isinstance(clim, string_types) and clim == 'auto':
+            if self._data_range is None:
+                self._data_range = (float(self._scalar_data.min()),
+                                    float(self._scalar_data.max()))
+            clim = self._data_range
+        clim = float(clim[0]), float(clim[1])
+        # Rescale the data on the CPU if clim spans fewer texture levels than
+        # a full 8 bit texture, and go back to the full range when it no
+        # longer does
+        dtype = self._scalar_data.dtype
+        _, bits = _texture_format(dtype)
+        lo, hi = self._full_range
+        lossy = not (dtype == np.uint8 or (dtype == np.uint16 and bits == 16))
+        narrow = lossy and clim[0] != clim[1] and \
+            abs(clim[1] - clim[0]) * (2 ** bits - 1) < 255 * (hi - lo)
+        tex_range = clim if narrow else self._full_range
+        if tex_range != self._tex_range:
+            if narrow:
+                data = np.asarray(self._scalar_data, np.float32)
+                data = (data - clim[0]) * np.float32(1. / (clim[1] - clim[0]))
+                self._data = np.clip(data, 0., 1., out=data)
+            else:
+                self._data = _scalar_texture_data(self._scalar_data)[0]
+            self._tex_range = tex_range
+            self._need_upload = True
+            self.update()
+        # convert to texture values
+        lo, hi = self._tex_range
+        self._cmap_comp.clim = ((clim[0] - lo) / (hi - lo),
+                                (clim[1] - lo) / (hi - lo))
+
     @property
     def interpolation(self):
         return self._interpolation
@@ -65,21 +178,44 @@ class Image(ModularMesh):
     @interpolation.setter
     def interpolation(self, interp):
         self._interpolation = interp
+        if self._texture is not None:
+            self._texture.interpolation = interp
         self.update()
 
     @property
     def size(self):
         return self._data.shape[:2][::-1]
 
-    def _build_data(self, event):
-        # Construct complete data array with position and optionally color
+    def _draw_method(self):
         if self.transform.Linear:
-            method = 'subdivide'
-            grid = (1, 1)
+            return 'subdivide', (1, 1)
+        if self.method not in ('subdivide', 'impostor'):
+            raise ValueError("Unknown image draw method '%s'" % self.method)
+        return self.method, tuple(self.grid)
+
+    def _upload(self):
+        """Upload the data, into the existing texture if possible"""
+        data = self._data
+        internalformat = None
+        if data.ndim == 2:
+            internalformat = _texture_format(data.dtype)[0]
+        channels = data.shape[2] if data.ndim == 3 else 1
+        texture = self._texture
+        if (texture is not None and texture.dtype == data.dtype and
+                texture.shape[2] == channels and
+                texture.internalformat == internalformat):
+            # gloo only reallocates the texture if the shape changed
+            texture.set_data(data)
         else:
-            method = self.method
-            grid = self.grid
+            self._texture = gloo.Texture2D(data, store=False,
+                                           internalformat=internalformat)
+            self._texture.interpolation = self._interpolation
+            if self._tex_comp is not None:
+                self._tex_comp.texture = self._texture
+        self._need_upload = False
 
+    def _build_geometry(self, method, grid):
+        """Create the vertices and texture coordinate component"""
         # TODO: subdivision and impostor modes should be handled by new
         # components?
         if method == 'subdivide':
@@ -99,35 +235,52 @@ class Image(ModularMesh):
             mgrid[..., 1] *= h
 
             quads[..., :2] += mgrid
-            tex_coords = quads.reshape(grid[1]*grid[0]*6, 3)
-            vertices = tex_coords.copy()
-            vertices[..., 0] *= self._data.shape[1]
-            vertices[..., 1] *= self._data.shape[0]
-            ModularMesh.set_data(self, pos=vertices)
-            coords = np.ascontiguousarray(tex_coords[:, :2])
-            tex_coord_comp = TextureCoordinateComponent(coords)
-        elif method == 'impostor':
+            self._tex_coords = quads.reshape(grid[1]*grid[0]*6, 3)
+            ModularMesh.set_data(self, pos=self._tex_coords)
+            coords = np.ascontiguousarray(self._tex_coords[:, :2])
+            self._tex_coord_comp = TextureCoordinateComponent(coords)
+        else:
             # quad covers entire view; frag. shader will deal with image shape
             quad = np.array([[-1, -1, 0], [1, -1, 0], [1, 1, 0],
                              [-1, -1, 0], [1, 1, 0], [-1, 1, 0]],
                             dtype=np.float32)
             ModularMesh.set_data(self, pos=quad)
-
-            self._tex_transform.scale = (1./self._data.shape[0],
-                                         1./self._data.shape[1])
-            ctr = event.render_transform.inverse
-            total_transform = self._tex_transform * ctr
-            tex_coord_comp = VertexTextureCoordinateComponent(total_transform)
+            self._tex_coord_comp = VertexTextureCoordinateComponent(
+                self._tex_transform)
             tr = NullTransform().shader_map()
             self._program.vert['map_local_to_nd'] = tr
-        else:
-            raise ValueError("Unknown image draw method '%s'" % method)
 
-        self._texture = gloo.Texture2D(self._data)
-        self._texture.interpolation = self._interpolation
+        self._tex_comp = TextureComponent(self._texture, self._tex_coord_comp)
+        self._geometry = (method, grid)
+        self._geometry_shape = None
 
-        self.color_components = [TextureComponent(self._texture,
-                                                  tex_coord_comp)]
+    def _build_data(self, event):
+        """Update the texture, geometry and components that changed"""
+        method, grid = self._draw_method()
+        if self._need_upload:
+            self._upload()
+        if self._geometry != (method, grid):
+            self._build_geometry(method, grid)
+
+        shape = self._data.shape[:2]
+        if self._geometry_shape != shape:
+            if method == 'subdivide':
+                # re-uploaded into the same vertex buffer
+                vertices = self._tex_coords * [shape[1], shape[0], 1]
+                self.pos_components[0].set_data(vertices.astype(np.float32))
+            else:
+                self._tex_transform.scale = (1. / shape[1], 1. / shape[0])
+            self._geometry_shape = shape
+
+        comps = [self._tex_comp]
+        if self._data.ndim == 2:
+            comps.append(self._cmap_comp)
+        if self.color_components != comps:
+            self.color_components = comps
+
+        if method == 'impostor':
+            ctr = event.render_transform.inverse
+            self._tex_coord_comp.transform = self._tex_transform * ctr
 
     def _activate_transform(self, event=None):
         # this is handled in _build_data instead.
@@ -143,16 +296,40 @@ class Image(ModularMesh):
         if self._data is None:
             return
 
-        if self.transform.Linear:
-            method = 'subdivide'
-        else:
-            method = self.method
-
-        # always have to rebuild for impostor, only first for subdivide
-        if self._texture is None or method == 'impostor':
-            self._build_data(event)
-        if method == 'subdivide':
+        self._build_data(event)
+        if self._geometry[0] == 'subdivide':
             tr = event.render_transform.shader_map()
             self._program.vert['map_local_to_nd'] = tr
 
         super(Image, self).draw(event)
+
+
+def _texture_format(dtype):
+    """Get the internal format and the number of bits of the luminance
+    texture for scalar data of a dtype. ES 2.0 has no sized formats.
+    """
+    if dtype != np.uint8 and gloo.gl.is_desktop():
+        return GL_LUMINANCE16, 16
+    return None, 8
+
+
+def _scalar_texture_data(data):
+    """Get scalar data in a form that can be uploaded as a luminance texture
+
+    Returns the data, the data values that map to 0 and 1 in the texture, and
+    the range of the data if it was computed. Float luminance textures are
+    clamped to 0..1, so float data is scaled to that range if needed.
+    """
+    if data.dtype == np.uint8:
+        return data, (0., 255.), None
+    if data.dtype == np.uint16:
+        return data, (0., 65535.), None
+    data = np.asarray(data, dtype=np.float32)
+    lo, hi = float(np.nanmin(data)), float(np.nanmax(data))
+    if not (np.isfinite(lo) and np.isfinite(hi)):
+        return data, (0., 1.), (0., 1.)
+    if lo >= 0 and hi <= 1:
+        return data, (0., 1.), (lo, hi)
+    scale = hi - lo if hi > lo else 1.
+    data = (data - lo) * np.float32(1. / scale)
+    return data, (lo, lo + scale), (lo, hi)
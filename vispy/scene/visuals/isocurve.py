@@ -7,7 +7,7 @@ from __future__ import division
 import numpy as np
 
 from .line import Line
-from ...geometry.isocurve import isocurve
+from ...geometry.isocurve import isocurve_segments
 
 
 class Isocurve(Line):
@@ -17,8 +17,11 @@ class Isocurve(Line):
     ----------
     data : ndarray | None
         2D scalar array.
-    level: float | None
-        The level at which the isocurve is constructed from *data*.
+    level: float | sequence of float | None
+        The level at which the isocurve is constructed from *data*. If
+        a sequence is given, the isocurves of all levels are shown (they
+        are computed together, which is much faster than using an
+        Isocurve visual per level).
 
     Notes
     -----
@@ -64,21 +67,12 @@ class Isocurve(Line):
             return
         
         if self._recompute:
-            verts = []
-            paths = isocurve(self._data.astype(float).T, self._level, 
-                             extend_to_edge=True, connected=True)
-            tot = 0
-            gaps = []
-            for path in paths:
-                verts.extend(path)
-                tot += len(path)
-                gaps.append(tot-1)
-                
-            connect = np.ones(tot-1, dtype=bool)
-            connect[gaps[:-1]] = False
-            
-            verts = np.array(verts)
-            Line.set_data(self, pos=verts, connect=connect)
+            # The segments are drawn as is; connecting them into paths
+            # would not change the result in gl mode
+            segments, _ = isocurve_segments(np.asarray(self._data).T,
+                                            self._level, extend_to_edge=True)
+            verts = segments.reshape(-1, 2).astype(np.float32)
+            Line.set_data(self, pos=verts, connect='segments')
             self._recompute = False
             
         Line.draw(self, event)
@@ -4,8 +4,11 @@
 
 from __future__ import division
 
+import numpy as np
+
 from .mesh import Mesh
-from ...geometry.isosurface import isosurface
+from ...geometry import MeshData
+from ...geometry.isosurface import iter_isosurface, IsosurfaceExtractor
 
 
 class Isosurface(Mesh):
@@ -17,13 +20,30 @@ class Isosurface(Mesh):
         3D scalar array.
     level: float | None
         The level at which the isosurface is constructed from *data*.
+    chunk_size : int | None
+        If given, the isosurface is computed in slabs of this many cells
+        along the first axis of *data*, and the mesh is shown progressively
+        (one more slab is added each time the visual is drawn). This keeps
+        the memory use bounded for large volumes. Each slab is appended to
+        the vertex buffers, so the earlier slabs are not uploaded again.
+    n_jobs : int
+        The number of threads used to compute the slabs.
 
     Notes
     -----
+    Without *chunk_size*, an ``IsosurfaceExtractor`` is built for the
+    data, so that changing the level only processes the parts of the
+    volume that contain the new isosurface, and recently used levels are
+    cached.
     """
-    def __init__(self, data=None, level=None, **kwds):
+    def __init__(self, data=None, level=None, chunk_size=None, n_jobs=1,
+                 **kwds):
         self._data = None
         self._level = level
+        self._chunk_size = chunk_size
+        self._n_jobs = n_jobs
+        self._blocks = None
+        self._extractor = None
         self._recompute = True
         Mesh.__init__(self, **kwds)
         if data is not None:
@@ -52,6 +72,7 @@ class Isosurface(Mesh):
             all locations in the scalar field equal to ``self.level``.
         """
         self._data = data
+        self._extractor = None
         self._recompute = True
         self.update()
 
@@ -60,8 +81,115 @@ class Isosurface(Mesh):
             return
         
         if self._recompute:
-            verts, faces = isosurface(self._data, self._level)
-            Mesh.set_data(self, vertices=verts, faces=faces)
-            self._recompute = False
+            self._compute()
+        if self._blocks is not None:
+            self._add_block()
+        if self._draw_count == 0:
+            return  # no block with faces has arrived yet
             
         Mesh.draw(self, event)
+
+    def _compute(self):
+        """ Compute the isosurface, or start computing it in blocks
+        """
+        if self._blocks is not None:
+            self._blocks.close()  # stops the worker threads
+            self._blocks = None
+        if self._chunk_size is None:
+            if self._extractor is None:
+                self._extractor = IsosurfaceExtractor(self._data)
+            verts, faces = self._extractor.isosurface(self._level)
+            Mesh.set_data(self, vertices=verts, faces=faces)
+            self._draw_count = None
+        else:
+            self._blocks = iter_isosurface(self._data, self._level,
+                                           self._chunk_size, self._n_jobs)
+            # all vertices so far, since faces may refer to earlier blocks
+            self._block_vertices = np.empty((0, 3), dtype=np.float32)
+            self._n_block_vertices = 0
+            self._face_blocks = []
+            # the buffer data, with room for more blocks
+            self._stream_pos = self._stream_normals = None
+            self._draw_count = 0
+        self._recompute = False
+
+    def _add_block(self):
+        """ Add the next block of a chunked isosurface to the mesh
+
+        The faces of the block are appended to the vertex buffers, which are
+        only uploaded as a whole when they have to grow.
+        """
+        try:
+            verts, faces = next(self._blocks)
+        except StopIteration:
+            self._blocks = None
+            if self.shading == 'smooth' and self._face_blocks:
+                # The normals of the vertices on the seams between blocks
+                # are only known now
+                Mesh.set_data(self, vertices=self._block_vertices[
+                    :self._n_block_vertices],
+                    faces=np.concatenate(self._face_blocks))
+            return
+        self.update()  # draw again to add the next block
+        n = self._n_block_vertices
+        self._block_vertices = _reserve(self._block_vertices, n + len(verts))
+        self._block_vertices[n:n + len(verts)] = verts
+        self._n_block_vertices = n + len(verts)
+        if len(faces) == 0:
+            return
+        if self.shading == 'smooth':
+            self._face_blocks.append(faces)
+
+        # The block as a mesh of the vertices that its faces use
+        used, local = np.unique(faces, return_inverse=True)
+        md = MeshData(vertices=self._block_vertices[used],
+                      faces=local.reshape(faces.shape))
+        pos = md.vertices(indexed='faces').reshape(-1, 3)
+        normals = None
+        if self.shading == 'flat':
+            normals = md.face_normals(indexed='faces').reshape(-1, 3)
+        elif self.shading == 'smooth':
+            normals = md.vertex_normals(indexed='faces').reshape(-1, 3)
+
+        start = self._draw_count
+        stop = start + len(pos)
+        grow = self._stream_pos is None or stop > len(self._stream_pos)
+        if grow:
+            self._stream_pos = _reserve(self._stream_pos, stop, start)
+        self._stream_pos[start:stop] = pos
+        if normals is not None:
+            if grow:
+                self._stream_normals = _reserve(self._stream_normals, stop,
+                                                start)
+            self._stream_normals[start:stop] = normals
+        if grow:
+            self._vertices.set_data(self._stream_pos)
+            if normals is None:
+                self._normals.set_data(np.zeros((0, 3), dtype=np.float32))
+            else:
+                self._normals.set_data(self._stream_normals)
+            self._indexed = False
+            self._update_program(3)
+        else:
+            self._vertices.set_subdata(self._stream_pos[start:stop],
+                                       offset=start)
+            if normals is not None:
+                self._normals.set_subdata(self._stream_normals[start:stop],
+                                          offset=start)
+        self._data_changed = False
+        self._draw_count = stop
+
+
+def _reserve(array, size, keep=None):
+    """ Get an (N, 3) float32 array with room for *size* rows that starts
+    with the first *keep* rows of *array* (all rows by default). The
+    capacity is doubled when it has to grow.
+    """
+    if array is not None and len(array) >= size:
+        return array
+    old = 0 if array is None else len(array)
+    new = np.zeros((max(size, 2 * old, 1024), 3), dtype=np.float32)
+    if array is not None:
+        keep = old if keep is None else keep
+        new[:keep] = array[:keep]
+    return new
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Vispy Development Team.
+# Distributed under the (new) BSD License. See LICENSE.txt for more info.
+"""
+Min/max decimation of line data for level-of-detail rendering.
+"""
+
+from __future__ import division
+
+import numpy as np
+
+
+class MinMaxPyramid(object):
+    """ A pyramid of peak-preserving decimations of a line with
+    monotonically increasing x coordinates.
+
+    Level 0 is the original data. At level L, the data is divided in bins
+    of 2**L samples, and of each bin only the samples with the minimum
+    and maximum y value are kept (in their original order). Drawing a
+    level that has about one bin per pixel looks the same as drawing the
+    original data, because all peaks are preserved.
+
+    Parameters
+    ----------
+    pos : array
+        Array of shape (N, 2) or (N, 3). The x coordinates (first column)
+        must be sorted.
+    min_level : int
+        The lowest level that is decimated (levels below this use the
+        original data).
+    """
+
+    def __init__(self, pos, min_level=2):
+        self.pos = pos
+        self.x = pos[:, 0]
+        self.min_level = min_level
+        y = pos[:, 1]
+        n = len(pos)
+        itype = np.int32 if n < 2**31 else np.int64
+
+        # Each level is an array of sample indices; two per bin
+        self._levels = []
+        index = np.arange(n, dtype=itype)
+        level = 1
+        while len(index) > 4:
+            # Combine two bins of the previous level (4 candidates)
+            pad = -len(index) % 4
+            if pad:
+                index = np.concatenate([index, index[-1:].repeat(pad)])
+            index = index.reshape(-1, 4)
+            values = y[index]
+            rows = np.arange(len(index))
+            imin = index[rows, values.argmin(axis=1)]
+            imax = index[rows, values.argmax(axis=1)]
+            index = np.sort(np.column_stack([imin, imax]), axis=1).ravel()
+            level += 1
+            if level >= min_level:
+                self._levels.append(index)
+
+    @property
+    def n_levels(self):
+        """ The number of levels, including level 0.
+        """
+        return self.min_level + len(self._levels)
+
+    def choose_level(self, n_samples, n_pixels):
+        """ Get the level that shows *n_samples* consecutive samples on
+        *n_pixels* pixels with about one bin per pixel.
+        """
+        if n_pixels <= 0:
+            return self.n_levels - 1
+        density = n_samples / n_pixels
+        if density < 2 ** self.min_level:
+            return 0
+        level = int(np.floor(np.log2(density)))
+        return min(level, self.n_levels - 1)
+
+    def sample_range(self, x0, x1):
+        """ Get the range (start, stop) of sample indices needed to draw
+        the x range x0..x1, including one sample outside each side.
+        """
+        start = max(np.searchsorted(self.x, x0, side='right') - 1, 0)
+        stop = min(np.searchsorted(self.x, x1, side='left') + 1, len(self.x))
+        return int(start), int(stop)
+
+    def indices(self, level, start, stop):
+        """ Get the indices of the samples at *level* that cover the
+        samples start..stop.
+        """
+        if level < self.min_level:
+            return np.arange(start, stop)
+        index = self._levels[level - self.min_level]
+        i0 = max(np.searchsorted(index, start) - 1, 0)
+        i1 = np.searchsorted(index, stop) + 1
+        return index[i0:i1]
@@ -16,6 +16,7 @@ from ...shaders import ModularProgram, Function
 from ..visual import Visual
 
 from .dash_atlas import DashAtlas
+from .decimation import MinMaxPyramid
 from .vertex import VERTEX_SHADER as AGG_VERTEX_SHADER
 from .fragment import FRAGMENT_SHADER as AGG_FRAGMENT_SHADER
 
@@ -42,6 +43,9 @@ TODO:
 """
 
 
+# Desktop GL only; our GL namespace is ES 2.0, which has no line smoothing
+GL_LINE_SMOOTH = 2848
+
 joins = {'miter': 0, 'round': 1, 'bevel': 2}
 
 caps = {'': 0, 'none': 0, '.': 0,
@@ -140,6 +144,19 @@ def _agg_bake(vertices, color, closed=False):
     return gloo.VertexBuffer(V), gloo.IndexBuffer(I)
 
 
+def _visible_x_range(event):
+    """ Get the x range of the current viewport in the coordinate system
+    of the current entity, and the width of that range in pixels.
+    """
+    ndc = np.array([[-1, 0, 0, 1], [1, 0, 0, 1]], dtype=np.float64)
+    edges = np.asarray(event.render_transform.imap(ndc), dtype=np.float64)
+    edges = edges[:, :3] / edges[:, 3:4]
+    px = np.asarray(event.framebuffer_transform().map(edges))
+    px = px[:, :2] / px[:, 3:4]
+    x0, x1 = sorted(edges[:, 0])
+    return x0, x1, np.hypot(*(px[1] - px[0]))
+
+
 GL_VERTEX_SHADER = """
     varying vec4 v_color;
 
@@ -189,10 +206,26 @@ class Line(Visual):
               but produces much lower-quality results and is not guaranteed to
               obey the requested line width or join/endcap styles.
     antialias : bool
-        For mode='gl', specifies whether to use line smoothing or not.
+        For mode='gl', specifies whether to use line smoothing or not
+        (desktop GL only; OpenGL ES has no line smoothing).
+    decimate : bool
+        If True, lines with connect='strip' and increasing x coordinates
+        are drawn with a level of detail that matches the on-screen pixel
+        density, using min/max decimation so that peaks are preserved.
+        Only the visible part is uploaded. This keeps zooming and panning
+        interactive for data sets that are much larger than the screen.
+    ring_size : int | None
+        If given, the vertices are kept in a fixed-size ring buffer of this
+        many vertices, for streaming data such as an oscilloscope trace
+        (mode='gl' and connect='strip' only, with a single color or a
+        colormap). New vertices are added with ``append()``, which drops
+        the oldest vertices when the buffer is full. Only the new vertices
+        are uploaded and the buffer is never reallocated; the line is drawn
+        from the oldest vertex to the newest.
     """
     def __init__(self, pos=None, color=(0.5, 0.5, 0.5, 1), width=1,
-                 connect='strip', mode='gl', antialias=False, **kwds):
+                 connect='strip', mode='gl', antialias=False, decimate=False,
+                 ring_size=None, **kwds):
         # todo: Get rid of aa argument? It's a bit awkward since ...
         # - line_smooth is not supported on ES 2.0
         # - why on earth would you turn off aa with agg?
@@ -225,6 +258,23 @@ class Line(Visual):
         self._da = None
         self._U = None
         self._dash_atlas = None
+        # level of detail
+        self._decimate = bool(decimate)
+        self._lod = None
+        self._lod_color = None
+        self._lod_key = None
+        # ring buffer
+        if ring_size is not None:
+            if mode != 'gl' or connect != 'strip' or decimate:
+                raise ValueError("ring_size requires mode='gl', "
+                                 "connect='strip' and decimate=False")
+            ring_size = int(ring_size)
+            if ring_size < 2:
+                raise ValueError('ring_size must be at least 2')
+        self._ring_size = ring_size
+        self._ring = None  # the CPU copy of the ring buffer
+        self._ring_count = 0  # the number of vertices in the ring buffer
+        self._ring_joint = None
 
         # now actually set the mode, which will call set_data
         self.mode = mode
@@ -247,6 +297,8 @@ class Line(Visual):
     def mode(self, mode):
         if mode not in ('agg', 'gl'):
             raise ValueError('mode argument must be "agg" or "gl".')
+        if mode != 'gl' and self._ring_size is not None:
+            raise ValueError('A line with a ring buffer must use mode "gl".')
         if mode == self._mode:
             return
         # If the mode changed, reset everything
@@ -263,7 +315,11 @@ class Line(Visual):
             
         # do not call subclass set_data; this is often overridden with a 
         # different signature.
-        Line.set_data(self, self._pos, self._color, self._width, self._connect)
+        if self._lod is not None:
+            pos, color = self._lod.pos, self._lod_color
+        else:
+            pos, color = self._pos, self._color
+        Line.set_data(self, pos, color, self._width, self._connect)
 
     def set_data(self, pos=None, color=None, width=None, connect=None):
         """ Set the data used to draw this visual.
@@ -293,6 +349,10 @@ class Line(Visual):
         
         self._origs = {'pos': pos, 'color': color, 
                        'width': width, 'connect': connect}
+
+        if self._lod is not None:
+            # Restore the color of the complete data
+            self._color = self._lod_color
         
         if color is not None:
             if isinstance(color, string_types):
@@ -309,12 +369,74 @@ class Line(Visual):
                 
         if width is not None:
             self._width = width
+
+        # With level of detail, the data to upload is selected when drawing
+        if pos is not None:
+            self._lod = self._make_lod(pos, connect)
+        if self._lod is not None:
+            if connect is not None:
+                self._connect = connect
+            self._lod_color = self._color
+            self._lod_key = None
+            self._invalidate_batch_data()
+            self.update()
+            return
             
         if self.mode == 'gl':
             self._gl_set_data(**self._origs)
         else:
             self._agg_set_data(**self._origs)
 
+    def _make_lod(self, pos, connect):
+        """ Create a MinMaxPyramid for the given data, or return None if
+        the data cannot be decimated.
+        """
+        connect = self._connect if connect is None else connect
+        pos = np.asarray(pos)
+        if (not self._decimate or
+                not isinstance(connect, string_types) or
+                connect != 'strip' or pos.ndim != 2 or len(pos) < 8 or
+                not np.all(np.diff(pos[:, 0]) >= 0)):
+            return None
+        return MinMaxPyramid(pos)
+
+    def _update_lod(self, event):
+        """ Upload the part of the data that is visible, at the level of
+        detail that matches the pixel density.
+        """
+        lod = self._lod
+        try:
+            x0, x1, n_pixels = _visible_x_range(event)
+        except Exception:
+            # Cannot invert the transform, assume everything is visible
+            x0, x1 = lod.x[0], lod.x[-1]
+            n_pixels = event.canvas.size[0]
+        start, stop = lod.sample_range(x0, x1)
+        level = lod.choose_level(stop - start, n_pixels)
+        key = self._lod_key
+        if (key is not None and key[0] == level and key[1] <= start and
+                stop <= key[2]):
+            return
+        # Upload a wider range, so that panning does not require an
+        # upload on every draw
+        margin = (stop - start) // 2
+        start = max(start - margin, 0)
+        stop = min(stop + margin, len(lod.pos))
+        index = lod.indices(level, start, stop)
+        color = self._lod_color
+        if not isinstance(color, Function):
+            rgba = getattr(color, 'rgba', color)
+            if rgba.ndim == 2 and len(rgba) == len(lod.pos):
+                color = rgba[index]
+        # This is part of drawing; do not request another draw
+        with self.events.update.blocker():
+            self._color = color
+            if self.mode == 'gl':
+                self._gl_set_data(lod.pos[index], None, None, None)
+            else:
+                self._agg_set_data(lod.pos[index], None, None, None)
+        self._lod_key = (level, start, stop)
+
     def _convert_bool_connect(self, connect):
         # Convert a boolean connection array to a vertex index array
         assert connect.ndim == 1
@@ -324,12 +446,20 @@ class Line(Visual):
         return index[connect]
             
     def _gl_set_data(self, pos, color, width, connect):
+        if (connect is not None and self._ring_size is not None and
+                not (isinstance(connect, string_types) and
+                     connect == 'strip')):
+            raise ValueError("A line with a ring buffer must use connect "
+                             "'strip'.")
         if connect is not None:
             if isinstance(connect, np.ndarray):
                 self._connect = gloo.IndexBuffer(connect.astype(np.uint32))
             else:
                 self._connect = connect
-        if pos is not None:
+        if self._ring_size is not None:
+            if pos is not None:
+                self._ring_set_data(np.asarray(pos, dtype=np.float32))
+        elif pos is not None:
             self._pos = pos
             pos_arr = np.asarray(pos, dtype=np.float32)
             vbo = gloo.VertexBuffer(pos_arr)
@@ -343,8 +473,70 @@ class Line(Visual):
             self._vbo = vbo
         else:
             self._pos = None
+        self._invalidate_batch_data()
+        self.update()
+
+    def _ring_set_data(self, pos):
+        """ Empty the ring buffer and write *pos* into it
+        """
+        if not isinstance(self._color, Function) and self._color.ndim != 1:
+            raise ValueError('A line with a ring buffer must have a single '
+                             'color or a colormap.')
+        if pos.ndim != 2 or pos.shape[-1] not in (2, 3):
+            raise TypeError("pos array should have 2 or 3 elements in last"
+                            " axis. shape=%r" % (pos.shape,))
+        if self._ring is None or self._ring.shape[1] != pos.shape[1]:
+            self._ring = np.zeros((self._ring_size, pos.shape[1]),
+                                  dtype=np.float32)
+            # The buffer stores (a view of) the ring, so writes update it
+            self._vbo = gloo.VertexBuffer(self._ring)
+            to4 = vec2to4 if pos.shape[1] == 2 else vec3to4
+            self._pos_expr = to4(self._vbo)
+            self._ring_joint = gloo.IndexBuffer(
+                np.array([self._ring_size - 1, 0], dtype=np.uint32))
+        else:
+            self._vbo.set_data(self._ring)  # resets the cursor
+        self._pos = self._ring
+        self._ring_count = 0
+        self.append(pos)
+
+    def append(self, pos):
+        """ Append vertices to a line that has a ring buffer
+
+        When the ring buffer is full, the oldest vertices are dropped.
+        Only the new vertices are uploaded.
+
+        Parameters
+        ----------
+        pos : array
+            Array of shape (..., 2) or (..., 3) with the new vertices, which
+            must have as many coordinates as the vertices of the line.
+        """
+        if self._ring_size is None:
+            raise RuntimeError('Can only append to a line that was created '
+                               'with a ring_size.')
+        pos = np.asarray(pos, dtype=np.float32)
+        if self._ring is None:
+            self._ring_set_data(pos)
+            return
+        if pos.shape[-1] != self._ring.shape[1]:
+            raise ValueError('Expected vertices with %d coordinates, got '
+                             'shape %r' % (self._ring.shape[1], pos.shape))
+        self._vbo.write(pos.reshape(-1, self._ring.shape[1]))
+        self._ring_count = min(self._ring_count + len(pos), self._ring_size)
         self.update()
 
+    def _ring_ranges(self):
+        """ The (first, count) ranges of the ring buffer that are drawn as
+        strips, from the oldest vertex to the newest. Consecutive ranges
+        are joined by the segment from the last vertex of the buffer to the
+        first.
+        """
+        cursor = self._vbo.cursor
+        if self._ring_count < self._ring_size or cursor == 0:
+            return [(0, self._ring_count)]
+        return [(cursor, self._ring_size - cursor), (0, cursor)]
+
     def _agg_set_data(self, pos, color, width, connect):
         if connect is not None:
             if connect != 'strip':
@@ -360,15 +552,22 @@ class Line(Visual):
         self.update()
 
     def bounds(self, mode, axis):
-        if 'pos' not in self._origs:
+        if self._ring is not None:
+            data = self._ring[:self._ring_count]
+            if len(data) == 0:
+                return None
+        elif 'pos' not in self._origs:
             return None
-        data = self._origs['pos']
+        else:
+            data = self._origs['pos']
         if data.shape[1] > axis:
             return (data[:, axis].min(), data[:, axis].max())
         else:
             return (0, 0)
 
     def draw(self, event):
+        if self._lod is not None:
+            self._update_lod(event)
         if self.mode == 'gl':
             self._gl_draw(event)
         else:
@@ -390,24 +589,15 @@ class Line(Visual):
             else:
                 self._gl_program.vert['color'] = gloo.VertexBuffer(self._color)
         gloo.set_state('translucent')
-        
-        # Do we want to use OpenGL, and can we?
-        GL = None
-        if self._width > 1 or self._antialias:
-            try:
-                import OpenGL.GL as GL
-            except ImportError:
-                pass
-        
-        # Turn on line smooth and/or line width
-        if GL:
-            if self._antialias:
-                GL.glEnable(GL.GL_LINE_SMOOTH)
-            if GL and self._width > 1:
-                GL.glLineWidth(self._width)
+        self._gl_line_state(True)
         
         # Draw
-        if self._connect == 'strip':
+        if self._ring is not None:
+            for i, (first, count) in enumerate(self._ring_ranges()):
+                if i > 0:
+                    self._gl_program.draw('lines', self._ring_joint)
+                self._gl_program.draw('line_strip', first=first, count=count)
+        elif self._connect == 'strip':
             self._gl_program.draw('line_strip')
         elif self._connect == 'segments':
             self._gl_program.draw('lines')
@@ -416,12 +606,50 @@ class Line(Visual):
         else:
             raise ValueError("Invalid line connect mode: %r" % self._connect)
         
-        # Turn off line smooth and/or line width
-        if GL:
-            if self._antialias:
-                GL.glDisable(GL.GL_LINE_SMOOTH)
-            if GL and self._width > 1:
-                GL.glLineWidth(1)
+        self._gl_line_state(False)
+
+    def _gl_line_state(self, enable):
+        """ Turn on (or off) line smooth (desktop GL only) and/or line width.
+        """
+        if self._antialias and gloo.gl.is_desktop():
+            (gloo.gl.glEnable if enable else gloo.gl.glDisable)(GL_LINE_SMOOTH)
+        if self._width > 1:
+            gloo.gl.glLineWidth(self._width if enable else 1)
+
+    def batch_key(self):
+        # Lines in gl mode with a plain color can be drawn in a batch
+        if (self.mode != 'gl' or self._pos is None or
+                self._lod is not None or self._ring is not None or
+                isinstance(self._color, Function)):
+            return None
+        return (Line, self._width, self._antialias)
+
+    def _prepare_batch_data(self):
+        pos = np.asarray(self._pos, dtype=np.float32)
+        n = len(pos)
+        color = np.atleast_2d(getattr(self._color, 'rgba', self._color))
+        if len(color) == 1:
+            color = np.tile(color, (n, 1))
+        if self._connect == 'strip':
+            index = np.arange(n, dtype=np.uint32).repeat(2)[1:-1]
+        elif self._connect == 'segments':
+            index = np.arange(n - n % 2, dtype=np.uint32)
+        else:
+            index = self._connect.data.ravel()
+        return dict(pos=pos, color=color.astype(np.float32), index=index)
+
+    def draw_batch(self, event, batch):
+        if batch.program is None:
+            batch.program = ModularProgram(GL_VERTEX_SHADER,
+                                           GL_FRAGMENT_SHADER)
+        program = batch.program
+        program.vert['transform'] = event.render_transform.shader_map()
+        program.vert['position'] = batch.buffers['pos']
+        program.vert['color'] = batch.buffers['color']
+        gloo.set_state('translucent')
+        self._gl_line_state(True)
+        program.draw('lines', batch.index)
+        self._gl_line_state(False)
 
     def _agg_draw(self, event):
         if self._pos is None:
@@ -19,7 +19,8 @@ class LinePlot(Visual):
     **kwargs : keyword arguments
         Keyword arguments to pass on to the Line and Marker visuals.
         Supported arguments are width, connect, color, edge_color, face_color,
-        and edge_width.
+        and edge_width. The decimate argument is passed on to the Line
+        (see Line).
 
     Examples
     --------
@@ -42,8 +43,9 @@ class LinePlot(Visual):
             if k in kwds:
                 my_kwds[k] = kwds.pop(k)
 
+        decimate = kwds.pop('decimate', False)
         Visual.__init__(self, **kwds)
-        self._line = Line()
+        self._line = Line(decimate=decimate)
         self._markers = Markers()
 
         self.set_data(*args, **my_kwds)
@@ -88,6 +88,9 @@ class Mesh(Visual):
         # Whether to use _faces index
         self._indexed = None
 
+        # The number of vertices to draw when not indexed (None for all)
+        self._draw_count = None
+
         # Uniform color
         self._color = Color(color).rgba
 
@@ -161,11 +164,18 @@ class Mesh(Visual):
                                       convert=True)
             else:
                 self._colors.set_data(np.zeros((0, 4), dtype=np.float32))
+        self._draw_count = None
+        self._data_changed = False
+        self._update_program(v.shape[-1])
 
+    def _update_program(self, ndim):
+        """Connect the buffers to the program, for vertices with *ndim*
+        coordinates
+        """
         # Position input handling
-        if v.shape[-1] == 2:
+        if ndim == 2:
             self._program.vert['position'] = vec2to4(self._vertices)
-        elif v.shape[-1] == 3:
+        elif ndim == 3:
             self._program.vert['position'] = vec3to4(self._vertices)
         else:
             raise TypeError("Vertex data must have shape (...,2) or (...,3).")
@@ -221,4 +231,4 @@ class Mesh(Visual):
         if self._indexed:
             self._program.draw(self._mode, self._faces)
         else:
-            self._program.draw(self._mode)
+            self._program.draw(self._mode, count=self._draw_count)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests for colormapped scalar data in ImageVisual
+"""
+
+import numpy as np
+from numpy.testing import assert_allclose
+from nose.tools import assert_equal, assert_true, assert_raises
+
+from vispy.gloo import gl
+from vispy.gloo.texture import GL_LUMINANCE16
+from vispy.scene import visuals, transforms
+
+
+class _DrawEvent(object):
+    render_transform = transforms.STTransform()
+
+
+def _frag_code(image):
+    event = _DrawEvent()
+    image._activate_components(image._draw_mode(), event)
+    image._program.vert['map_local_to_nd'] = \
+        event.render_transform.shader_map()
+    image._program._update_code()
+    return image._program._code[1]
+
+
+def test_image_scalar():
+    """Test uploading scalar data and mapping clim to texture values"""
+    data = np.arange(12, dtype=np.uint16).reshape(3, 4) * 1000
+    image = visuals.Image(data)
+    assert_true(image._data is data)  # uploaded as is
+    assert_equal(image.size, (4, 3))
+    assert_allclose(image._cmap_comp.clim, (0, 1))
+    image.clim = 'auto'
+    assert_allclose(image._cmap_comp.clim, (0, 11000 / 65535.))
+    image.clim = (1000, 2000)
+    assert_allclose(image._cmap_comp.clim, (1000 / 65535., 2000 / 65535.))
+
+    # float data is scaled to 0..1
+    image.clim = None
+    image.set_data(np.linspace(-5, 5, 12).reshape(3, 4))
+    assert_equal(image._data.dtype, np.float32)
+    assert_allclose((image._data.min(), image._data.max()), (0, 1))
+    assert_allclose(image._cmap_comp.clim, (0.5, 0.6))
+    image.clim = 'auto'
+    assert_allclose(image._cmap_comp.clim, (0, 1))
+    assert_raises(ValueError, setattr, image, 'cmap', 'foo')
+
+
+def test_image_scalar_precision():
+    """Test 16 bit textures and rescaling the data for a narrow clim"""
+    data = np.arange(12, dtype=np.uint16).reshape(3, 4) * 1000
+    image = visuals.Image(data)
+    image._upload()
+    assert_equal(image._texture.internalformat, GL_LUMINANCE16)
+    image.set_data(data.astype(np.uint8))
+    image._upload()
+    assert_equal(image._texture.internalformat, None)
+    # Color data of the same type gets a new texture in its own format
+    image.set_data(np.zeros((3, 4), np.float32))
+    image._upload()
+    texture = image._texture
+    image.set_data(np.zeros((3, 4, 4), np.float32))
+    image._upload()
+    assert_true(image._texture is not texture)
+    assert_equal(image._texture.shape, (3, 4, 4))
+    assert_equal(image._texture.internalformat, None)
+
+    # 1e-4 of the range of float data is less than 256 16 bit levels
+    image.clim = 'auto'
+    image.set_data(np.linspace(0, 1000, 12).reshape(3, 4))
+    texture = image._data
+    assert_allclose((texture.min(), texture.max()), (0, 1))
+    image.clim = (100, 100.1)
+    assert_true(image._need_upload)
+    assert_allclose(image._cmap_comp.clim, (0, 1))
+    assert_allclose(image._data[0], [0, 0, 1, 1])
+    assert_allclose(image._data[1:], 1)
+    image.clim = (0, 500)
+    assert_allclose(image._data, texture)
+    assert_allclose(image._cmap_comp.clim, (0, 0.5))
+
+    # ES only has 8 bit textures, so a narrow clim of uint16 data is
+    # rescaled; the default clim still depends on the type of the data
+    orig_is_desktop = gl.is_desktop
+    gl.is_desktop = lambda: False
+    try:
+        image.clim = (0, 1000)
+        image.set_data(data)
+        image._upload()
+        assert_equal(image._texture.internalformat, None)
+        assert_equal(image._data.dtype, np.float32)
+        image.clim = None
+        assert_equal(image._data.dtype, np.uint16)
+        assert_allclose(image._cmap_comp.clim, (0, 1))
+    finally:
+        gl.is_desktop = orig_is_desktop
+
+
+def test_image_colormap_shader():
+    """Test that clim and lookup table changes do not rebuild the shader"""
+    image = visuals.Image(np.zeros((3, 4), np.uint8), cmap='hot')
+    image._build_data(_DrawEvent())
+    code = _frag_code(image)
+    assert_true('hot(' in code)
+    image.clim = (10, 20)
+    assert_true(_frag_code(image) is code)
+
+    image.cmap = [[0, 0, 0], [1, 0, 0], [1, 1, 1]]
+    code = _frag_code(image)
+    assert_true('u_lut_texture' in code)
+    lut = image._cmap_comp._lut
+    image.cmap = [[0, 0, 0], [0, 1, 0], [1, 1, 1]]
+    assert_true(_frag_code(image) is code)
+    assert_true(image._cmap_comp._lut is lut)
+
+    # RGBA data is not colormapped
+    image.set_data(np.zeros((3, 4, 4), np.uint8))
+    image._build_data(_DrawEvent())
+    assert_true('u_clim_min' not in _frag_code(image))
+
+
+def test_image_set_data_reuse():
+    """Test that new data is uploaded into the existing texture"""
+    image = visuals.Image(np.zeros((3, 4, 3), np.uint8))
+    image._build_data(_DrawEvent())
+    tex, vbo = image._texture, image.pos_components[0].vbo
+    code = _frag_code(image)
+
+    image.set_data(np.ones((3, 4, 3), np.uint8))
+    image._build_data(_DrawEvent())
+    assert_true(image._texture is tex)
+    assert_true(image.pos_components[0].vbo is vbo)
+    assert_true(_frag_code(image) is code)
+
+    # a new shape resizes the texture and moves the vertices
+    image.set_data(np.ones((5, 6, 3), np.uint8))
+    image._build_data(_DrawEvent())
+    assert_true(image._texture is tex)
+    assert_equal(tex.shape, (5, 6, 3))
+    assert_true(image.pos_components[0].vbo is vbo)
+    assert_allclose(image.pos_components[0]._pos.max(axis=0), (6, 5, 0))
+    assert_true(_frag_code(image) is code)
+
+    # only a new type needs a new texture
+    image.set_data(np.ones((5, 6, 3), np.float32))
+    image._build_data(_DrawEvent())
+    assert_true(image._texture is not tex)
+    assert_true(image._tex_comp.texture is image._texture)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+from numpy.testing import assert_allclose
+from nose.tools import assert_equal, assert_true
+
+from vispy.geometry import MeshData
+from vispy.geometry.isosurface import isosurface
+from vispy.scene import visuals
+
+
+def _sphere(n=24):
+    x = np.linspace(-1, 1, n)
+    return np.sqrt((x[:, None, None] ** 2 + x[None, :, None] ** 2 +
+                    x[None, None, :] ** 2)).astype(np.float32)
+
+
+def _sorted_faces(pos):
+    faces = np.round(pos.reshape(-1, 9), 4)
+    return faces[np.lexsort(faces.T[::-1])]
+
+
+def test_isosurface_streaming():
+    """Test appending the blocks of a chunked isosurface to the buffers"""
+    data = _sphere()
+    verts, faces = isosurface(data, 0.8)
+    iso = visuals.Isosurface(data, level=0.8, chunk_size=4,
+                             shading='flat')
+    iso._compute()
+    uploads = []
+    while iso._blocks is not None:
+        iso._add_block()
+        uploads.extend(iso._vertices._pending_data)
+        iso._vertices._pending_data = []
+        assert_true(iso._draw_count == 0 or not iso._data_changed)
+    n = iso._draw_count
+    assert_equal(n, 3 * len(faces))
+    # Only appended vertices are uploaded, except when the buffer grows
+    nbytes = sum(item[1] for item in uploads)
+    capacity = len(iso._stream_pos)
+    assert_true(n * 12 <= nbytes <= (n + 2 * capacity) * 12)
+    assert_equal(iso._vertices.size, capacity)
+
+    md = MeshData(vertices=verts, faces=faces)
+    expected = md.vertices(indexed='faces')
+    assert_allclose(_sorted_faces(iso._stream_pos[:n]),
+                    _sorted_faces(expected))
+    normals = iso._stream_normals[:n].reshape(-1, 3, 3)
+    assert_allclose(normals[:, 0], normals[:, 2])
+
+    # Smooth shading computes the normals of the whole mesh at the end
+    iso.shading = 'smooth'
+    iso.level = 0.8
+    iso._compute()
+    while iso._blocks is not None:
+        iso._add_block()
+    assert_true(iso._data_changed)
+    assert_equal(len(iso._meshdata.faces()), len(faces))
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests for level-of-detail decimation of LineVisual
+"""
+
+import numpy as np
+from nose.tools import assert_equal, assert_true, assert_raises
+
+from vispy.scene import visuals, transforms
+from vispy.scene.visuals.line.decimation import MinMaxPyramid
+
+
+def test_minmax_pyramid():
+    """Test that min/max decimation preserves peaks"""
+    n = 10000
+    pos = np.zeros((n, 2), np.float32)
+    pos[:, 0] = np.arange(n)
+    pos[1234, 1] = 5
+    pos[8765, 1] = -5
+    lod = MinMaxPyramid(pos)
+    assert_equal(lod.choose_level(n, n), 0)
+    assert_equal(lod.choose_level(n, 100), 6)
+    for level in range(lod.n_levels):
+        index = lod.indices(level, 0, n)
+        assert_true(np.all(np.diff(index) >= 0))
+        assert_true(1234 in index and 8765 in index)
+        if level >= 2:
+            assert_true(len(index) <= 2 * (n // 2 ** level + 1))
+    # A sub range includes one sample outside each side
+    start, stop = lod.sample_range(10.5, 20.5)
+    assert_equal((start, stop), (10, 22))
+    index = lod.indices(3, start, stop)
+    assert_true(index[0] <= start and index[-1] >= stop - 1)
+
+
+class _DrawEvent(object):
+    """Minimal draw event mapping x=0..1000 to 100 pixels"""
+    def __init__(self, x0, x1):
+        scale = 2. / (x1 - x0)
+        self.render_transform = transforms.STTransform(
+            scale=(scale, 1), translate=(-1 - x0 * scale, 0))
+        self._fb = transforms.STTransform(
+            scale=(100. / (x1 - x0), 1), translate=(-x0 * 100. / (x1 - x0), 0))
+
+    def framebuffer_transform(self):
+        return self._fb
+
+
+def test_line_decimate():
+    """Test selecting the level of detail of a LineVisual"""
+    n = 100000
+    pos = np.zeros((n, 2), np.float32)
+    pos[:, 0] = np.arange(n)
+    pos[:, 1] = np.sin(np.arange(n) / 100.)
+    line = visuals.Line(pos=pos, decimate=True)
+    assert_true(line._lod is not None)
+    assert_true(line.batch_key() is None)
+
+    # Zoomed out: few vertices uploaded
+    line._update_lod(_DrawEvent(0, n))
+    n_out = len(line._pos)
+    assert_true(n_out < 1000)
+    key = line._lod_key
+    # Small pans do not trigger a new upload
+    line._update_lod(_DrawEvent(100, n - 100))
+    assert_true(line._lod_key is key)
+
+    # Zoomed in: full resolution, only the visible part
+    line._update_lod(_DrawEvent(500, 550))
+    assert_equal(line._lod_key[0], 0)
+    assert_true(len(line._pos) < 200)
+    assert_true(np.all(line._pos[:, 0] == np.arange(line._pos[0, 0],
+                                                    line._pos[-1, 0] + 1)))
+    # Bounds still refer to the complete data
+    assert_equal(line.bounds(None, 0), (0, n - 1))
+
+    # Decimation only applies to increasing x with connect='strip'
+    assert_true(visuals.Line(pos=pos[::-1].copy(), decimate=True)._lod is None)
+    assert_true(visuals.Line(pos=pos, decimate=True,
+                             connect='segments')._lod is None)
+    assert_true(visuals.Line(pos=pos)._lod is None)
+
+
+def test_line_ring_buffer():
+    """Test appending to a line with a ring buffer"""
+    line = visuals.Line(pos=np.zeros((3, 2)), ring_size=8)
+    vbo, nbytes = line._vbo, line._vbo.nbytes
+    assert_equal(line._ring_ranges(), [(0, 3)])
+    vbo._pending_data = []
+    for i in range(3, 13):
+        line.append([[i, i]])
+    # the buffer is never reallocated, only the new vertices are uploaded
+    assert_true(line._vbo is vbo)
+    assert_equal(vbo.nbytes, nbytes)
+    assert_equal(sum(item[1] for item in vbo._pending_data), 10 * 8)
+    # drawn from the oldest vertex (5) to the newest (12)
+    ranges = line._ring_ranges()
+    assert_equal(ranges, [(5, 3), (0, 5)])
+    x = np.concatenate([line._ring[first:first + count, 0]
+                        for first, count in ranges])
+    assert_equal(list(x), list(range(5, 13)))
+    assert_equal(list(line._ring_joint.data), [7, 0])
+    assert_equal(line.bounds(None, 0), (5, 12))
+    assert_equal(line.batch_key(), None)
+    # set_data starts over
+    line.set_data(pos=np.ones((2, 2)))
+    assert_true(line._vbo is vbo)
+    assert_equal(line._ring_ranges(), [(0, 2)])
+    assert_raises(ValueError, line.append, np.zeros((1, 3)))
+    assert_raises(ValueError, visuals.Line, ring_size=8, mode='agg')
+    assert_raises(RuntimeError, visuals.Line().append, [[0, 0]])
+
+
+def test_line_gl_state():
+    """Test that line smoothing is only used on desktop GL"""
+    from vispy.gloo import gl
+    calls = []
+    names = ('glEnable', 'glDisable', 'glLineWidth', 'is_desktop')
+    orig = [getattr(gl, name) for name in names]
+    gl.glEnable = lambda cap: calls.append(('enable', cap))
+    gl.glDisable = lambda cap: calls.append(('disable', cap))
+    gl.glLineWidth = lambda width: calls.append(('width', width))
+    try:
+        line = visuals.Line(pos=np.zeros((3, 2)), width=2, antialias=True)
+        gl.is_desktop = lambda: True
+        line._gl_line_state(True)
+        line._gl_line_state(False)
+        assert_equal(calls, [('enable', 2848), ('width', 2),
+                             ('disable', 2848), ('width', 1)])
+        del calls[:]
+        gl.is_desktop = lambda: False
+        line._gl_line_state(True)
+        assert_equal(calls, [('width', 2)])
+    finally:
+        for name, func in zip(names, orig):
+            setattr(gl, name, func)
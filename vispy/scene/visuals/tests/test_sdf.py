@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 import numpy as np
 from numpy.testing import assert_allclose
+from nose.tools import assert_equal
 
 from vispy.app import Canvas
-from vispy.scene.visuals.text._sdf import SDFRenderer
+from vispy.scene.visuals.text._sdf import (SDFRenderer, SDFRendererCPU,
+                                           calc_sdfs)
 from vispy import gloo
 from vispy.testing import requires_application
 
@@ -37,3 +39,38 @@ def test_text():
         print(result)
         print(expd)
         assert_allclose(result, expd, atol=1)
+
+
+def test_sdf_cpu():
+    """Test the exact CPU SDF renderer"""
+    data = np.zeros((6, 9), np.uint8)
+    data[2:, 2:7] = 255
+    # squared distances to the nearest pixel outside (< 0) or inside (> 0),
+    # unlike the jump flooding result no artifacts at the center
+    sqd = np.array([[8, 5, 4, 4, 4, 4, 4, 5, 8],
+                    [5, 2, 1, 1, 1, 1, 1, 2, 5],
+                    [4, 1, -1, -1, -1, -1, -1, 1, 4],
+                    [4, 1, -1, -4, -4, -4, -1, 1, 4],
+                    [4, 1, -1, -4, -9, -4, -1, 1, 4],
+                    [4, 1, -1, -4, -9, -4, -1, 1, 4]])
+    dist = np.sqrt(np.abs(sqd))
+    expd = np.where(sqd < 0, 0.5 + (8 * dist - 7) / 256., 0.5 - dist / 32.)
+    tex = gloo.Texture2D(shape=(10, 10, 3), dtype=np.float32, format='rgb')
+    sdf = SDFRendererCPU().render_to_texture(data, tex, (1, 2),
+                                             data.shape[::-1], read=True)
+    assert_allclose(sdf, expd, atol=1e-6)
+    out, offset = tex._pending_data[-1]
+    assert_equal(offset, (2, 1, 0))
+    assert_allclose(out[:, :, 1], expd, atol=1e-6)
+
+    # batches (also in multiple chunks and processes) give the same result
+    big = np.kron(data, np.ones((4, 4), np.uint8))
+    sdfs = calc_sdfs([data, big, data], [(9, 6), (9, 6), (3, 2)])
+    assert_allclose(sdfs[0], expd, atol=1e-6)
+    assert_equal(sdfs[2].shape, (2, 3))
+    assert_allclose(sdfs[2], expd[1::3, 1::3], atol=1e-6)
+    for n_jobs in (1, 2):
+        sdfs_2 = calc_sdfs([data, big, data], [(9, 6), (9, 6), (3, 2)],
+                           n_jobs=n_jobs, max_pixels=big.size)
+        for a, b in zip(sdfs, sdfs_2):
+            assert_allclose(a, b)
@@ -1,8 +1,27 @@
 # -*- coding: utf-8 -*-
+import numpy as np
+from numpy.testing import assert_array_equal, assert_allclose
+from nose.tools import assert_equal, assert_raises
+
+from vispy.gloo import TextureAtlas
 from vispy.scene.visuals import Text
+from vispy.scene.visuals.text.text import TextureFont, _text_to_vbo
+from vispy.scene.visuals.text._cache import GlyphCache, _caches
+from vispy.util import config, _TempDir
 from vispy.testing import (requires_application, TestingCanvas,
                            assert_image_equal)
 
+_orig_data_path = config['data_path']
+
+
+def setup_module():
+    # Keep glyph caches of the tests out of the user's data path
+    config['data_path'] = _TempDir()
+
+
+def teardown_module():
+    config['data_path'] = _orig_data_path
+
 
 @requires_application()
 def test_text():
@@ -17,3 +36,102 @@ def test_text():
         # at some point
         # Test image created in Illustrator CS5, 1"x1" output @ 92 DPI
         assert_image_equal("screenshot", 'visuals/text1.png', limit=840)
+
+
+def test_glyph_cache():
+    """Test storing and loading SDF glyphs with the glyph cache"""
+    try:
+        font = dict(face='OpenSans', bold=False, italic=False)
+        tfont = TextureFont(font, None, cache=True)
+        cache = tfont._cache
+        assert_equal(cache.chars, [])
+        sdf = np.linspace(0, 1, 12).reshape(3, 4)
+        for char in 'ab':
+            glyph = dict(char=char, offset=(1, 2), advance=3.,
+                         kerning={'a': 0., 'b': -1.})
+            cache.add(glyph, sdf)
+            tfont._glyphs[char] = glyph
+        tfont._flush_cache()
+
+        # A new cache reads the glyphs from disk
+        cache = GlyphCache(cache.path)
+        assert_equal(cache.chars, ['a', 'b'])
+        assert_array_equal(cache.bitmap('b'), np.round(sdf * 255))
+        assert_equal(cache.glyph('a')['kerning'], {'b': -1.})
+
+        # ... and a new font puts them in the atlas with one upload
+        tfont = TextureFont(font, None, cache=True)
+        assert_equal(len(tfont._atlas._pending_data), 1)
+        glyph = tfont['b']
+        assert_equal(glyph['size'], (4, 3))
+        assert_equal(glyph['advance'], 3.)
+        data, offset = tfont._atlas._pending_data[0]
+        x, y = 7, 1  # second glyph, with 1 px padding around each glyph
+        assert_array_equal(data[y:y+3, x:x+4, 0], np.round(sdf * 255))
+        assert_equal(TextureFont(font, None)._glyphs, {})
+    finally:
+        _caches.clear()
+
+
+def test_text_layout():
+    """Test the vectorized layout of multiple labels"""
+    tfont = TextureFont(dict(face='OpenSans', bold=False, italic=False),
+                        None, cache=False)
+    for ii, char in enumerate('abhy'):
+        tfont._glyphs[char] = dict(
+            char=char, offset=(4 * ii, 100 + 8 * ii), advance=100. + ii,
+            kerning={'a': -20.} if char == 'b' else {},
+            size=(30 + ii, 40 + 2 * ii), texcoords=(ii, 0, ii + 1, 1))
+    texts = ['ab', '', 'bab', 'a']
+    vertices, labels = _text_to_vbo(texts, tfont, 'left', 'baseline', 64)
+    assert_equal(len(vertices), 6 * 4)
+    assert_array_equal(labels, [0, 0, 2, 2, 2, 3])
+    # x positions: the label pen starts at -slop and kerning is only
+    # applied within a label
+    slop = tfont.slop
+    x0 = vertices['a_position'][::4, 0] * 64
+    expd = [-slop, -slop + 25 + 1 - 5,
+            -slop + 1, -slop + 25.25, -slop + 25.25 + 25 + 1 - 5, -slop]
+    assert_allclose(x0, expd, atol=1e-4)
+    y0 = vertices['a_position'][::4, 1] * 64
+    assert_allclose(y0[:2], [25 + slop, 27 + slop], atol=1e-4)
+    assert_array_equal(vertices['a_texcoord'][4:8], [[1, 0], [1, 1],
+                                                     [2, 1], [2, 0]])
+    # a single label gives the same result as in a list
+    vertices_2, _ = _text_to_vbo(['bab'], tfont, 'left', 'baseline', 64)
+    assert_array_equal(vertices_2, vertices[8:20])
+
+
+def test_glyph_eviction():
+    """Test evicting the least recently used glyphs from the atlas"""
+    tfont = TextureFont(dict(face='OpenSans', bold=False, italic=False),
+                        None, cache=False)
+    for char in 'abcde':
+        x, y, w, h = tfont._atlas.get_free_region(10, 10)
+        tfont._glyphs[char] = dict(char=char)
+        tfont._set_region(tfont._glyphs[char], x + 1, y + 1, w - 2, h - 2)
+    for chars in ('ab', 'c', 'd', 'e'):  # 'e' is used by the current op
+        tfont.touch(chars)
+    epoch = tfont.epoch
+    assert_equal(tfont._evict(), True)
+    assert_equal(sorted(tfont._glyphs), ['c', 'd', 'e'])
+    assert_equal(tfont.epoch, epoch + 1)
+    # the freed regions are reused
+    assert_equal(tfont._atlas.get_free_region(10, 10), (0, 0, 10, 10))
+    tfont.touch('cde')
+    assert_equal(tfont._evict(), False)
+
+    # Glyphs are evicted until a glyph that is larger than any of the
+    # evicted ones fits
+    tfont._atlas = TextureAtlas((32, 32), dtype=np.uint8, channels=1)
+    tfont._glyphs, tfont._last_used = {}, {}
+    for ii in range(16):
+        char = chr(ord('a') + ii)
+        x, y, w, h = tfont._atlas.get_free_region(8, 8)
+        tfont._glyphs[char] = dict(char=char)
+        tfont._set_region(tfont._glyphs[char], x + 1, y + 1, w - 2, h - 2)
+        tfont.touch(char)
+    tfont.touch('z')
+    assert_equal(tfont._get_region(24, 24), (0, 0, 24, 24))
+    assert_equal(sorted(tfont._glyphs), list('mnop'))
+    assert_raises(RuntimeError, tfont._get_region, 32, 32)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the image pyramid and tile selection of TiledImageVisual
+"""
+
+import time
+
+import numpy as np
+from numpy.testing import assert_array_equal
+from nose.tools import assert_equal, assert_true, assert_raises
+
+from vispy.scene import visuals
+from vispy.scene.visuals.tiled_image import ImagePyramid, _TileLoader
+
+
+def test_image_pyramid():
+    """Test computing tiles of lower resolution levels"""
+    data = np.arange(100 * 70 * 3, dtype=np.uint16).reshape(100, 70, 3)
+    pyr = ImagePyramid(data, tile_size=16)
+    assert_equal(pyr.shapes, [(100, 70), (50, 35), (25, 18), (13, 9)])
+    assert_equal(pyr.n_tiles(0), (7, 5))
+    assert_equal(pyr.n_tiles(3), (1, 1))
+    assert_array_equal(pyr.tile(0, 6, 4), data[96:, 64:])
+
+    # a level computed at once matches the tiles
+    level1 = data.reshape(50, 2, 35, 2, 3).astype(float).mean(axis=(1, 3))
+    tile = pyr.tile(1, 1, 2)
+    assert_equal(tile.dtype, np.uint16)
+    assert_array_equal(tile, np.round(level1[16:32, 32:48]))
+    top = pyr.tile(3, 0, 0)
+    assert_equal(top.shape, (13, 9, 3))
+    assert_true(abs(top.mean() - data.mean()) < 0.05 * data.mean())
+
+    assert_equal(pyr.choose_level(0.5), 0)
+    assert_equal(pyr.choose_level(5), 2)
+    assert_equal(pyr.choose_level(1000), 3)
+
+    # precomputed levels are used as is
+    pyr = ImagePyramid(data, 16, levels=[np.zeros((50, 35, 3), np.uint16)])
+    assert_array_equal(pyr.tile(1, 0, 0), 0)
+    assert_array_equal(pyr.tile(2, 0, 0), 0)
+    assert_raises(ValueError, ImagePyramid, data, 16, [data])
+
+
+def test_tile_loader():
+    """Test reading tiles in the background"""
+    data = np.random.RandomState(0).rand(64, 64).astype(np.float32)
+    loader = _TileLoader(ImagePyramid(data, tile_size=16))
+    keys = [(0, 1, 1), (2, 0, 0), (1, 5, 5)]
+    loader.request(keys)
+    loaded = []
+    t0 = time.time()
+    while loader.busy and time.time() - t0 < 10:
+        loaded.extend(loader.loaded())
+        time.sleep(0.01)
+    assert_equal([key for key, tile in loaded], keys)
+    assert_array_equal(loaded[0][1], data[16:32, 16:32])
+    assert_true(loaded[2][1] is None)  # out of range
+
+    # the thread exits when idle or stopped, and starts again when needed
+    loader._idle_timeout = 0.01
+    loader.request([(0, 0, 0)])
+    thread = loader._thread
+    thread.join(10)
+    assert_true(not thread.is_alive() and loader._thread is None)
+    assert_equal([key for key, tile in loader.loaded()], [(0, 0, 0)])
+    loader._idle_timeout = 10.
+    loader.request([(0, 0, 0)])
+    thread = loader._thread
+    loader.stop()
+    thread.join(10)
+    loader.loaded()  # (0, 0, 0) may have been read before stopping
+    assert_true(not thread.is_alive() and not loader.busy)
+    loader.request([(0, 2, 2)])
+    loaded = []
+    t0 = time.time()
+    while loader.busy and time.time() - t0 < 10:
+        loaded.extend(loader.loaded())
+        time.sleep(0.01)
+    assert_equal([key for key, tile in loaded], [(0, 2, 2)])
+    loader.stop()
+
+
+def test_tiled_image_tiles():
+    """Test selecting the visible tiles"""
+    image = visuals.TiledImage(np.zeros((1000, 3000), np.uint8),
+                               tile_size=256)
+    assert_equal(image.size, (3000, 1000))
+    assert_equal(image.pyramid.n_levels, 5)
+    keys = image.visible_tiles((600, 0, 1100, 300), 0)
+    assert_equal(sorted(keys), [(0, r, c) for r in (0, 1) for c in (2, 3, 4)])
+    assert_equal(keys[0], (0, 0, 3))  # closest to the center first
+    assert_equal(image.visible_tiles((-1e6, -1e6, 1e6, 1e6), 4),
+                 [(4, 0, 0)])
+    assert_equal(image.visible_tiles((4000, 0, 5000, 100), 0), [])
+
+    # the loader stops when the visual leaves the scene
+    image._loader.request([(4, 0, 0)])
+    thread = image._loader._thread
+    image.parents = []
+    thread.join(10)
+    assert_true(not thread.is_alive())
+    image.close()
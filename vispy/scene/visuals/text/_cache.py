@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Vispy Development Team. All Rights Reserved.
+# Distributed under the (new) BSD License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+"""
+Persistent on-disk storage of rendered SDF glyphs.
+"""
+
+import os
+import re
+import json
+from os import path as op
+
+import numpy as np
+
+from ....util import config, logger
+
+_CACHE_VERSION = 1
+_caches = {}
+
+
+def get_glyph_cache(font, lowres_size, spread):
+    """Get the (shared) GlyphCache for a font, or None if unavailable
+
+    Parameters
+    ----------
+    font : dict
+        Dict with entries "face", "size", "bold", "italic".
+    lowres_size : int
+        The point size the SDF glyphs are stored at.
+    spread : int
+        The SDF spread (at the high-res size).
+
+    Returns
+    -------
+    cache : instance of GlyphCache | None
+        None if the vispy data path is not defined.
+    """
+    if config['data_path'] is None:
+        return None
+    face = re.sub(r'[^\w\-]', '_', font['face'])
+    name = '%s-%d-%d-%d-%d-%d-v%d' % (face, font['bold'], font['italic'],
+                                      font['size'], lowres_size, spread,
+                                      _CACHE_VERSION)
+    path = op.join(config['data_path'], 'glyph_cache', name)
+    if path not in _caches:
+        _caches[path] = GlyphCache(path)
+    return _caches[path]
+
+
+class GlyphCache(object):
+    """Store of low-res SDF glyph bitmaps, metrics and kerning of a font
+
+    The bitmaps are appended to a raw binary file that is memory-mapped
+    when read, the metrics are stored in a JSON file next to it.
+
+    Parameters
+    ----------
+    path : str
+        The directory to store the cache in. It is created when the
+        first glyph is added.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._glyphs = {}
+        self._chars = []
+        self._bitmaps = None
+        self._dirty = False
+        self._load()
+
+    @property
+    def chars(self):
+        """The cached characters, in the order they were added"""
+        return list(self._chars)
+
+    def __contains__(self, char):
+        return char in self._glyphs
+
+    def _load(self):
+        """Read the metrics of the cached glyphs"""
+        fname = op.join(self.path, 'glyphs.json')
+        if not op.isfile(fname):
+            return
+        try:
+            with open(fname, 'r') as fid:
+                meta = json.load(fid)
+            nbytes = op.getsize(op.join(self.path, 'bitmaps.bin'))
+        except (IOError, OSError, ValueError) as err:
+            logger.warning('Could not read glyph cache %s: %s'
+                           % (self.path, err))
+            return
+        for glyph in meta['glyphs']:
+            h, w = glyph['shape']
+            if glyph['start'] + h * w > nbytes:
+                continue  # not (completely) written
+            self._glyphs[glyph['char']] = glyph
+            self._chars.append(glyph['char'])
+
+    def glyph(self, char):
+        """Get a new glyph dict with the metrics and kerning of a char"""
+        glyph = self._glyphs[char]
+        return dict(char=char, offset=tuple(glyph['offset']),
+                    advance=glyph['advance'], kerning=dict(glyph['kerning']))
+
+    def bitmap(self, char):
+        """Get the SDF bitmap of a char as a (h, w) uint8 array"""
+        if self._bitmaps is None:
+            self._bitmaps = np.memmap(op.join(self.path, 'bitmaps.bin'),
+                                      np.uint8, mode='r')
+        glyph = self._glyphs[char]
+        h, w = glyph['shape']
+        start = glyph['start']
+        return self._bitmaps[start:start + h * w].reshape(h, w)
+
+    def add(self, glyph, bitmap):
+        """Add a glyph
+
+        Parameters
+        ----------
+        glyph : dict
+            The glyph, with entries "char", "offset", "advance" and
+            "kerning".
+        bitmap : array
+            The (h, w) SDF of the glyph, with values between 0 and 1.
+        """
+        char = glyph['char']
+        if char in self._glyphs:
+            return
+        bitmap = np.round(np.clip(bitmap, 0., 1.) * 255).astype(np.uint8)
+        try:
+            if not op.isdir(self.path):
+                os.makedirs(self.path)
+            with open(op.join(self.path, 'bitmaps.bin'), 'ab') as fid:
+                fid.seek(0, 2)
+                start = fid.tell()
+                bitmap.tofile(fid)
+        except (IOError, OSError) as err:
+            logger.warning('Could not write glyph cache %s: %s'
+                           % (self.path, err))
+            return
+        self._bitmaps = None  # re-map on next access
+        self._glyphs[char] = dict(char=char, shape=bitmap.shape, start=start,
+                                  offset=list(glyph['offset']),
+                                  advance=glyph['advance'], kerning={})
+        self._chars.append(char)
+        self._dirty = True
+
+    def flush(self, glyphs=None):
+        """Write the metrics of all glyphs to disk if they changed
+
+        Parameters
+        ----------
+        glyphs : dict | None
+            Dict of glyph dicts. If given, the (non-zero) kerning of the
+            cached glyphs is updated from it first.
+        """
+        for char, glyph in (glyphs or {}).items():
+            if char not in self._glyphs:
+                continue
+            kerning = dict((k, v) for k, v in glyph['kerning'].items()
+                           if v != 0)
+            if kerning != self._glyphs[char]['kerning']:
+                self._glyphs[char]['kerning'] = kerning
+                self._dirty = True
+        if not self._dirty:
+            return
+        meta = dict(version=_CACHE_VERSION,
+                    glyphs=[self._glyphs[char] for char in self._chars])
+        fname = op.join(self.path, 'glyphs.json')
+        try:
+            with open(fname + '.tmp', 'w') as fid:
+                json.dump(meta, fid)
+            if op.isfile(fname):
+                os.remove(fname)  # rename does not overwrite on Windows
+            os.rename(fname + '.tmp', fname)
+        except (IOError, OSError) as err:
+            logger.warning('Could not write glyph cache %s: %s'
+                           % (self.path, err))
+            return
+        self._dirty = False
@@ -5,12 +5,19 @@ Author: Stefan Gustavson (stefan.gustavson@gmail.com)
 2010-08-24. This code is in the public domain.
 
 Adapted to `vispy` by Eric Larson <larson.eric.d@gmail.com>.
+
+The CPU renderer computes the same SDF using the exact EDT algorithm of
+Felzenszwalb & Huttenlocher, "Distance Transforms of Sampled Functions",
+Theory of Computing 8, 2012.
 """
 
+from __future__ import division
+
 import numpy as np
 from os import path as op
 from ....gloo import (Program, VertexShader, FragmentShader, FrameBuffer,
-                      VertexBuffer, Texture2D, set_viewport, set_state)
+                      VertexBuffer, Texture2D, set_viewport, set_state,
+                      get_parameter, read_pixels)
 
 this_dir = op.dirname(__file__)
 
@@ -237,7 +244,7 @@ class SDFRenderer(object):
         for program in self.programs:
             program.bind(vertices)
 
-    def render_to_texture(self, data, texture, offset, size):
+    def render_to_texture(self, data, texture, offset, size, read=False):
         """Render a SDF to a texture at a given offset and size
 
         Parameters
@@ -250,6 +257,14 @@ class SDFRenderer(object):
             Offset (x, y) to render to inside the texture.
         size : tuple of int
             Size (w, h) to render inside the texture.
+        read : bool
+            If True, read back the rendered region.
+
+        Returns
+        -------
+        sdf : array | None
+            If read is True, the rendered region as a float32 array of
+            shape (h, w), in the row order of the texture data.
         """
         assert isinstance(texture, Texture2D)
         set_state(blend=False, depth_test=False)
@@ -272,6 +287,22 @@ class SDFRenderer(object):
         with self.fbo_to[-1]:
             set_viewport(tuple(offset) + tuple(size))
             self.program_insert.draw('triangle_strip')
+            if read:
+                sdf = read_pixels(tuple(offset) + tuple(size), alpha=False,
+                                  out_type='float')
+                return sdf[::-1, :, 0].copy()  # undo flip of read_pixels
+
+    def render_many(self, datas, texture, offsets, sizes, read=False):
+        """Render the SDFs of multiple bitmaps to a texture
+
+        See ``SDFRendererCPU.render_many``.
+        """
+        # Restore the viewport, which is changed by the rendering
+        orig_viewport = get_parameter('viewport')
+        sdfs = [self.render_to_texture(data, texture, offset, size, read)
+                for data, offset, size in zip(datas, offsets, sizes)]
+        set_viewport(*orig_viewport)
+        return sdfs
 
     def _render_edf(self, orig_tex):
         """Render an EDF to a texture"""
@@ -306,3 +337,196 @@ class SDFRenderer(object):
                 self.program_flood.draw('triangle_strip')
             stepsize //= 2
         return comp_texs[last_rend]
+
+
+class SDFRendererCPU(object):
+    """Render SDFs on the CPU, using an exact Euclidean distance transform
+
+    This renderer gives the same result as SDFRenderer (without the
+    approximation errors of jump flooding), but does not need a GL
+    context. Many glyphs can be rendered at once with ``render_many``.
+
+    Parameters
+    ----------
+    n_jobs : int
+        Number of processes to use in ``render_many``.
+    """
+    def __init__(self, n_jobs=1):
+        self.n_jobs = n_jobs
+
+    def render_to_texture(self, data, texture, offset, size, read=False):
+        """Render a SDF to a texture at a given offset and size
+
+        See ``SDFRenderer.render_to_texture``.
+        """
+        return self.render_many([data], texture, [offset], [size], read)[0]
+
+    def render_many(self, datas, texture, offsets, sizes, read=False):
+        """Render the SDFs of multiple bitmaps to a texture
+
+        Parameters
+        ----------
+        datas : list of array
+            The bitmaps, each 2D with type np.ubyte.
+        texture : instance of Texture2D
+            The texture to render to.
+        offsets : list of tuple
+            Offset (x, y) of each SDF inside the texture.
+        sizes : list of tuple
+            Size (w, h) of each SDF inside the texture.
+        read : bool
+            If True, return the SDFs.
+
+        Returns
+        -------
+        sdfs : list
+            The SDFs as float32 arrays of shape (h, w) if read is True,
+            otherwise a list of None.
+        """
+        assert isinstance(texture, Texture2D)
+        sdfs = calc_sdfs(datas, sizes, self.n_jobs)
+        for sdf, (x, y) in zip(sdfs, offsets):
+            data = np.empty(sdf.shape + texture.shape[2:], texture.dtype)
+            if texture.dtype == np.uint8:
+                data[:] = np.round(sdf * 255)[..., np.newaxis]
+            else:
+                data[:] = sdf[..., np.newaxis]
+            texture.set_data(data, offset=(y, x, 0))
+        return sdfs if read else [None] * len(sdfs)
+
+
+##############################################################################
+# Exact EDT
+
+_INF = 1e10  # larger than any squared distance, but avoids inf - inf
+
+
+def _edt_1d(f):
+    """Squared distance transform along the first axis of a 2D array
+
+    Computes ``d[q, c] = min_p((q - p) ** 2 + f[p, c])`` using the lower
+    envelope of parabolas, vectorized over all columns c.
+    """
+    n, n_cols = f.shape
+    cols = np.arange(n_cols)
+    fq2 = (f + (np.arange(n) ** 2.)[:, np.newaxis]).ravel()
+    v = np.zeros((n, n_cols), np.intp)  # parabola locations
+    z = np.empty((n + 1, n_cols))  # envelope boundaries
+    z[0] = -np.inf
+    z[1:] = np.inf
+    v, z = v.ravel(), z.ravel()
+    k = np.zeros(n_cols, np.intp)
+    for q in range(1, n):
+        fq = fq2[q * n_cols:(q + 1) * n_cols]
+        vk = v[k * n_cols + cols]
+        s = (fq - fq2[vk * n_cols + cols]) / (2. * (q - vk))
+        pop = s <= z[k * n_cols + cols]
+        while pop.any():
+            k[pop] -= 1
+            vk = v[k * n_cols + cols]
+            s_pop = (fq - fq2[vk * n_cols + cols]) / (2. * (q - vk))
+            s = np.where(pop, s_pop, s)
+            pop &= s <= z[k * n_cols + cols]
+        k += 1
+        v[k * n_cols + cols] = q
+        z[k * n_cols + cols] = s
+        z[(k + 1) * n_cols + cols] = np.inf
+    d = np.empty_like(f)
+    f = f.ravel()
+    k[:] = 0
+    for q in range(n):
+        step = z[(k + 1) * n_cols + cols] < q
+        while step.any():
+            k[step] += 1
+            step &= z[(k + 1) * n_cols + cols] < q
+        vk = v[k * n_cols + cols]
+        d[q] = (q - vk) ** 2 + f[vk * n_cols + cols]
+    return d
+
+
+def _edt(seeds):
+    """Euclidean distance of each pixel to the nearest seed pixel
+
+    Parameters
+    ----------
+    seeds : array
+        Boolean array of shape (n, h, w): a stack of n images.
+    """
+    n, h, w = seeds.shape
+    f = np.where(seeds, 0., _INF).transpose(2, 0, 1).reshape(w, n * h)
+    f = _edt_1d(f).reshape(w, n, h).transpose(2, 1, 0).reshape(h, n * w)
+    f = _edt_1d(f).reshape(h, n, w).transpose(1, 0, 2)
+    return np.sqrt(f)
+
+
+def _calc_sdf_chunk(args):
+    """Calculate the SDFs of a list of bitmaps, stacked in one array"""
+    datas, sizes = args
+    h = max(data.shape[0] for data in datas)
+    w = max(data.shape[1] for data in datas)
+    inside = np.zeros((len(datas), h, w), bool)
+    valid = np.zeros((len(datas), h, w), bool)
+    for ii, data in enumerate(datas):
+        inside[ii, :data.shape[0], :data.shape[1]] = data >= 128
+        valid[ii, :data.shape[0], :data.shape[1]] = True
+    # The padding contains no seeds, like the outside of the GPU textures
+    dist_out = _edt(inside)
+    dist_in = _edt(valid & ~inside)
+    sdfs = []
+    for ii, (data, size) in enumerate(zip(datas, sizes)):
+        # Sample at the texels the GPU renderer samples (nearest)
+        iy = ((np.arange(size[1]) + 0.5) * data.shape[0] // size[1])
+        ix = ((np.arange(size[0]) + 0.5) * data.shape[1] // size[0])
+        iy, ix = np.ix_(iy.astype(int), ix.astype(int))
+        # Same scaling as the insert shader of the GPU renderer
+        sdf = np.where(inside[ii][iy, ix],
+                       0.5 + (8. * dist_in[ii][iy, ix] - 7.) / 256.,
+                       0.5 - 8. * dist_out[ii][iy, ix] / 256.)
+        sdfs.append(np.clip(sdf, 0., 1.).astype(np.float32))
+    return sdfs
+
+
+def calc_sdfs(datas, sizes, n_jobs=1, max_pixels=2 ** 21):
+    """Calculate signed distance fields of bitmaps on the CPU
+
+    Parameters
+    ----------
+    datas : list of array
+        The bitmaps, each 2D with type np.ubyte. Pixels >= 128 are
+        inside the shape.
+    sizes : list of tuple
+        The size (w, h) of each output SDF. The SDF is sampled at the
+        nearest bitmap pixels, like the GPU renderer.
+    n_jobs : int
+        The number of processes to use.
+    max_pixels : int
+        The bitmaps are processed in chunks of about this many pixels.
+
+    Returns
+    -------
+    sdfs : list of array
+        The SDFs as float32 arrays of shape (h, w), with values between
+        0 and 1 (0.5 at the edge).
+    """
+    chunks = [[[], []]]
+    pixels = 0
+    for data, size in zip(datas, sizes):
+        if pixels + data.size > max_pixels and chunks[-1][0]:
+            chunks.append([[], []])
+            pixels = 0
+        chunks[-1][0].append(np.asarray(data))
+        chunks[-1][1].append(tuple(size))
+        pixels += data.size
+    if not chunks[-1][0]:
+        return []
+    if n_jobs > 1 and len(chunks) > 1:
+        from multiprocessing import Pool
+        pool = Pool(min(n_jobs, len(chunks)))
+        try:
+            results = pool.map(_calc_sdf_chunk, chunks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_calc_sdf_chunk(chunk) for chunk in chunks]
+    return [sdf for result in results for sdf in result]
@@ -15,12 +15,13 @@ from copy import deepcopy
 from os import path as op
 import sys
 
-from ._sdf import SDFRenderer
-from ....gloo import (TextureAtlas, set_state, IndexBuffer, VertexBuffer,
-                      set_viewport, get_parameter)
+from ._sdf import SDFRenderer, SDFRendererCPU
+from ._cache import get_glyph_cache
+from ....gloo import TextureAtlas, set_state, IndexBuffer, VertexBuffer
 from ....gloo.wrappers import _check_valid
 from ....ext.six import string_types
-from ....util.fonts import _load_glyph
+from ....util import logger
+from ....util.fonts import _load_glyphs
 from ...shaders import ModularProgram
 from ....color import Color
 from ..visual import Visual
@@ -36,9 +37,25 @@ class TextureFont(object):
         Dict with entries "face", "size", "bold", "italic".
     renderer : instance of SDFRenderer
         SDF renderer to use.
+    cache : bool
+        If True, rendered glyphs are stored in a glyph cache under
+        ``config['data_path']``, and glyphs stored there by earlier
+        sessions are loaded into the atlas at once. Off by default, so
+        nothing is written to disk unless asked for.
+
+    Notes
+    -----
+    The glyphs are stored as uint8 in the atlas (single channel for the
+    CPU renderer, RGB for the GPU renderer, which must render to it). The
+    atlas grows when it is full, and when it cannot grow any further the
+    least recently used glyphs are evicted until the new glyph fits. Both
+    change the texture coordinates of the glyphs, which is signalled by
+    incrementing ``epoch``.
     """
-    def __init__(self, font, renderer):
-        self._atlas = TextureAtlas()
+    def __init__(self, font, renderer, cache=False):
+        channels = 1 if isinstance(renderer, SDFRendererCPU) else 3
+        self._atlas = TextureAtlas(dtype=np.uint8, channels=channels,
+                                   max_shape=(4096, 4096))
         self._atlas.wrapping = 'clamp_to_edge'
         self._kernel = np.load(op.join(_data_dir, 'spatial-filters.npy'))
         self._renderer = renderer
@@ -52,6 +69,15 @@ class TextureFont(object):
         self._spread = 32
         assert self._spread % self.ratio == 0
         self._glyphs = {}
+        self._metrics = None
+        self._epoch = 0
+        self._clock = 0
+        self._last_used = {}
+        self._cache = None
+        if cache:
+            self._cache = get_glyph_cache(self._font, self._lowres_size,
+                                          self._spread)
+            self._load_cached()
 
     @property
     def ratio(self):
@@ -63,66 +89,232 @@ class TextureFont(object):
         """Extra space along each glyph edge due to SDF borders"""
         return self._spread // self.ratio
 
+    @property
+    def epoch(self):
+        """Counter that changes when texture coordinates of glyphs change"""
+        return self._epoch
+
+    def touch(self, chars):
+        """Mark characters as used, to protect them from eviction
+
+        Parameters
+        ----------
+        chars : str
+            The characters.
+        """
+        self._clock += 1
+        clock = self._clock
+        last_used = self._last_used
+        for char in chars:
+            last_used[char] = clock
+
     def __getitem__(self, char):
         if not (isinstance(char, string_types) and len(char) == 1):
             raise TypeError('index must be a 1-character string')
         if char not in self._glyphs:
-            self._load_char(char)
+            self.preload(char)
         return self._glyphs[char]
 
-    def _load_char(self, char):
-        """Build and store a glyph corresponding to an individual character
+    def preload(self, chars):
+        """Load and render a set of characters at once
+
+        This is much faster than loading the characters one by one (which
+        happens when they are first used), because the kerning table is
+        built in one pass and the glyphs are rendered in one batch.
 
-        Parameters:
-        -----------
-        char : str
-            A single character to be represented.
+        Parameters
+        ----------
+        chars : str
+            The characters to load.
         """
-        assert isinstance(char, string_types) and len(char) == 1
-        assert char not in self._glyphs
+        # Need to make sure we have a unicode string here
+        if sys.version[0] == '2' and isinstance(chars, str):
+            chars = chars.decode('utf-8')
+        self.touch(set(chars))
+        chars = [char for char in set(chars) if char not in self._glyphs]
+        if chars:
+            self._load_chars(sorted(chars))
+            self._flush_cache()
+
+    def _load_chars(self, chars):
+        """Build and store the glyphs of a list of new characters"""
         # load new glyph data from font
-        _load_glyph(self._font, char, self._glyphs)
-        # put new glyph into the texture
-        glyph = self._glyphs[char]
-        bitmap = glyph['bitmap']
-
-        # convert to padded array
-        data = np.zeros((bitmap.shape[0] + 2*self._spread,
-                         bitmap.shape[1] + 2*self._spread), np.uint8)
-        data[self._spread:-self._spread, self._spread:-self._spread] = bitmap
-
-        # Store, while scaling down to proper size
-        height = data.shape[0] // self.ratio
-        width = data.shape[1] // self.ratio
-        region = self._atlas.get_free_region(width + 2, height + 2)
+        _load_glyphs(self._font, chars, self._glyphs)
+        glyphs = [self._glyphs[char] for char in chars]
+        # pack the highest glyphs first
+        glyphs.sort(key=lambda glyph: -glyph['bitmap'].shape[0])
+        datas, offsets, sizes = [], [], []
+        atlas_shape = self._atlas.shape
+        for glyph in glyphs:
+            bitmap = glyph['bitmap']
+
+            # convert to padded array
+            data = np.zeros((bitmap.shape[0] + 2*self._spread,
+                             bitmap.shape[1] + 2*self._spread), np.uint8)
+            data[self._spread:-self._spread,
+                 self._spread:-self._spread] = bitmap
+
+            # Store, while scaling down to proper size
+            height = data.shape[0] // self.ratio
+            width = data.shape[1] // self.ratio
+            x, y, w, h = self._get_region(width + 2, height + 2)
+            x, y, w, h = x + 1, y + 1, w - 2, h - 2
+            datas.append(data)
+            offsets.append((x, y))
+            sizes.append((w, h))
+            self._set_region(glyph, x, y, w, h)
+
+        if self._atlas.shape != atlas_shape:
+            # The atlas grew: update the texture coordinates of all glyphs
+            for glyph in self._glyphs.values():
+                if 'region' in glyph:
+                    self._set_region(glyph, *glyph['region'])
+            self._epoch += 1
+
+        read = self._cache is not None
+        sdfs = self._renderer.render_many(datas, self._atlas, offsets, sizes,
+                                          read=read)
+        if read:
+            for glyph, sdf in zip(glyphs, sdfs):
+                self._cache.add(glyph, sdf)
+
+    def _get_region(self, width, height):
+        """Allocate a region in the atlas, evicting glyphs until it fits"""
+        region = self._atlas.get_free_region(width, height)
+        while region is None and self._evict():
+            region = self._atlas.get_free_region(width, height)
         if region is None:
             raise RuntimeError('Cannot store glyph')
-        x, y, w, h = region
-        x, y, w, h = x + 1, y + 1, w - 2, h - 2
+        return region
 
-        self._renderer.render_to_texture(data, self._atlas, (x, y), (w, h))
+    def _evict(self):
+        """Remove the least recently used half of the glyphs that are not
+        used by the current operation from the atlas. Returns False if no
+        glyph could be evicted.
+        """
+        unused = [char for char, glyph in self._glyphs.items()
+                  if 'region' in glyph and
+                  self._last_used.get(char, 0) < self._clock]
+        if not unused:
+            return False
+        unused.sort(key=lambda char: self._last_used.get(char, 0))
+        for char in unused[:max(len(unused) // 2, 1)]:
+            x, y, w, h = self._glyphs.pop(char)['region']
+            self._last_used.pop(char, None)
+            self._atlas.free_region((x - 1, y - 1, w + 2, h + 2))
+        logger.debug('Evicted %d glyphs from the font atlas'
+                     % max(len(unused) // 2, 1))
+        self._epoch += 1
+        return True
+
+    def _set_region(self, glyph, x, y, w, h):
+        """Set the size and texture coordinates of a glyph"""
         u0 = x / float(self._atlas.shape[1])
         v0 = y / float(self._atlas.shape[0])
         u1 = (x+w) / float(self._atlas.shape[1])
         v1 = (y+h) / float(self._atlas.shape[0])
         texcoords = (u0, v0, u1, v1)
-        glyph.update(dict(size=(w, h), texcoords=texcoords))
+        glyph.update(dict(size=(w, h), texcoords=texcoords,
+                          region=(x, y, w, h)))
+
+    def _load_cached(self):
+        """Put all glyphs of the glyph cache into the atlas
+
+        The glyphs are drawn into a single array, which replaces the
+        initial (empty) data of the atlas, so it is uploaded in one go.
+        """
+        if self._cache is None or not self._cache.chars:
+            return
+        regions = []
+        for char in self._cache.chars:
+            h, w = self._cache.bitmap(char).shape
+            region = self._atlas.get_free_region(w + 2, h + 2)
+            if region is None:
+                break
+            regions.append((char, region[0] + 1, region[1] + 1, w, h))
+        # The atlas may have grown, so only now create the data
+        data = np.zeros(self._atlas.shape, self._atlas.dtype)
+        for char, x, y, w, h in regions:
+            data[y:y+h, x:x+w] = self._cache.bitmap(char)[:, :, np.newaxis]
+            glyph = self._cache.glyph(char)
+            self._set_region(glyph, x, y, w, h)
+            self._glyphs[char] = glyph
+        self._atlas.set_data(data)
+
+    def _flush_cache(self):
+        """Write new glyphs and kerning to the glyph cache"""
+        if self._cache is not None:
+            self._cache.flush(self._glyphs)
+
+    def _get_metrics(self):
+        """Get arrays with the metrics of all loaded glyphs
+
+        Returns
+        -------
+        metrics : dict
+            "lookup" maps a codepoint to a row in the arrays "advance",
+            "offset" (N, 2), "size" (N, 2) and "texcoords" (N, 4).
+            "kern_keys" holds the sorted keys ``left * 0x110000 + right``
+            of all kerned codepoint pairs and "kern_values" their kerning.
+        """
+        if (self._metrics is not None and
+                self._metrics['n_glyphs'] == len(self._glyphs) and
+                self._metrics['epoch'] == self._epoch):
+            return self._metrics
+        glyphs = list(self._glyphs.values())
+        codes = np.array([ord(glyph['char']) for glyph in glyphs], np.int64)
+        lookup = np.zeros(codes.max() + 1 if len(codes) else 1, np.intp)
+        lookup[codes] = np.arange(len(glyphs))
+        keys, values = [], []
+        for glyph in glyphs:
+            for left, kerning in glyph['kerning'].items():
+                if kerning != 0:
+                    keys.append(ord(left) * 0x110000 + ord(glyph['char']))
+                    values.append(kerning)
+        order = np.argsort(np.array(keys, np.int64))
+        self._metrics = dict(
+            n_glyphs=len(glyphs), epoch=self._epoch, lookup=lookup,
+            advance=np.array([g['advance'] for g in glyphs], np.float64),
+            offset=np.array([g['offset'] for g in glyphs],
+                            np.float64).reshape(-1, 2),
+            size=np.array([g['size'] for g in glyphs],
+                          np.float64).reshape(-1, 2),
+            texcoords=np.array([g['texcoords'] for g in glyphs],
+                               np.float64).reshape(-1, 4),
+            kern_keys=np.array(keys, np.int64)[order],
+            kern_values=np.array(values, np.float64)[order])
+        return self._metrics
 
 
 class FontManager(object):
-    """Helper to create TextureFont instances and reuse them when possible"""
+    """Helper to create TextureFont instances and reuse them when possible
+
+    Parameters
+    ----------
+    cache : bool
+        Whether the fonts use the on-disk glyph cache (see TextureFont).
+        Defaults to False.
+    method : str
+        The SDF rendering method: 'gpu' (jump flooding, needs a GL
+        context) or 'cpu' (exact distance transform in numpy).
+    """
     # todo: store a font-manager on each context,
     # or let TextureFont use a TextureAtlas for each context
-    def __init__(self):
+    def __init__(self, cache=False, method='gpu'):
+        _check_valid('method', method, ('gpu', 'cpu'))
         self._fonts = {}
-        self._renderer = SDFRenderer()
+        if method == 'gpu':
+            self._renderer = SDFRenderer()
+        else:
+            self._renderer = SDFRendererCPU()
+        self._cache = cache
 
     def get_font(self, face, bold=False, italic=False):
         """Get a font described by face and size"""
         key = '%s-%s-%s' % (face, bold, italic)
         if key not in self._fonts:
             font = dict(face=face, bold=bold, italic=italic)
-            self._fonts[key] = TextureFont(font, self._renderer)
+            self._fonts[key] = TextureFont(font, self._renderer, self._cache)
         return self._fonts[key]
 
 
@@ -130,56 +322,103 @@ class FontManager(object):
 # The visual
 
 
-def _text_to_vbo(text, font, anchor_x, anchor_y, lowres_size):
-    """Convert text characters to VBO"""
+def _text_to_vbo(texts, font, anchor_x, anchor_y, lowres_size):
+    """Lay out the glyphs of one or more text labels
+
+    Parameters
+    ----------
+    texts : list of str
+        The labels.
+    font : instance of TextureFont
+        The font to use.
+    anchor_x : str
+        Horizontal text anchor.
+    anchor_y : str
+        Vertical text anchor.
+    lowres_size : int
+        The point size of the glyphs in the font atlas.
+
+    Returns
+    -------
+    vertices : array
+        Structured array with four vertices per glyph, with fields
+        "a_position" (relative to the label anchor) and "a_texcoord".
+    labels : array
+        The index of the label of each glyph.
+    """
     text_vtype = np.dtype([('a_position', 'f4', 2),
                            ('a_texcoord', 'f4', 2)])
-    vertices = np.zeros(len(text) * 4, dtype=text_vtype)
-    prev = None
-    width = height = ascender = descender = 0
     ratio, slop = 1. / font.ratio, font.slop
-    x_off = -slop
-    # Need to make sure we have a unicode string here (Py2.7 mis-interprets
+    # Need to make sure we have unicode strings here (Py2.7 mis-interprets
     # characters like "•" otherwise)
-    if sys.version[0] == '2' and isinstance(text, str):
-        text = text.decode('utf-8')
-    # Need to store the original viewport, because the font[char] will
-    # trigger SDF rendering, which changes our viewport
-    orig_viewport = get_parameter('viewport')
-    for ii, char in enumerate(text):
-        glyph = font[char]
-        kerning = glyph['kerning'].get(prev, 0.) * ratio
-        x0 = x_off + glyph['offset'][0] * ratio + kerning
-        y0 = glyph['offset'][1] * ratio + slop
-        x1 = x0 + glyph['size'][0]
-        y1 = y0 - glyph['size'][1]
-        u0, v0, u1, v1 = glyph['texcoords']
-        position = [[x0, y0], [x0, y1], [x1, y1], [x1, y0]]
-        texcoords = [[u0, v0], [u0, v1], [u1, v1], [u1, v0]]
-        vi = ii * 4
-        vertices['a_position'][vi:vi+4] = position
-        vertices['a_texcoord'][vi:vi+4] = texcoords
-        x_move = glyph['advance'] * ratio + kerning
-        x_off += x_move
-        ascender = max(ascender, y0 - slop)
-        descender = min(descender, y1 + slop)
-        width += x_move
-        height = max(height, glyph['size'][1] - 2*slop)
-        prev = char
+    if sys.version[0] == '2':
+        texts = [text.decode('utf-8') if isinstance(text, str) else text
+                 for text in texts]
+    all_text = u''.join(texts)
+    font.preload(all_text + 'hy')
+    metrics = font._get_metrics()
+
+    lengths = np.array([len(text) for text in texts], np.intp)
+    labels = np.repeat(np.arange(len(texts)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    codes = np.frombuffer(all_text.encode('utf-32-le'), '<u4')
+    codes = codes.astype(np.int64)
+    rows = metrics['lookup'][codes]
+
+    # Kerning with the previous character in the same label
+    kerning = np.zeros(len(codes))
+    if len(metrics['kern_keys']) and len(codes) > 1:
+        keys = codes[:-1] * 0x110000 + codes[1:]
+        idx = np.searchsorted(metrics['kern_keys'], keys)
+        idx = np.minimum(idx, len(metrics['kern_keys']) - 1)
+        found = metrics['kern_keys'][idx] == keys
+        kerning[1:] = np.where(found, metrics['kern_values'][idx], 0.)
+        kerning[starts[lengths > 0]] = 0.
+    kerning *= ratio
+
+    # Pen position: cumulative advance within each label
+    x_move = metrics['advance'][rows] * ratio + kerning
+    cum_move = np.cumsum(x_move) - x_move
+    x_off = -slop + cum_move - np.repeat(cum_move[starts[lengths > 0]],
+                                         lengths[lengths > 0])
+    size = metrics['size'][rows]
+    x0 = x_off + metrics['offset'][rows, 0] * ratio + kerning
+    y0 = metrics['offset'][rows, 1] * ratio + slop
+    x1 = x0 + size[:, 0]
+    y1 = y0 - size[:, 1]
+    u0, v0, u1, v1 = metrics['texcoords'][rows].T
+
+    vertices = np.zeros(len(codes) * 4, dtype=text_vtype)
+    position = vertices['a_position'].reshape(-1, 4, 2)
+    texcoord = vertices['a_texcoord'].reshape(-1, 4, 2)
+    position[:, :, 0] = np.column_stack([x0, x0, x1, x1])
+    position[:, :, 1] = np.column_stack([y0, y1, y1, y0])
+    texcoord[:, :, 0] = np.column_stack([u0, u0, u1, u1])
+    texcoord[:, :, 1] = np.column_stack([v0, v1, v1, v0])
+
     # Also analyse chars with large ascender and descender, otherwise the
     # vertical alignment can be very inconsistent
-    for char in 'hy':
-        glyph = font[char]
-        y0 = glyph['offset'][1] * ratio + slop
-        y1 = y0 - glyph['size'][1]
-        ascender = max(ascender, y0 - slop)
-        descender = min(descender, y1 + slop)
-        height = max(height, glyph['size'][1] - 2*slop)
-    set_viewport(*orig_viewport)
-
-    # Tight bounding box (loose would be width, font.height /.asc / .desc)
-    width -= glyph['advance'] * ratio - (glyph['size'][0] - 2*slop)
-    dx = dy = 0
+    hy = metrics['lookup'][[ord('h'), ord('y')]]
+    hy_y0 = metrics['offset'][hy, 1] * ratio + slop
+    hy_y1 = hy_y0 - metrics['size'][hy, 1]
+    ascender = np.zeros(len(texts))
+    descender = np.zeros(len(texts))
+    height = np.zeros(len(texts))
+    width = np.zeros(len(texts))
+    np.maximum.at(ascender, labels, y0 - slop)
+    np.minimum.at(descender, labels, y1 + slop)
+    np.maximum.at(height, labels, size[:, 1] - 2*slop)
+    np.add.at(width, labels, x_move)
+    ascender = np.maximum(ascender, (hy_y0 - slop).max())
+    descender = np.minimum(descender, (hy_y1 + slop).min())
+    height = np.maximum(height, (metrics['size'][hy, 1] - 2*slop).max())
+
+    # Tight bounding box (loose would be width, font.height /.asc / .desc),
+    # corrected with the metrics of the last analysed glyph ('y')
+    width -= (metrics['advance'][hy[1]] * ratio -
+              (metrics['size'][hy[1], 0] - 2*slop))
+    dx = np.zeros(len(texts))
+    dy = np.zeros(len(texts))
     if anchor_y == 'top':
         dy = -ascender
     elif anchor_y in ('center', 'middle'):
@@ -193,9 +432,9 @@ def _text_to_vbo(text, font, anchor_x, anchor_y, lowres_size):
         dx = -width
     elif anchor_x == 'center':
         dx = -width / 2.
-    vertices['a_position'] += (dx, dy)
-    vertices['a_position'] /= lowres_size
-    return VertexBuffer(vertices)
+    position += np.column_stack([dx, dy])[labels][:, np.newaxis]
+    position /= lowres_size
+    return vertices, labels
 
 
 class Text(Visual):
@@ -203,8 +442,9 @@ class Text(Visual):
 
     Parameters
     ----------
-    text : str
-        Text to display.
+    text : str | list of str
+        Text to display. Can also be a list of strings, to display many
+        labels (e.g. tick labels) with a single visual.
     color : instance of Color
         Color to use.
     bold : bool
@@ -215,8 +455,9 @@ class Text(Visual):
         Font face to use.
     font_size : float
         Point size to use.
-    pos : tuple
-        Position (x, y) of the text.
+    pos : tuple | array
+        Position (x, y) of the text. If text is a list, this can also be
+        an array of shape (N, 2), one position for each label.
     rotation : float
         Rotation (in degrees) of the text clockwise.
     anchor_x : str
@@ -228,16 +469,16 @@ class Text(Visual):
     """
 
     VERTEX_SHADER = """
-        uniform vec2 u_pos;  // anchor position
         uniform vec2 u_scale;  // to scale to pixel units
         uniform float u_rotation;  // rotation in rad
+        attribute vec2 a_pos;  // anchor position
         attribute vec2 a_position; // in point units
         attribute vec2 a_texcoord;
 
         varying vec2 v_texcoord;
 
         void main(void) {
-            vec4 pos = $transform(vec4(u_pos, 0.0, 1.0));
+            vec4 pos = $transform(vec4(a_pos, 0.0, 1.0));
             mat2 rot = mat2(cos(u_rotation), -sin(u_rotation),
                             sin(u_rotation), cos(u_rotation));
             gl_Position = pos + vec4(rot * a_position * u_scale, 0., 0.);
@@ -377,6 +618,9 @@ class Text(Visual):
         self._program = ModularProgram(self.VERTEX_SHADER,
                                        self.FRAGMENT_SHADER)
         self._vertices = None
+        self._labels = None
+        self._epoch = None
+        self._chars = set()
         self._anchors = (anchor_x, anchor_y)
         # Init text properties
         self.color = color
@@ -387,12 +631,17 @@ class Text(Visual):
 
     @property
     def text(self):
-        """The text string"""
+        """The text string, or list of strings"""
         return self._text
 
     @text.setter
     def text(self, text):
-        assert isinstance(text, string_types)
+        if isinstance(text, string_types):
+            self._texts = [text]
+        else:
+            text = list(text)
+            assert all(isinstance(t, string_types) for t in text)
+            self._texts = text
         self._text = text
         self._vertices = None
 
@@ -429,29 +678,64 @@ class Text(Visual):
     @property
     def pos(self):
         """ The position of the text anchor in the local coordinate frame
+
+        For a list of labels, this is an array with the position of each
+        label (or a single position shared by all labels).
         """
         return self._pos
 
     @pos.setter
     def pos(self, pos):
-        pos = [float(p) for p in pos]
-        assert len(pos) == 2
-        self._pos = tuple(pos)
+        pos = np.array(pos, np.float32)
+        if pos.ndim == 1:
+            assert len(pos) == 2
+            self._pos = tuple(float(p) for p in pos)
+        else:
+            assert pos.ndim == 2 and pos.shape[1] == 2
+            self._pos = pos
+        self._pos_changed = True
+
+    def _update_positions(self):
+        """Set the anchor position of each vertex"""
+        pos = np.array(self._pos, np.float32).reshape(-1, 2)
+        if len(pos) == 1:
+            self._vertex_data['a_pos'] = pos[0]
+        elif len(pos) == len(self._texts):
+            self._vertex_data['a_pos'] = pos[self._labels].repeat(4, axis=0)
+        else:
+            raise ValueError('Number of positions (%d) does not match the '
+                             'number of labels (%d)'
+                             % (len(pos), len(self._texts)))
+        self._pos_changed = False
 
     def draw(self, event=None):
         # attributes / uniforms are not available until program is built
-        if len(self.text) == 0:
+        if sum(len(text) for text in self._texts) == 0:
             return
+        if self._vertices is not None and self._epoch != self._font.epoch:
+            self._vertices = None  # texture coordinates have changed
         if self._vertices is None:
             # we delay creating vertices because it requires a context,
             # which may or may not exist when the object is initialized
-            self._vertices = _text_to_vbo(self._text, self._font,
-                                          self._anchors[0], self._anchors[1],
-                                          self._font._lowres_size)
+            vertices, self._labels = _text_to_vbo(
+                self._texts, self._font, self._anchors[0], self._anchors[1],
+                self._font._lowres_size)
+            vtype = vertices.dtype.descr + [('a_pos', 'f4', 2)]
+            self._vertex_data = np.zeros(len(vertices), vtype)
+            self._vertex_data['a_position'] = vertices['a_position']
+            self._vertex_data['a_texcoord'] = vertices['a_texcoord']
+            self._update_positions()
+            self._vertices = VertexBuffer(self._vertex_data)
             idx = (np.array([0, 1, 2, 0, 2, 3], np.uint32) +
-                   np.arange(0, 4*len(self._text), 4,
+                   np.arange(0, len(vertices), 4,
                              dtype=np.uint32)[:, np.newaxis])
             self._ib = IndexBuffer(idx.ravel())
+            self._epoch = self._font.epoch
+            self._chars = set(''.join(self._texts))
+        elif self._pos_changed:
+            self._update_positions()
+            self._vertices.set_data(self._vertex_data)
+        self._font.touch(self._chars)
 
         if event is not None:
             xform = event.render_transform.shader_map()
@@ -470,7 +754,6 @@ class Text(Visual):
         self._program['u_kernel'] = self._font._kernel
         self._program['u_scale'] = ps * px_scale[0], ps * px_scale[1]
         self._program['u_rotation'] = self._rotation
-        self._program['u_pos'] = self._pos
         self._program['u_color'] = self._color.rgba
         self._program['u_font_atlas'] = self._font._atlas
         self._program.bind(self._vertices)
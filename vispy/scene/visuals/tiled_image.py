@@ -0,0 +1,474 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Vispy Development Team.
+# Distributed under the (new) BSD License. See LICENSE.txt for more info.
+"""
+Tiled multi-resolution display of images that are too large for a single
+texture.
+"""
+
+from __future__ import division
+
+import threading
+
+import numpy as np
+
+from ... import gloo
+from ...app import Timer
+from ...ext.ordereddict import OrderedDict
+from ...util import logger
+from ..shaders import ModularProgram
+from .visual import Visual
+
+
+VERT = """
+attribute vec2 a_position;
+uniform vec4 u_rect;
+uniform vec2 u_tex_scale;
+varying vec2 v_texcoord;
+
+void main() {
+    // a_position is a unit quad, scaled to the area of the tile
+    v_texcoord = a_position * u_tex_scale;
+    gl_Position = $transform(vec4(u_rect.xy + a_position * u_rect.zw, 0, 1));
+}
+"""
+
+FRAG = """
+uniform sampler2D u_texture;
+varying vec2 v_texcoord;
+
+void main() {
+    gl_FragColor = texture2D(u_texture, v_texcoord);
+}
+"""
+
+
+class ImagePyramid(object):
+    """ Tiles of a large image at multiple resolutions.
+
+    Level 0 is the image itself. Each next level has half the width and
+    height of the previous one, with each pixel the mean of 2x2 pixels of
+    the previous level, until the image fits in a single tile. Tiles of
+    levels that are not given are computed from the previous level when
+    they are first requested, and a limited number of them is kept in
+    memory.
+
+    Computing a tile of level n reads 4 ** n tiles of level 0 (or of the
+    last given level), so the top level tile reads the whole image. This is
+    fine for images that fit in memory, but for gigapixel images the
+    levels should be precomputed (e.g. memory-mapped from disk) and given
+    as *levels*; otherwise, the tiles evicted from the cache are computed
+    from the data again and again when zooming out.
+
+    Parameters
+    ----------
+    data : array
+        The (height, width) or (height, width, channels) image. This can be
+        a memory-mapped array, of which only the requested tiles are read.
+    tile_size : int
+        The width and height of the tiles.
+    levels : list of arrays | None
+        Precomputed levels 1, 2, ..., for instance memory-mapped from disk.
+        Levels that are not given are computed. Needed for images that are
+        too large to read at once.
+    cache_size : int
+        The number of computed tiles to keep in memory.
+    """
+
+    def __init__(self, data, tile_size=256, levels=None, cache_size=1024):
+        self.tile_size = int(tile_size)
+        self.dtype = data.dtype
+        shape = data.shape[:2]
+        self.shapes = [shape]
+        while max(shape) > self.tile_size:
+            shape = ((shape[0] + 1) // 2, (shape[1] + 1) // 2)
+            self.shapes.append(shape)
+        self._levels = [data] + list(levels or [])[:len(self.shapes) - 1]
+        for level, array in enumerate(self._levels):
+            if array.shape[:2] != self.shapes[level]:
+                raise ValueError('Level %d must have shape %s, not %s'
+                                 % (level, self.shapes[level],
+                                    array.shape[:2]))
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    @property
+    def n_levels(self):
+        """ The number of levels, including level 0.
+        """
+        return len(self.shapes)
+
+    def n_tiles(self, level):
+        """ The number of (rows, columns) of tiles of *level*.
+        """
+        h, w = self.shapes[level]
+        t = self.tile_size
+        return -(-h // t), -(-w // t)
+
+    def choose_level(self, density):
+        """ Get the level that shows about one pixel per screen pixel when
+        *density* pixels of level 0 are shown per screen pixel.
+        """
+        if not density > 1:
+            return 0
+        return min(int(np.floor(np.log2(density))), self.n_levels - 1)
+
+    def tile(self, level, row, col):
+        """ Get the tile at *row*, *col* of *level*, as an array of at most
+        (tile_size, tile_size) pixels.
+        """
+        if level < len(self._levels):
+            t = self.tile_size
+            return np.ascontiguousarray(
+                self._levels[level][row * t:(row + 1) * t,
+                                    col * t:(col + 1) * t])
+        key = (level, row, col)
+        with self._lock:
+            tile = self._cache.pop(key, None)
+            if tile is not None:
+                self._cache[key] = tile  # most recently used
+                return tile
+        # Combine the 2x2 tiles of the previous level
+        rows, cols = self.n_tiles(level - 1)
+        block = np.concatenate([
+            np.concatenate([self.tile(level - 1, r, c)
+                            for c in range(2 * col, min(2 * col + 2, cols))],
+                           axis=1)
+            for r in range(2 * row, min(2 * row + 2, rows))], axis=0)
+        tile = _downsample(block)
+        with self._lock:
+            self._cache[key] = tile
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return tile
+
+
+def _downsample(block):
+    """ Halve the width and height of an image, using the mean of 2x2
+    pixels. The last row and column are repeated if the size is odd.
+    """
+    pad = [(0, block.shape[0] % 2), (0, block.shape[1] % 2)]
+    if any(p[1] for p in pad):
+        block = np.pad(block, pad + [(0, 0)] * (block.ndim - 2), mode='edge')
+    out = block[0::2, 0::2].astype(np.float32)
+    out += block[1::2, 0::2]
+    out += block[0::2, 1::2]
+    out += block[1::2, 1::2]
+    out *= 0.25
+    if block.dtype.kind in 'ui':
+        np.round(out, out=out)
+    return out.astype(block.dtype)
+
+
+class _TileLoader(object):
+    """ Reads tiles of an ImagePyramid in a background thread.
+
+    ``request()`` sets the tiles to read, replacing the tiles that were
+    requested before and are not read yet. ``loaded()`` returns the tiles
+    that were read. The thread exits when no tiles were requested for
+    *idle_timeout* seconds, or when ``stop()`` is called, and is started
+    again by the next request.
+    """
+
+    def __init__(self, pyramid, idle_timeout=5.):
+        self.pyramid = pyramid
+        self._todo = []
+        self._loading = None
+        self._done = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._idle_timeout = idle_timeout
+
+    @property
+    def busy(self):
+        """ Whether tiles are being read or have not been returned yet.
+        """
+        with self._cond:
+            todo = [key for key in self._todo if key is not None]
+            return bool(todo or self._done or self._loading is not None)
+
+    @property
+    def ready(self):
+        """ Whether tiles were read that have not been returned yet.
+        """
+        with self._cond:
+            return bool(self._done)
+
+    def request(self, keys):
+        """ Read the tiles (level, row, col) in *keys*, in that order.
+        """
+        with self._cond:
+            self._todo = [key for key in keys if key != self._loading]
+            self._cond.notify()
+            if self._todo and self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name='TileLoader')
+                self._thread.daemon = True
+                self._thread.start()
+
+    def stop(self):
+        """ Drop the tiles that are not read yet and let the thread exit
+        once the current tile is read.
+        """
+        with self._cond:
+            if self._thread is not None:
+                self._todo = [None]  # sentinel
+                self._cond.notify()
+            else:
+                self._todo = []
+
+    def loaded(self):
+        """ Get a list of the (key, data) of the tiles that were read since
+        the last call. The data is None if the tile could not be read.
+        """
+        with self._cond:
+            done, self._done = self._done, []
+        return done
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._todo:
+                    self._cond.wait(self._idle_timeout)
+                if not self._todo or self._todo[0] is None:
+                    self._todo = []
+                    self._thread = None
+                    return
+                key = self._loading = self._todo.pop(0)
+            try:
+                data = self.pyramid.tile(*key)
+            except Exception as err:
+                logger.warning('Could not read image tile %s: %s'
+                               % (key, err))
+                data = None
+            with self._cond:
+                self._done.append((key, data))
+                self._loading = None
+
+
+def _visible_rect(event):
+    """ Get the rectangle (x0, y0, x1, y1) of the current viewport in the
+    coordinate system of the current entity, and the number of units of
+    that coordinate system per pixel.
+    """
+    ndc = np.array([[-1, -1, 0, 1], [1, -1, 0, 1],
+                    [1, 1, 0, 1], [-1, 1, 0, 1]], dtype=np.float64)
+    corners = np.asarray(event.render_transform.imap(ndc), dtype=np.float64)
+    corners = corners[:, :3] / corners[:, 3:4]
+    px = np.asarray(event.framebuffer_transform().map(corners))
+    px = px[:, :2] / px[:, 3:4]
+    # units per pixel along the x and y axes of the viewport
+    density = min(np.hypot(*(corners[1, :2] - corners[0, :2])) /
+                  np.hypot(*(px[1] - px[0])),
+                  np.hypot(*(corners[3, :2] - corners[0, :2])) /
+                  np.hypot(*(px[3] - px[0])))
+    x0, y0 = corners[:, :2].min(axis=0)
+    x1, y1 = corners[:, :2].max(axis=0)
+    return (x0, y0, x1, y1), density
+
+
+class TiledImage(Visual):
+    """ Visual that displays an image that is too large for a single
+    texture, such as a gigapixel image in a memory-mapped file.
+
+    The image is split in tiles at multiple resolutions (see ImagePyramid).
+    Only the tiles that are visible are drawn, at the resolution that
+    matches the pixel density of the viewport. Tiles are read from the data
+    in a background thread, so drawing never waits for them; until a tile is
+    read, the part of the image it covers is drawn from lower resolution
+    tiles. A limited number of tiles is kept on the GPU.
+
+    The image covers x from 0 to its width and y from 0 to its height, like
+    the Image visual.
+
+    Parameters
+    ----------
+    data : array
+        The (height, width) or (height, width, channels) image. Can be any
+        object with a numpy-like ``shape``, ``dtype`` and slicing, such as a
+        memory-mapped array. Float data should be between 0 and 1.
+    tile_size : int
+        The width and height of the tiles, in pixels.
+    levels : list of arrays | None
+        Precomputed lower resolution levels, each with half the width and
+        height of the previous one. Levels that are not given are computed
+        from the previous level, which reads the whole image to show it
+        zoomed out; for images that do not fit in memory the levels
+        should be given.
+    cache_size : int
+        The number of tile textures to keep on the GPU. This should be more
+        than the number of tiles that fit on the screen.
+    interpolation : str
+        'nearest' or 'linear'.
+
+    Notes
+    -----
+    The background thread stops when the visual is removed from the scene
+    and after a few seconds without new tiles to read. Call ``close()`` to
+    also free the textures.
+    """
+
+    def __init__(self, data, tile_size=256, levels=None, cache_size=256,
+                 interpolation='nearest', **kwds):
+        super(TiledImage, self).__init__(**kwds)
+        self._pyramid = ImagePyramid(data, tile_size, levels)
+        self._loader = _TileLoader(self._pyramid)
+        self._timer = None
+        # (level, row, col) -> Texture2D, least recently used first
+        self._textures = OrderedDict()
+        self._failed = set()
+        self._cache_size = cache_size
+        self._interpolation = interpolation
+        self._program = ModularProgram(VERT, FRAG)
+        self._vbo = None
+        self.events.parents_change.connect(self._parents_changed)
+
+    @property
+    def pyramid(self):
+        """ The ImagePyramid of the image.
+        """
+        return self._pyramid
+
+    @property
+    def size(self):
+        return self._pyramid.shapes[0][::-1]
+
+    @property
+    def interpolation(self):
+        return self._interpolation
+
+    @interpolation.setter
+    def interpolation(self, interp):
+        self._interpolation = interp
+        for texture in self._textures.values():
+            texture.interpolation = interp
+        self.update()
+
+    def close(self):
+        """ Stop reading tiles and delete the textures. This should be
+        called while the GL context of the canvas is current.
+        """
+        self._loader.stop()
+        if self._timer is not None:
+            self._timer.stop()
+        for texture in self._textures.values():
+            texture.delete()
+        self._textures.clear()
+        if self._vbo is not None:
+            self._vbo.delete()
+            self._vbo = None
+
+    def _parents_changed(self, event):
+        # Tiles are only read while the visual is in a scene
+        if not self.parents:
+            self._loader.stop()
+            if self._timer is not None:
+                self._timer.stop()
+
+    def bounds(self, mode, axis):
+        if axis > 1:
+            return (0, 0)
+        else:
+            return (0, self.size[axis])
+
+    def visible_tiles(self, rect, level):
+        """ Get the keys (level, row, col) of the tiles of *level* that
+        intersect *rect* (x0, y0, x1, y1), closest to its center first.
+        """
+        s = self._pyramid.tile_size * 2 ** level
+        rows, cols = self._pyramid.n_tiles(level)
+        x0, y0, x1, y1 = rect
+        c0, c1 = max(int(x0 // s), 0), min(int(np.ceil(x1 / s)), cols)
+        r0, r1 = max(int(y0 // s), 0), min(int(np.ceil(y1 / s)), rows)
+        cx, cy = (x0 + x1) / (2 * s) - 0.5, (y0 + y1) / (2 * s) - 0.5
+        keys = [(level, r, c) for r in range(r0, r1) for c in range(c0, c1)]
+        keys.sort(key=lambda k: (k[1] - cy) ** 2 + (k[2] - cx) ** 2)
+        return keys
+
+    def _add_tile(self, key, data):
+        """ Upload a tile to a texture, reusing the least recently used
+        texture if the cache is full.
+        """
+        t = self._pyramid.tile_size
+        if data.dtype not in (np.uint8, np.uint16, np.float32):
+            data = data.astype(np.float32)
+        if data.shape[:2] != (t, t):
+            # pad edge tiles, so that all textures have the same shape
+            padded = np.zeros((t, t) + data.shape[2:], data.dtype)
+            padded[:data.shape[0], :data.shape[1]] = data
+            data = padded
+        texture = None
+        if len(self._textures) >= self._cache_size:
+            _, texture = self._textures.popitem(last=False)
+            if texture.dtype != data.dtype:
+                texture = None
+        if texture is None:
+            texture = gloo.Texture2D(data)
+            texture.interpolation = self._interpolation
+        else:
+            texture.set_data(data)
+        self._textures[key] = texture
+
+    def _check_loaded(self, event):
+        # Called by the timer; draw again when tiles were read
+        if self._loader.ready:
+            self.update()
+        elif not self._loader.busy:
+            self._timer.stop()
+
+    def draw(self, event):
+        pyramid = self._pyramid
+        for key, data in self._loader.loaded():
+            if data is None:
+                self._failed.add(key)
+            else:
+                self._add_tile(key, data)
+
+        try:
+            rect, density = _visible_rect(event)
+        except Exception:
+            # Cannot invert the transform, draw the whole image
+            h, w = pyramid.shapes[0]
+            rect, density = (0, 0, w, h), np.inf
+        level = pyramid.choose_level(density)
+        keys = self.visible_tiles(rect, level)
+        top = self.visible_tiles(rect, pyramid.n_levels - 1)
+        missing = [k for k in top + keys
+                   if k not in self._textures and k not in self._failed]
+        self._loader.request(missing)
+        if self._loader.busy:
+            if self._timer is None:
+                self._timer = Timer(0.02, connect=self._check_loaded)
+            if not self._timer.running:
+                self._timer.start()
+
+        # Draw the tiles from low to high resolution; lower resolution
+        # tiles are only needed where higher resolution ones are missing
+        if missing:
+            keys = [k for lev in range(pyramid.n_levels - 1, level, -1)
+                    for k in self.visible_tiles(rect, lev)] + keys
+        keys = [k for k in keys if k in self._textures]
+        if not keys:
+            return
+        if self._vbo is None:
+            quad = np.array([[0, 0], [1, 0], [1, 1], [0, 0], [1, 1], [0, 1]],
+                            dtype=np.float32)
+            self._vbo = gloo.VertexBuffer(quad)
+        gloo.set_state('translucent', depth_test=False)
+        self._program.vert['transform'] = event.render_transform.shader_map()
+        self._program.prepare()
+        self._program['a_position'] = self._vbo
+        h, w = pyramid.shapes[0]
+        t = pyramid.tile_size
+        for key in keys:
+            texture = self._textures.pop(key)
+            self._textures[key] = texture  # most recently used
+            lev, row, col = key
+            s = t * 2 ** lev
+            x0, y0 = col * s, row * s
+            x1, y1 = min(x0 + s, w), min(y0 + s, h)
+            self._program['u_rect'] = (x0, y0, x1 - x0, y1 - y0)
+            self._program['u_tex_scale'] = ((x1 - x0) / s, (y1 - y0) / s)
+            self._program['u_texture'] = texture
+            self._program.draw('triangles')
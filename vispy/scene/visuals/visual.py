@@ -6,6 +6,8 @@ from __future__ import division
 
 from ...util import event
 from ..entity import Entity
+from ..transforms import NullTransform
+from ..transforms._util import as_vec4
 
 """
 API Issues to work out:
@@ -37,6 +39,10 @@ class Visual(Entity):
         # Add event for bounds changing
         self.events.add(bounds_change=event.Event)
 
+        # Cached result of batch_data()
+        self._batch_data = None
+        self.events.transform_change.connect(self._invalidate_batch_data)
+
     def _update(self):
         """
         This method is called internally whenever the Visual needs to be 
@@ -79,3 +85,55 @@ class Visual(Entity):
         display list.
         """
         return None
+
+    def batch_key(self):
+        """
+        Return a hashable key that identifies the program and GL state
+        used to draw this visual, or None if this visual cannot be drawn
+        in a batch (the default).
+
+        Sibling visuals that return the same key are drawn together by
+        the DrawingSystem: their vertex data is concatenated
+        (see ``batch_data()``) and ``draw_batch()`` of the first visual is
+        called once for the whole group.
+        """
+        return None
+
+    def batch_data(self):
+        """
+        Return the vertex data of this visual for batched drawing.
+
+        This is a dict mapping attribute names to arrays with one row per
+        vertex, and optionally 'index' to an array of vertex indices.
+        The 'pos' attribute is mapped through the transform of this
+        visual, so that visuals with different transforms can be drawn
+        together using the transform of their parent. The result is
+        cached until the transform changes or ``_invalidate_batch_data()``
+        is called.
+        """
+        if self._batch_data is None:
+            data = self._prepare_batch_data()
+            pos = as_vec4(data['pos']).astype('float32')
+            if not isinstance(self.transform, NullTransform):
+                pos = self.transform.map(pos)
+            data['pos'] = pos
+            self._batch_data = data
+        return self._batch_data
+
+    def _prepare_batch_data(self):
+        """
+        Return the vertex data for ``batch_data()`` in the local coordinate
+        system. Must be implemented by visuals that define ``batch_key()``.
+        """
+        raise NotImplementedError()
+
+    def _invalidate_batch_data(self, event=None):
+        self._batch_data = None
+
+    def draw_batch(self, event, batch):
+        """
+        Draw a VisualBatch of visuals that have the same ``batch_key()`` as
+        this visual. The buffers of the batch hold the concatenated
+        ``batch_data()`` of all visuals in the batch.
+        """
+        raise NotImplementedError()
@@ -59,6 +59,13 @@ class ViewBox(Widget):
         else:
             raise TypeError('Argument "scene" must be None or SubScene.')
         self._scene.add_parent(self)
+
+        # With the 'fbo' clip method, the subscene is only rendered again
+        # when it has changed, or when the FBO changes size.
+        self._fbo = None
+        self._fbo_key = None
+        self._scene_changed = True
+        self._scene.events.update.connect(self._on_scene_update)
         
         # Camera is a helper object that handles scene transformation
         # and user interaction.
@@ -130,7 +137,9 @@ class ViewBox(Widget):
         The 'fbo' method is convenient when the result of the viewbox
         should be reused. Otherwise the overhead can be significant and
         the image can get slightly blurry if the transformations do
-        not match.
+        not match. The rendered subscene is cached: when the canvas is
+        redrawn but nothing in the subscene (including the camera) has
+        changed, the texture from the previous draw is shown again.
 
         It is possible to have a graph with multiple stacked viewboxes
         which each use different methods (subject to the above
@@ -192,15 +201,20 @@ class ViewBox(Widget):
             offset = event.canvas_transform().map((0, 0))[:2]
             size = event.canvas_transform().map(self.size)[:2] - offset
             
-            # Draw subscene to FBO
-            event.push_fbo(fbo, offset, size)
-            event.push_entity(self.scene)
-            try:
-                gloo.clear(color=self._bgcolor, depth=True)
-                self.scene.draw(event)
-            finally:
-                event.pop_entity()
-                event.pop_fbo()
+            # Draw subscene to FBO, unless the previous result is valid
+            key = (tuple(offset), tuple(size), fbo.color_buffer.shape,
+                   tuple(Color(self._bgcolor).rgba))
+            if self._scene_changed or key != self._fbo_key:
+                self._scene_changed = False
+                event.push_fbo(fbo, offset, size)
+                event.push_entity(self.scene)
+                try:
+                    gloo.clear(color=self._bgcolor, depth=True)
+                    self.scene.draw(event)
+                finally:
+                    event.pop_entity()
+                    event.pop_fbo()
+                self._fbo_key = key
             
             gloo.set_state(cull_face=False)
             self._myprogram.draw('triangle_strip')
@@ -221,6 +235,9 @@ class ViewBox(Widget):
 
         event.pop_viewbox()
 
+    def _on_scene_update(self, event):
+        self._scene_changed = True
+
     def _prepare_viewport(self, event):
         p1 = event.map_to_framebuffer((0, 0))
         p2 = event.map_to_framebuffer(self.size)
@@ -231,13 +248,11 @@ class ViewBox(Widget):
         in any situation, regardless of the transformations to this
         viewbox.
 
-        TODO:
-        Right now, this implementation create a program, texture and FBO
-        on *each* draw, because it does not work otherwise. This is probably
-        a bug in gloo that prevents using two FBO's / programs at the same
-        time.
+        The program, texture and FBO are created on the first draw, and
+        reused afterwards so that the rendered subscene can be cached.
 
-        Also, we use plain gloo and calculate the transformation
+        TODO:
+        We use plain gloo and calculate the transformation
         ourselves, assuming 2D only. Eventually we should just use the
         transform of self. I could not get that to work, probably
         because I do not understand the component system yet.
@@ -267,8 +282,7 @@ class ViewBox(Widget):
             }
         """
 
-        # todo: don't do this on every draw
-        if True:
+        if self._fbo is None:
             # Create program
             self._myprogram = gloo.Program(render_vertex, render_fragment)
             # Create texture
@@ -285,14 +299,10 @@ class ViewBox(Widget):
             self._myprogram['a_texcoord'] = gloo.VertexBuffer(texcoord)
             self._myprogram['a_position'] = self._vert = \
                 gloo.VertexBuffer(position)
-
-        # Get fbo, ensure it exists
-        fbo = getattr(self, '_fbo', None)
-        if True:  # fbo is None:
-            self._fbo = 4
-            self._fbo = fbo = gloo.FrameBuffer(self._tex,
-                                               depth=gloo.DepthBuffer((10,
-                                                                       10)))
+            # Create fbo
+            self._fbo = gloo.FrameBuffer(self._tex,
+                                         depth=gloo.DepthBuffer((10, 10)))
+        fbo = self._fbo
 
         # Set texture coords to make the texture be drawn in the right place
         # Note that we would just use -1..1 if we would use a Visual.
@@ -310,7 +320,8 @@ class ViewBox(Widget):
         # Set fbo size (mind that this is set using shape!)
         resolution = [int(i+0.5) for i in self._resolution]  # set in draw()
         shape = resolution[1], resolution[0]
-        fbo.color_buffer.resize(shape+(4,))
-        fbo.depth_buffer.resize(shape)
+        if fbo.color_buffer.shape[:2] != shape:
+            fbo.color_buffer.resize(shape+(4,))
+            fbo.depth_buffer.resize(shape)
 
         return fbo
@@ -10,5 +10,5 @@ fonts.
 
 __all__ = ['list_fonts']
 
-from ._triage import _load_glyph, list_fonts  # noqa, analysis:ignore
+from ._triage import _load_glyph, _load_glyphs, list_fonts  # noqa, analysis:ignore
 from ._vispy_fonts import _vispy_fonts  # noqa, analysis:ignore
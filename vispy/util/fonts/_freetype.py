@@ -7,6 +7,8 @@
 # Use freetype to get glyph bitmaps
 
 import sys
+import struct
+
 import numpy as np
 
 
@@ -20,6 +22,8 @@ else:
     raise NotImplementedError
 
 _font_dict = {}
+_FT_FACE_FLAG_KERNING = 1 << 6
+_kern_tables = {}
 
 
 # Nest freetype imports in case someone doesn't have freetype on their system
@@ -41,30 +45,142 @@ def _load_font(face, bold, italic):
 
 def _load_glyph(f, char, glyphs_dict):
     """Load glyph from font into dict"""
+    _load_glyphs(f, [char], glyphs_dict)
+
+
+def _load_glyphs(f, chars, glyphs_dict):
+    """Load glyphs of multiple characters from font into dict
+
+    Kerning is only stored for pairs with a non-zero kerning, and is not
+    queried at all for fonts without kerning information, so loading many
+    characters at once is much cheaper than loading them one at a time.
+    """
     from ...ext.freetype import (FT_LOAD_RENDER, FT_LOAD_NO_HINTING,
                                  FT_LOAD_NO_AUTOHINT)
     flags = FT_LOAD_RENDER | FT_LOAD_NO_HINTING | FT_LOAD_NO_AUTOHINT
     face = _load_font(f['face'], f['bold'], f['italic'])
     face.set_char_size(f['size'] * 64)
-    # get the character of interest
-    face.load_char(char, flags)
-    bitmap = face.glyph.bitmap
-    width = face.glyph.bitmap.width
-    height = face.glyph.bitmap.rows
-    bitmap = np.array(bitmap.buffer)
-    w0 = bitmap.size // height if bitmap.size > 0 else 0
-    bitmap.shape = (height, w0)
-    bitmap = bitmap[:, :width].astype(np.ubyte)
-
-    left = face.glyph.bitmap_left
-    top = face.glyph.bitmap_top
-    advance = face.glyph.advance.x / 64.
-    glyph = dict(char=char, offset=(left, top), bitmap=bitmap,
-                 advance=advance, kerning={})
-    glyphs_dict[char] = glyph
-    # Generate kerning
-    for other_char, other_glyph in glyphs_dict.items():
-        kerning = face.get_kerning(other_char, char)
-        glyph['kerning'][other_char] = kerning.x / 64.
-        kerning = face.get_kerning(char, other_char)
-        other_glyph['kerning'][char] = kerning.x / 64.
+    new_chars = []
+    for char in chars:
+        if char in glyphs_dict or char in new_chars:
+            continue
+        # get the character of interest
+        face.load_char(char, flags)
+        bitmap = face.glyph.bitmap
+        width = face.glyph.bitmap.width
+        height = face.glyph.bitmap.rows
+        bitmap = np.array(bitmap.buffer)
+        w0 = bitmap.size // height if bitmap.size > 0 else 0
+        bitmap.shape = (height, w0)
+        bitmap = bitmap[:, :width].astype(np.ubyte)
+
+        left = face.glyph.bitmap_left
+        top = face.glyph.bitmap_top
+        advance = face.glyph.advance.x / 64.
+        glyph = dict(char=char, offset=(left, top), bitmap=bitmap,
+                     advance=advance, kerning={})
+        glyphs_dict[char] = glyph
+        new_chars.append(char)
+    if new_chars and face.face_flags & _FT_FACE_FLAG_KERNING:
+        _load_kerning(face, new_chars, glyphs_dict)
+
+
+def _load_kerning(face, new_chars, glyphs_dict):
+    """Add the kerning of all pairs with a new char to the glyphs
+
+    Only the pairs listed in the kern table of the font are queried. If
+    the table cannot be read, all pairs of a new char with a loaded char
+    are queried.
+    """
+    from ...ext.freetype import (FT_Get_Kerning, FT_Vector,
+                                 FT_KERNING_DEFAULT, byref)
+    # Characters without a glyph in the font are never kerned
+    chars = {}
+    for char in glyphs_dict:
+        index = face.get_char_index(char)
+        if index:
+            chars.setdefault(index, []).append(char)
+    new = set(face.get_char_index(char) for char in new_chars)
+    new = np.array(sorted(new.intersection(chars)), np.int64)
+    loaded = np.array(sorted(chars), np.int64)
+    table = _get_kern_table(face)
+    if table is None:
+        left, right = np.meshgrid(loaded, new)
+        left, right = left.ravel(), right.ravel()
+        old = ~np.in1d(left, new)
+        left, right = (np.concatenate([left, right[old]]),
+                       np.concatenate([right, left[old]]))
+    else:
+        left, right = table
+        keep = ((np.in1d(left, new) & np.in1d(right, loaded)) |
+                (np.in1d(left, loaded) & np.in1d(right, new)))
+        left, right = left[keep], right[keep]
+    kerning = FT_Vector(0, 0)
+    for left_index, right_index in zip(left.tolist(), right.tolist()):
+        error = FT_Get_Kerning(face._FT_Face, left_index, right_index,
+                               FT_KERNING_DEFAULT, byref(kerning))
+        if error:
+            raise RuntimeError(error)
+        if kerning.x != 0:
+            for a in chars[left_index]:
+                for b in chars[right_index]:
+                    glyphs_dict[b]['kerning'][a] = kerning.x / 64.
+
+
+def _get_kern_table(face):
+    """Get the glyph index pairs in the kern table of a font
+
+    Returns
+    -------
+    pairs : tuple of arrays | None
+        The left and right glyph indices of the pairs in the horizontal
+        format 0 subtables, which are the only ones FreeType uses. None if
+        the font has no such table or it could not be read.
+    """
+    key = (face._filename, face._index)
+    if key not in _kern_tables:
+        try:
+            _kern_tables[key] = _read_kern_table(face._filename, face._index)
+        except (IOError, OSError, ValueError, struct.error):
+            _kern_tables[key] = None
+    return _kern_tables[key]
+
+
+def _read_kern_table(fname, index=0):
+    """Read the pairs of the kern table of a TrueType/OpenType file"""
+    with open(fname, 'rb') as fid:
+        data = fid.read()
+    offset = 0
+    if data[:4] == b'ttcf':
+        offset, = struct.unpack_from('>I', data, 12 + 4 * index)
+    n_tables, = struct.unpack_from('>H', data, offset + 4)
+    for ii in range(n_tables):
+        tag, _, kern, length = struct.unpack_from('>4sIII', data,
+                                                  offset + 12 + 16 * ii)
+        if tag == b'kern':
+            break
+    else:
+        return None
+    version, n_subtables = struct.unpack_from('>HH', data, kern)
+    if version != 0:  # the Apple format is not used by FreeType either
+        return None
+    lefts, rights = [], []
+    pos = kern + 4
+    for ii in range(n_subtables):
+        _, length, coverage = struct.unpack_from('>HHH', data, pos)
+        # format 0, horizontal, not minimum and not cross-stream
+        if coverage & ~8 == 1:
+            n_pairs, = struct.unpack_from('>H', data, pos + 6)
+            pairs = np.frombuffer(data, '>u2', 3 * n_pairs, pos + 14)
+            pairs = pairs.reshape(n_pairs, 3).astype(np.int64)
+            lefts.append(pairs[:, 0])
+            rights.append(pairs[:, 1])
+            # large subtables overflow the 16 bit length
+            length = 14 + 6 * n_pairs
+        pos += length
+    if not lefts:
+        return None
+    # subtables are summed, each pair is queried once
+    keys = np.unique(np.concatenate(lefts) * 0x10000 +
+                     np.concatenate(rights))
+    return keys // 0x10000, keys % 0x10000
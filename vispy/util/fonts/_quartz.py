@@ -161,6 +161,13 @@ def _load_glyph(f, char, glyphs_dict):
     cf.CFRelease(font)
 
 
+def _load_glyphs(f, chars, glyphs_dict):
+    """Load glyphs of multiple characters from font into dict"""
+    for char in chars:
+        if char not in glyphs_dict:
+            _load_glyph(f, char, glyphs_dict)
+
+
 def _get_k_p_a(font, left, right):
     """This actually calculates the kerning + advance"""
     # http://lists.apple.com/archives/coretext-dev/2010/Dec/msg00020.html
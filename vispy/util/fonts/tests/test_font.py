@@ -7,7 +7,9 @@ from nose.tools import assert_true, assert_equal
 import warnings
 
 from vispy.testing import assert_in
-from vispy.util.fonts import list_fonts, _load_glyph, _vispy_fonts
+from vispy.util.fonts import (list_fonts, _load_glyph, _load_glyphs,
+                              _vispy_fonts)
+from vispy.util.fonts._freetype import _load_font, _kern_tables
 
 warnings.simplefilter('always')
 
@@ -33,3 +35,39 @@ def test_font_glyph():
             # Warning that Arial might not exist
             _load_glyph(font_dict, char, glyphs_dict)
         assert_equal(len(glyphs_dict), np.unique([c for c in chars]).size)
+        # loading all glyphs at once gives the same result
+        bulk_dict = dict()
+        _load_glyphs(font_dict, chars + 'AV', bulk_dict)
+        _load_glyph(font_dict, 'A', glyphs_dict)
+        _load_glyph(font_dict, 'V', glyphs_dict)
+        assert_equal(sorted(bulk_dict), sorted(glyphs_dict))
+        for char, glyph in bulk_dict.items():
+            assert_equal(glyph['advance'], glyphs_dict[char]['advance'])
+            assert_equal(glyph['kerning'], glyphs_dict[char]['kerning'])
+
+
+def test_font_kerning():
+    """Test that the kerning matches querying every pair"""
+    font_dict = dict(face='OpenSans', size=12, bold=False, italic=False)
+    chars = [chr(c) for c in range(32, 127)]
+    face = _load_font('OpenSans', False, False)
+    face.set_char_size(12 * 64)
+    expd = dict((char, {}) for char in chars)
+    for left in chars:
+        for right in chars:
+            kerning = face.get_kerning(left, right).x / 64.
+            if kerning != 0:
+                expd[right][left] = kerning
+    key = (face._filename, face._index)
+    try:
+        for use_table in (True, False):
+            _kern_tables.pop(key, None)
+            if not use_table:
+                _kern_tables[key] = None  # query all pairs
+            glyphs_dict = dict()
+            _load_glyphs(font_dict, chars[:40], glyphs_dict)
+            _load_glyphs(font_dict, chars[40:], glyphs_dict)
+            for char in chars:
+                assert_equal(glyphs_dict[char]['kerning'], expd[char])
+    finally:
+        _kern_tables.pop(key, None)